@@ -0,0 +1,131 @@
+import argparse
+import csv
+
+import numpy as np
+
+from answer_matching import build_answer_matchers
+from puzzle_packs import load_pack
+
+# --- Batch Answer Grading ---
+# Re-grades logged puzzle attempts after an event and summarizes them per puzzle.
+# Attempts come in as columns, one entry per attempt: session id, puzzle id, raw
+# answer and timestamp in seconds. Answers are graded with the game's own
+# matchers (answer_matching.py). Each distinct (puzzle, answer) pair is matched
+# only once, and everything after that is array operations, so millions of
+# attempts take seconds.
+#
+#   python answer_grading.py attempts.csv --pack lab
+#
+# attempts.csv has a header row with session, puzzle, answer and timestamp columns.
+
+def grade_answers(puzzles, puzzle_ids, answers, code_from_initials=False):
+    # Boolean array: whether each answer is correct for its puzzle
+    matchers = dict(zip((puzzle["id"] for puzzle in puzzles), build_answer_matchers(puzzles, code_from_initials)))
+    puzzle_ids = np.asarray(puzzle_ids, dtype=np.int64)
+
+    # Number the distinct (puzzle, answer) pairs (a dict beats sorting millions of
+    # strings), match each of them once, then look every attempt up by its number
+    unique_pairs = {}
+    number = unique_pairs.setdefault
+    pair_index = np.array([number(pair, len(unique_pairs)) for pair in zip(puzzle_ids.tolist(), answers)], dtype=np.int64)
+    pair_correct = np.array([puzzle_id in matchers and matchers[puzzle_id].matches(answer) # Unknown puzzles are never right
+                             for puzzle_id, answer in unique_pairs], dtype=bool)
+    return pair_correct[pair_index]
+
+
+def attempt_groups(session_ids, puzzle_ids, timestamps, correct):
+    # One entry per (session, puzzle): how that player got on with that puzzle.
+    # Attempts after the first correct one are ignored, as the game closes a
+    # puzzle once it's solved.
+    order = np.lexsort((timestamps, puzzle_ids, session_ids))
+    sessions, puzzles = session_ids[order], puzzle_ids[order]
+    times, correct = timestamps[order], correct[order]
+
+    count = len(order)
+    new_group = np.ones(count, dtype=bool)
+    new_group[1:] = (sessions[1:] != sessions[:-1]) | (puzzles[1:] != puzzles[:-1])
+    starts = np.flatnonzero(new_group)
+    sizes = np.diff(np.append(starts, count))
+
+    # Position of each group's first correct attempt, or count when it was never solved
+    first_correct = np.minimum.reduceat(np.where(correct, np.arange(count), count), starts)
+    solved = first_correct < count
+    attempts = np.where(solved, first_correct - starts + 1, sizes) # Attempts up to and including the solve
+    wrong = np.where(solved, attempts - 1, sizes)
+    solve_seconds = np.where(solved, times[np.minimum(first_correct, count - 1)] - times[starts], np.nan)
+
+    return {
+        "puzzle": puzzles[starts],
+        "solved": solved,
+        "attempts": attempts,
+        "wrong": wrong,
+        "hinted": wrong >= 2, # The game shows a hint once incorrect_attempts_count reaches 2
+        "solve_seconds": solve_seconds, # From the first attempt to the correct one, NaN if never solved
+    }
+
+
+def puzzle_stats(puzzles, puzzle_ids, answers, timestamps, session_ids=None, code_from_initials=False):
+    # Per-puzzle summary of a log of attempts, in puzzle order. Without session
+    # ids, every attempt is treated as coming from the same player.
+    puzzle_ids = np.asarray(puzzle_ids, dtype=np.int64)
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    session_ids = np.zeros(len(puzzle_ids), dtype=np.int64) if session_ids is None else np.asarray(session_ids)
+    if len(puzzle_ids) == 0:
+        return []
+
+    correct = grade_answers(puzzles, puzzle_ids, answers, code_from_initials)
+    groups = attempt_groups(session_ids, puzzle_ids, timestamps, correct)
+
+    stats = []
+    for puzzle in puzzles:
+        in_puzzle = groups["puzzle"] == puzzle["id"]
+        players = int(in_puzzle.sum())
+        solved = in_puzzle & groups["solved"]
+        solve_count = int(solved.sum())
+        stats.append({
+            "puzzle": puzzle["id"],
+            "players": players, # Sessions that tried the puzzle
+            "attempts": int(groups["attempts"][in_puzzle].sum()),
+            "solved": solve_count,
+            "mean_attempts_to_solve": float(groups["attempts"][solved].mean()) if solve_count else None,
+            "hint_rate": float(groups["hinted"][in_puzzle].mean()) if players else None,
+            "median_solve_seconds": float(np.median(groups["solve_seconds"][solved])) if solve_count else None,
+            "p90_solve_seconds": float(np.percentile(groups["solve_seconds"][solved], 90)) if solve_count else None,
+        })
+    return stats
+
+
+def read_attempts_csv(path):
+    session_ids, puzzle_ids, answers, timestamps = [], [], [], []
+    with open(path, newline="", encoding="utf-8") as csv_file:
+        for row in csv.DictReader(csv_file):
+            session_ids.append(row["session"])
+            puzzle_ids.append(int(row["puzzle"]))
+            answers.append(row["answer"])
+            timestamps.append(float(row["timestamp"]))
+    return session_ids, puzzle_ids, answers, timestamps
+
+
+def format_stat(value, template):
+    return "-" if value is None else template.format(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-grade logged ChemEscape attempts and summarize them per puzzle")
+    parser.add_argument("attempts", help="CSV file with session, puzzle, answer and timestamp columns")
+    parser.add_argument("--pack", default="lab", help="puzzle pack the attempts were made in (default lab)")
+    args = parser.parse_args()
+
+    session_ids, puzzle_ids, answers, timestamps = read_attempts_csv(args.attempts)
+    pack = load_pack(args.pack)
+    stats = puzzle_stats(pack["puzzles"], puzzle_ids, answers, timestamps, session_ids, pack["code_from_initials"])
+
+    print("puzzle  players  attempts  solved  attempts/solve  hint rate  median s  p90 s")
+    for row in stats:
+        print(f"{row['puzzle']:>6}  {row['players']:>7}  {row['attempts']:>8}  {row['solved']:>6}  "
+              f"{format_stat(row['mean_attempts_to_solve'], '{:.2f}'):>14}  {format_stat(row['hint_rate'], '{:.0%}'):>9}  "
+              f"{format_stat(row['median_solve_seconds'], '{:.1f}'):>8}  {format_stat(row['p90_solve_seconds'], '{:.1f}'):>5}")
+
+
+if __name__ == "__main__":
+    main()
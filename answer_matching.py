@@ -0,0 +1,138 @@
+import re
+
+from elements import NAMES, SYMBOLS, find_element
+
+# --- Answer Matching ---
+# Decides whether a typed answer counts for a puzzle. Answers are compared in a
+# canonical form: lower case, with punctuation and hyphens turned into spaces,
+# so "non newtonian" matches "Non-Newtonian". A puzzle accepts its answer, any
+# "aliases" listed for it in the pack, and the symbol for an element named in
+# either (or the name for a symbol), so "K" matches "Potassium". Longer answers
+# also match with a typo or two (see FUZZY_EDITS).
+#
+# In rooms where players work out the escape code from the first letters of
+# their answers, only answers starting with the same letter as the puzzle's own
+# answer are accepted (same_initial), so "NaCl" can't lead to a different code
+# than "Salt". Puzzles whose "code_element" fixes the letter the code uses (the
+# lab's Potassium counts as K) accept all their forms, "K" included.
+#
+# Each puzzle's accepted forms are compiled once into an AnswerMatcher when the
+# room is built. Exact forms go in a set. Forms long enough for typos are
+# indexed by every string made by deleting up to their allowed typos from the
+# start of them (see INDEXED_PREFIX), so a typed answer only looks up the
+# deletions of its own start and checks the distance to the few forms that
+# share one. Matching stays well under a millisecond even with thousands of
+# accepted forms.
+
+FUZZY_EDITS = ((9, 2), (5, 1)) # (shortest answer, typos allowed), longest first; shorter answers must be exact
+INDEXED_PREFIX = 7 # Characters at the start of each form whose deletions are indexed
+
+NOT_ANSWER_CHARACTERS = re.compile(r"[\W_]+")
+
+
+def canonical_answer(text):
+    return NOT_ANSWER_CHARACTERS.sub(" ", text.lower()).strip()
+
+
+def allowed_edits(form):
+    for shortest, edits in FUZZY_EDITS:
+        if len(form) >= shortest:
+            return edits
+    return 0
+
+
+def accepted_forms(puzzle):
+    # Canonical forms a puzzle accepts: its answer, its aliases and their element equivalents
+    forms = set()
+    for answer in [puzzle["answer"]] + puzzle.get("aliases", []):
+        forms.add(canonical_answer(answer))
+        number = find_element(answer)
+        if number is not None:
+            forms.add(SYMBOLS[number].lower())
+            forms.add(NAMES[number].lower())
+    return forms
+
+
+def deletions(form, edits):
+    # Every string made by deleting up to edits characters from form
+    found = {form}
+    level = {form}
+    for _ in range(edits):
+        level = {text[:i] + text[i + 1:] for text in level for i in range(len(text))}
+        found |= level
+    return found
+
+
+def edit_distance(a, b, limit):
+    # Levenshtein distance between a and b, or limit + 1 if it is over limit.
+    # Only cells within limit of the diagonal can stay within limit, so only
+    # those are worked out.
+    over = limit + 1
+    if abs(len(a) - len(b)) > limit:
+        return over
+    previous_row = [min(j, over) for j in range(len(b) + 1)]
+    for i, a_char in enumerate(a, 1):
+        low, high = max(1, i - limit), min(len(b), i + limit)
+        row = [over] * (len(b) + 1)
+        row[0] = min(i, over)
+        for j in range(low, high + 1):
+            row[j] = min(row[j - 1] + 1, # Insert
+                         previous_row[j] + 1, # Delete
+                         previous_row[j - 1] + (a_char != b[j - 1])) # Replace
+        if min(row[low - 1:high + 1]) > limit:
+            return over # Every later row is further away still
+        previous_row = row
+    return min(previous_row[-1], over)
+
+
+class AnswerMatcher:
+    __slots__ = ("exact", "variants", "max_edits", "initial")
+
+    def __init__(self, forms, initial=None):
+        self.initial = initial # First letter every accepted answer must start with, or None for any
+        self.exact = {form for form in forms if initial is None or form.startswith(initial)}
+        self.variants = {} # Deletion variant -> accepted forms it comes from
+        self.max_edits = 0
+        for form in self.exact:
+            edits = allowed_edits(form)
+            if edits:
+                self.max_edits = max(self.max_edits, edits)
+                for variant in deletions(form[:INDEXED_PREFIX], edits):
+                    self.variants.setdefault(variant, []).append(form)
+
+    def matches(self, text):
+        form = canonical_answer(text)
+        if self.initial is not None and not form.startswith(self.initial):
+            return False # Not even as a typo, since the first letter is what counts
+        if form in self.exact:
+            return True
+        edits = min(allowed_edits(form), self.max_edits)
+        if not edits or find_element(form) is not None:
+            return False # A different element's name is never a typo for this one
+        return self.closest(form, edits) is not None
+
+    def closest(self, form, edits):
+        # An accepted form within edits of form, or None. The starts of two
+        # strings within edits of each other always share a deletion variant,
+        # so only forms sharing one need their distance checked.
+        checked = set()
+        for variant in deletions(form[:INDEXED_PREFIX], edits):
+            for accepted in self.variants.get(variant, ()):
+                if accepted in checked:
+                    continue
+                checked.add(accepted)
+                limit = min(edits, allowed_edits(accepted))
+                if edit_distance(form, accepted, limit) <= limit:
+                    return accepted
+        return None
+
+
+def build_answer_matchers(puzzles, same_initial=False):
+    return [AnswerMatcher(accepted_forms(puzzle), answer_initial(puzzle) if same_initial else None) for puzzle in puzzles]
+
+
+def answer_initial(puzzle):
+    # The letter typed answers must start with when the escape code uses it, or None for any
+    if "code_element" in puzzle:
+        return None # The code uses this element whatever the answer was typed as
+    return canonical_answer(puzzle["answer"])[:1]
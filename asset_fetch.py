@@ -0,0 +1,51 @@
+import asyncio
+import os
+import sys
+import urllib.request
+
+# --- Asset Fetching ---
+# The web build leaves its biggest assets out of the bundle the browser has to
+# download before the game can start (see web_build.py). The game fetches them
+# once it is on screen: fetch_asset(path, base_url) downloads base_url + path
+# to path, unless a file is already there, so once an asset has been fetched
+# the normal loading code just finds it on disk. Each path is only fetched
+# once, however many times it is asked for.
+#
+# In the browser the download goes through pygbag's platform.fopen, which uses
+# JavaScript's fetch (so the browser's HTTP cache applies too). Anywhere else
+# urllib runs on a worker thread, which is how the web build is checked locally.
+
+fetches = {} # path -> task downloading it
+
+
+async def fetch_asset(path, base_url):
+    if os.path.exists(path):
+        return path
+    task = fetches.get(path)
+    if task is None:
+        task = fetches[path] = asyncio.ensure_future(download(base_url + path, path))
+    try:
+        await task
+    except Exception:
+        fetches.pop(path, None) # Let a later call try again
+        raise
+    return path
+
+
+async def download(url, path):
+    if sys.platform == "emscripten":
+        import platform # pygbag's, not the standard library's
+        async with platform.fopen(url, "rb") as source:
+            data = source.read()
+    else:
+        data = await asyncio.to_thread(read_url, url)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    partial_path = path + ".part" # Never leave a half-written file under the real name
+    with open(partial_path, "wb") as asset_file:
+        asset_file.write(data)
+    os.replace(partial_path, path)
+
+
+def read_url(url):
+    with urllib.request.urlopen(url) as response:
+        return response.read()
@@ -0,0 +1,70 @@
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from answer_matching import AnswerMatcher, accepted_forms
+
+# --- Answer Matching Benchmark ---
+# Time to check one typed answer against a puzzle that accepts thousands of
+# answers: exact matches, answers with typos and wrong answers. Also times
+# compiling the matcher, which the game does once when the room is built.
+#
+#   python benchmarks/answer_matching_benchmark.py --answers 5000
+
+GUESSES = 2000
+
+
+def make_answer(rng):
+    words = [("".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))) for _ in range(rng.randint(1, 3))]
+    return " ".join(words)
+
+
+def add_typo(text, rng):
+    position = rng.randrange(len(text))
+    return text[:position] + rng.choice(string.ascii_lowercase) + text[position + 1:]
+
+
+def time_guesses(matcher, guesses):
+    times = []
+    for guess in guesses:
+        start = time.perf_counter()
+        matcher.matches(guess)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2] * 1e6, times[int(len(times) * 0.99)] * 1e6, times[-1] * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time answer matching against a puzzle with many accepted answers")
+    parser.add_argument("--answers", type=int, default=5000, help="accepted answers for the puzzle (default 5000)")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    puzzle = {"answer": "Universal Indicator", "aliases": [make_answer(rng) for _ in range(args.answers - 1)]}
+
+    start = time.perf_counter()
+    matcher = AnswerMatcher(accepted_forms(puzzle))
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    forms = sorted(matcher.exact)
+    exact = [rng.choice(forms).upper() for _ in range(GUESSES)]
+    typos = [add_typo(form, rng) for form in rng.choices([form for form in forms if len(form) >= 5], k=GUESSES)]
+    wrong = [make_answer(rng) for _ in range(GUESSES)]
+    accepted = sum(matcher.matches(guess) for guess in typos)
+    assert all(matcher.matches(guess) for guess in exact)
+
+    print(f"Accepted forms:  {len(matcher.exact):,} ({len(matcher.variants):,} deletion variants, compiled in {compile_ms:.0f} ms)")
+    print(f"{'guesses':<15} {'p50 us':>8} {'p99 us':>8} {'max us':>8}")
+    for name, guesses in (("exact", exact), ("one typo", typos), ("wrong", wrong)):
+        p50, p99, worst = time_guesses(matcher, guesses)
+        print(f"{name:<15} {p50:>8.1f} {p99:>8.1f} {worst:>8.1f}")
+    print(f"Typos accepted:  {accepted / GUESSES:.0%} (answers shorter than 5 letters must be exact)")
+
+
+if __name__ == "__main__":
+    main()
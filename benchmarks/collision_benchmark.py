@@ -0,0 +1,65 @@
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+
+from spatial_index import build_station_grid, station_rect
+
+# --- Collision Benchmark ---
+# Per-frame cost of finding the puzzle station under the character, comparing the
+# old full scan (new Rect per station every frame, plus all()) with the grid index.
+# Rooms grow with the station count so the density matches the shipped 800x600 room.
+
+STATION_COUNTS = [10, 100, 1000, 10000]
+FRAMES = 2000
+RADIUS = 20
+CHAR_SIZE = 75
+
+
+def make_room(station_count, rng):
+    scale = (station_count / 10) ** 0.5
+    width, height = int(800 * scale), int(600 * scale)
+    positions = [(rng.randrange(width), rng.randrange(height)) for _ in range(station_count)]
+    char_rects = [pygame.Rect(rng.randrange(width), rng.randrange(height), CHAR_SIZE, CHAR_SIZE) for _ in range(FRAMES)]
+    return positions, char_rects
+
+
+def scan_frame(char_rect, positions, solved):
+    for i, position in enumerate(positions):
+        if not solved[i] and char_rect.colliderect(station_rect(position, RADIUS)):
+            break
+    return all(solved)
+
+
+def time_per_frame(frame, char_rects):
+    start = time.perf_counter()
+    for char_rect in char_rects:
+        frame(char_rect)
+    return (time.perf_counter() - start) / len(char_rects) * 1e6
+
+
+def main():
+    rng = random.Random(1)
+    print(f"{'stations':>9} {'scan us/frame':>14} {'grid us/frame':>14} {'speedup':>8}")
+    for station_count in STATION_COUNTS:
+        positions, char_rects = make_room(station_count, rng)
+        solved = [False] * station_count
+        grid = build_station_grid(positions, RADIUS)
+        solved_count = 0
+
+        # Both approaches must agree on which station is hit
+        for char_rect in char_rects[:200]:
+            hit = next((i for i, position in enumerate(positions) if char_rect.colliderect(station_rect(position, RADIUS))), None)
+            assert grid.first_collision(char_rect) == hit
+
+        scan_us = time_per_frame(lambda char_rect: scan_frame(char_rect, positions, solved), char_rects)
+        grid_us = time_per_frame(lambda char_rect: (grid.first_collision(char_rect), solved_count == station_count), char_rects)
+        print(f"{station_count:>9} {scan_us:>14.2f} {grid_us:>14.2f} {scan_us / grid_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
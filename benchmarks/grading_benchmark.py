@@ -0,0 +1,79 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from answer_grading import grade_answers, puzzle_stats
+from answer_matching import build_answer_matchers
+from puzzle_packs import load_pack
+
+# --- Batch Grading Benchmark ---
+# Makes up a log of attempts like a big event would produce (every session tries
+# every puzzle, with a few wrong answers and stray capitals and spaces), then
+# grades it one attempt at a time the way the game does and with the batch
+# grader, and times the full per-puzzle summary.
+#
+#   python benchmarks/grading_benchmark.py --rows 2000000
+
+WRONG_ANSWERS = ["wrong", "idk", "water", "carbon", "help", ""]
+
+
+def make_attempts(puzzles, row_count, rng):
+    session_ids, puzzle_ids, answers, timestamps = [], [], [], []
+    session = 0
+    while len(puzzle_ids) < row_count:
+        session += 1
+        clock = 0.0
+        for puzzle in puzzles:
+            for attempt in range(rng.randint(1, 4)):
+                clock += rng.uniform(2, 40)
+                if attempt < 3 and rng.random() < 0.5:
+                    answer = rng.choice(WRONG_ANSWERS)
+                else:
+                    answer = rng.choice([str.lower, str.upper, str.title])(puzzle["answer"]) + rng.choice(["", " "])
+                session_ids.append(session)
+                puzzle_ids.append(puzzle["id"])
+                answers.append(answer)
+                timestamps.append(clock)
+    return session_ids[:row_count], puzzle_ids[:row_count], answers[:row_count], timestamps[:row_count]
+
+
+def grade_one_at_a_time(puzzles, puzzle_ids, answers):
+    matchers = dict(zip((puzzle["id"] for puzzle in puzzles), build_answer_matchers(puzzles)))
+    return [matchers[puzzle_id].matches(answer) for puzzle_id, answer in zip(puzzle_ids, answers)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time batch grading of logged attempts")
+    parser.add_argument("--rows", type=int, default=2000000, help="attempts in the made-up log (default 2000000)")
+    parser.add_argument("--pack", default="lab", help="puzzle pack to grade against (default lab)")
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    puzzles = load_pack(args.pack)["puzzles"]
+    session_ids, puzzle_ids, answers, timestamps = make_attempts(puzzles, args.rows, random.Random(1))
+
+    start = time.perf_counter()
+    expected = grade_one_at_a_time(puzzles, puzzle_ids, answers)
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    correct = grade_answers(puzzles, puzzle_ids, answers)
+    batch_seconds = time.perf_counter() - start
+    assert correct.tolist() == expected
+
+    start = time.perf_counter()
+    puzzle_stats(puzzles, puzzle_ids, answers, timestamps, session_ids)
+    stats_seconds = time.perf_counter() - start
+
+    print(f"Attempts:          {args.rows:,} from {session_ids[-1]:,} sessions")
+    print(f"One at a time:     {loop_seconds:.2f} s")
+    print(f"Batch grading:     {batch_seconds:.2f} s ({loop_seconds / batch_seconds:.1f}x)")
+    print(f"Per-puzzle stats:  {stats_seconds:.2f} s including grading ({args.rows / stats_seconds:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
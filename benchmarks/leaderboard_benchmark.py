@@ -0,0 +1,73 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from leaderboard import Leaderboard, insert_runs, open_database, time_at_percentile, time_rank, top_runs
+
+# --- Leaderboard Benchmark ---
+# Fills a fresh leaderboard with made-up runs across a few packs, then times
+# the end screen's queries and a run going through the writer thread, from
+# submit to ready.
+#
+#   python benchmarks/leaderboard_benchmark.py --runs 1000000
+
+PACKS = ["lab", "kitchen", "space"]
+BATCH = 10000
+QUERIES = 200
+
+
+def make_runs(count, rng):
+    now = time.time()
+    return [(rng.choice(PACKS), now - rng.uniform(0, 3e7), min(1800, int(rng.lognormvariate(6.2, 0.4))), rng.randint(0, 25))
+            for _ in range(count)]
+
+
+def time_ms(query):
+    start = time.perf_counter()
+    for _ in range(QUERIES):
+        query()
+    return (time.perf_counter() - start) / QUERIES * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time leaderboard writes and end screen queries")
+    parser.add_argument("--runs", type=int, default=1000000, help="runs stored before querying (default 1000000)")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "leaderboard.db")
+        connection = open_database(path)
+        start = time.perf_counter()
+        for first in range(0, args.runs, BATCH):
+            insert_runs(connection, make_runs(min(BATCH, args.runs - first), rng))
+        fill_seconds = time.perf_counter() - start
+        print(f"Stored runs:       {args.runs:,} in {fill_seconds:.1f} s ({args.runs / fill_seconds:,.0f} runs/s in batches of {BATCH:,})")
+
+        print(f"Top 3 by time:     {time_ms(lambda: top_runs(connection, 'lab', 3)):.3f} ms")
+        print(f"Top 3 by mistakes: {time_ms(lambda: top_runs(connection, 'lab', 3, by='incorrect')):.3f} ms")
+        print(f"Rank of a time:    {time_ms(lambda: time_rank(connection, 'lab', rng.randint(60, 1800))):.3f} ms")
+        print(f"Median time:       {time_ms(lambda: time_at_percentile(connection, 'lab', 0.5)):.3f} ms")
+        connection.close()
+
+        # A finished game as the end screen sees it: submit, then wait for ready
+        leaderboard = Leaderboard(path)
+        waits = []
+        for _ in range(20):
+            start = time.perf_counter()
+            entry = leaderboard.submit_run("lab", rng.randint(60, 1800), rng.randint(0, 25))
+            while not entry.ready:
+                time.sleep(0.0005)
+            waits.append(time.perf_counter() - start)
+        leaderboard.close()
+        waits.sort()
+        print(f"Submit to ready:   median {waits[len(waits) // 2] * 1000:.1f} ms, max {waits[-1] * 1000:.1f} ms (one frame is {1000 / 60:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
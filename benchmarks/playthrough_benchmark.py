@@ -0,0 +1,171 @@
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from game_logic import CHAR_SPEED, TICK_SECONDS, all_puzzles_solved
+
+# --- Headless Playthrough Benchmark ---
+# Plays the whole game without a window or sound: clicks Start, walks to every
+# puzzle, types wrong and then right answers, walks to the door and enters the
+# escape code. Input goes through the game's normal event handling, one frame at
+# a time, as fast as the machine can run it. Reports frame rate, frame time
+# percentiles and memory, and can compare against a saved baseline.
+#
+#   python benchmarks/playthrough_benchmark.py --save baseline.json
+#   python benchmarks/playthrough_benchmark.py --compare baseline.json
+#   python benchmarks/playthrough_benchmark.py --window-size 1920x1080   (frames scaled to a projector-sized window)
+
+MAX_FRAMES = 20000 # A playthrough takes well under this; more means the script got stuck
+END_SCREEN_FRAMES = 30 # Frames to keep rendering the end screen before stopping
+CHAR_STEP = CHAR_SPEED * TICK_SECONDS # Pixels moved per update step
+
+
+class HeldKeys(dict):
+    # Stand-in for pygame.key.get_pressed(): any key not held reads as False
+    def __missing__(self, key):
+        return False
+
+
+def type_text(pygame, text):
+    events = [pygame.event.Event(pygame.KEYDOWN, key=ord(char), unicode=char, mod=0, scancode=0) for char in text]
+    events.append(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_RETURN, unicode="\r", mod=0, scancode=0))
+    return events
+
+
+def walk_towards(pygame, state, target_x, target_y):
+    keys = HeldKeys()
+    if state.char_x < target_x - CHAR_STEP: keys[pygame.K_RIGHT] = True
+    if state.char_x > target_x + CHAR_STEP: keys[pygame.K_LEFT] = True
+    if state.char_y < target_y - CHAR_STEP: keys[pygame.K_DOWN] = True
+    if state.char_y > target_y + CHAR_STEP: keys[pygame.K_UP] = True
+    return keys
+
+
+def playthrough_script(pygame, game, mistakes):
+    # Yields (events, held keys) for each frame, reacting to the game like a player would
+    start_button = pygame.Rect(game.WIDTH // 2 - 75, game.HEIGHT - 100, 150, 50)
+    yield [], HeldKeys()
+    yield [pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1, pos=game.window_pos(start_button.center))], HeldKeys()
+
+    room = game.room
+    half_width = room.char_width // 2
+    half_height = room.char_height // 2
+    while game.state.game_state == "PLAYING":
+        state = game.state
+        if state.input_active and state.current_puzzle:
+            i = state.current_puzzle["id"] - 1
+            answer = "wrong" if state.incorrect_attempts_count[i] < mistakes else state.current_puzzle["answer"]
+            yield type_text(pygame, answer), HeldKeys()
+            yield [], HeldKeys() # Let the result show for a frame
+        elif state.escape_code_active:
+            yield type_text(pygame, room.escape_code), HeldKeys()
+        elif not all_puzzles_solved(state):
+            px, py = room.positions[state.solved_puzzles.index(False)]
+            yield [], walk_towards(pygame, state, px - half_width, py - half_height)
+        else:
+            yield [], walk_towards(pygame, state, room.door_rect.x, room.door_rect.y)
+
+    for _ in range(END_SCREEN_FRAMES):
+        yield [], HeldKeys()
+
+
+def run_playthrough(pygame, game, mistakes):
+    game.reset_game()
+    frame_times = []
+    for frame, (events, keys) in enumerate(playthrough_script(pygame, game, mistakes)):
+        if frame >= MAX_FRAMES:
+            raise RuntimeError(f"Playthrough did not finish within {MAX_FRAMES} frames")
+        frame_start = time.perf_counter()
+        game.run_frame(events, keys, TICK_SECONDS) # One update step per frame, as if rendering at 60 FPS
+        frame_times.append(time.perf_counter() - frame_start)
+
+    if game.state.game_state != "END_SCREEN" or not all_puzzles_solved(game.state):
+        raise RuntimeError("Playthrough ended without escaping the lab")
+    return frame_times
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(frame_times):
+    sorted_ms = sorted(t * 1000 for t in frame_times)
+    return {
+        "frames": len(frame_times),
+        "fps": len(frame_times) / sum(frame_times),
+        "p50_ms": percentile(sorted_ms, 0.50),
+        "p90_ms": percentile(sorted_ms, 0.90),
+        "p99_ms": percentile(sorted_ms, 0.99),
+        "max_ms": sorted_ms[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless ChemEscape playthrough benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="timed playthroughs (default 5)")
+    parser.add_argument("--mistakes", type=int, default=2, help="wrong answers per puzzle before the right one (default 2, shows hints)")
+    parser.add_argument("--dirty-rects", action="store_true", help="use the dirty-rectangle renderer")
+    parser.add_argument("--window-size", metavar="WxH", help="window size, if not the game's own 800x600")
+    parser.add_argument("--save", metavar="FILE", help="write the results to a JSON file")
+    parser.add_argument("--compare", metavar="FILE", help="fail if slower than the results in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown for --compare (default 0.25 = 25%%)")
+    args = parser.parse_args()
+
+    # The game reads its options when it is imported
+    os.environ["CHEMESCAPE_HEADLESS"] = "1"
+    os.environ["CHEMESCAPE_LEADERBOARD"] = "" # Don't add benchmark runs to the player's leaderboard
+    if args.dirty_rects:
+        os.environ["CHEMESCAPE_DIRTY_RECTS"] = "1"
+    if args.window_size:
+        os.environ["CHEMESCAPE_WINDOW_SIZE"] = args.window_size
+    os.chdir(REPO_DIR)
+    import pygame
+    import main as game
+
+    run_playthrough(pygame, game, args.mistakes) # Warm-up run fills the text and layer caches
+
+    frame_times = []
+    for _ in range(args.runs):
+        frame_times.extend(run_playthrough(pygame, game, args.mistakes))
+    results = summarize(frame_times)
+
+    # Memory is measured on a separate run since tracing slows every frame down
+    tracemalloc.start()
+    run_playthrough(pygame, game, args.mistakes)
+    results["python_peak_kb"] = tracemalloc.get_traced_memory()[1] / 1024
+    tracemalloc.stop()
+    results["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print(f"Playthroughs:    {args.runs} ({results['frames']} frames, {'dirty rects' if args.dirty_rects else 'full flip'}, "
+          f"{'x'.join(map(str, game.window.get_size()))} window)")
+    print(f"Frame rate:      {results['fps']:.0f} fps")
+    print(f"Frame time:      p50 {results['p50_ms']:.3f} ms  p90 {results['p90_ms']:.3f} ms  "
+          f"p99 {results['p99_ms']:.3f} ms  max {results['max_ms']:.3f} ms")
+    print(f"Memory:          python peak {results['python_peak_kb']:.0f} KB  max RSS {results['max_rss_kb']} KB")
+
+    if args.save:
+        with open(args.save, "w") as results_file:
+            json.dump(results, results_file, indent=4)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = [key for key in ("p50_ms", "p90_ms", "p99_ms")
+                       if results[key] > baseline[key] * (1 + args.tolerance)]
+        for key in regressions:
+            print(f"REGRESSION: {key} {results[key]:.3f} ms vs baseline {baseline[key]:.3f} ms")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
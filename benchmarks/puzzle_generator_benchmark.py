@@ -0,0 +1,54 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from puzzle_generator import PuzzleGenerator, generated_pack, generated_pack_name, read_word_list, take_room
+from puzzle_packs import load_pack
+
+# --- Puzzle Generator Benchmark ---
+# Times searching the word list for answers (done once at startup) and making
+# rooms from the puzzle stream the way the game does for every new game,
+# including validating each room as a pack and working out its escape code.
+# Also checks that no answer repeats until every answer has been used.
+#
+#   python benchmarks/puzzle_generator_benchmark.py --rooms 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Time generating puzzle rooms")
+    parser.add_argument("--rooms", type=int, default=1000, help="rooms to generate (default 1000)")
+    parser.add_argument("--words", default=None, help="word list to search (default the game's)")
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    words = read_word_list(args.words) if args.words else read_word_list()
+    base_pack = load_pack("lab")
+    room_size = len(base_pack["positions"])
+
+    start = time.perf_counter()
+    generator = PuzzleGenerator(words)
+    search_ms = (time.perf_counter() - start) * 1000
+
+    stream = generator.puzzles(1)
+    room_times = []
+    answers = []
+    for room_number in range(args.rooms):
+        start = time.perf_counter()
+        pack = generated_pack(base_pack, take_room(stream, room_size), generated_pack_name("lab", 1, room_number))
+        room_times.append(time.perf_counter() - start)
+        answers.extend(puzzle["answer"] for puzzle in pack["puzzles"])
+    cycle = len(generator.answers)
+    for first in range(0, len(answers), cycle):
+        assert len(set(answers[first:first + cycle])) == len(answers[first:first + cycle]), "answer repeated within a cycle"
+    room_times.sort()
+
+    print(f"Word list:       {len(words):,} words, {cycle:,} usable answers found in {search_ms:.1f} ms")
+    print(f"Rooms:           {args.rooms:,} of {room_size} puzzles, {cycle // room_size:,} before any answer repeats")
+    print(f"Per room:        median {room_times[len(room_times) // 2] * 1000:.2f} ms  max {room_times[-1] * 1000:.2f} ms")
+    print(f"Puzzles/second:  {len(answers) / sum(room_times):,.0f}")
+
+
+if __name__ == "__main__":
+    main()
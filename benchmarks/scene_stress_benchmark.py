@@ -0,0 +1,139 @@
+import argparse
+import os
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from game_logic import TICK_SECONDS
+
+# --- Scene Stress Benchmark ---
+# Fills the playing scene with thousands of extra puzzle stations that blink
+# between solved and unsolved, --changing of them each frame (each station
+# every stations / changing frames, staggered), and times whole frames. Like the
+# game marking a station when it is solved, each frame marks just the stations
+# about to blink, so only those are checked and redrawn. With the number
+# changing per frame held fixed, frame time does not follow the station count;
+# what still grows is how many others overlap each changed one, as they are
+# packed more tightly into the room: 5000 stations cost about twice 1000, where
+# blitting every station every frame, the way the screen used to be drawn and
+# also timed here for comparison, costs five times as much.
+#
+#   python benchmarks/scene_stress_benchmark.py --stations 0 1000 2000 5000 --changing 10
+
+CHUNK_FRAMES = 100 # Frames averaged for the first and last chunk
+
+
+class HeldKeys(dict):
+    def __missing__(self, key):
+        return False
+
+
+def start_playing(pygame, game):
+    game.reset_game()
+    game.run_frame([], HeldKeys(), TICK_SECONDS)
+    start_button = pygame.Rect(game.WIDTH // 2 - 75, game.HEIGHT - 100, 150, 50)
+    click = pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1, pos=game.window_pos(start_button.center))
+    game.run_frame([click], HeldKeys(), TICK_SECONDS)
+    if game.state.game_state != "PLAYING":
+        raise RuntimeError("Could not start the game")
+
+
+def station_positions(game, count):
+    # Spread over the room in a grid, overlapping where there are too many to fit
+    columns = max(1, int((count * game.WIDTH / game.HEIGHT) ** 0.5))
+    rows = (count + columns - 1) // columns
+    return [((i % columns + 0.5) * game.WIDTH / columns, (i // columns + 0.5) * game.HEIGHT / max(rows, 1)) for i in range(count)]
+
+
+def blink_frames(count, changing):
+    # Frames between a station's changes, so about `changing` of count change each frame
+    return max(1, count // max(1, changing))
+
+
+def add_stations(game, count, blink, clock):
+    # Returns the stations by the frame (mod blink) they change on
+    blinks_on = [[] for _ in range(blink)]
+    for i, position in enumerate(station_positions(game, count)):
+        def build(solved, number=i % 99 + 1, position=position):
+            image = game.build_station(number, solved)
+            return image, image.get_rect(center=position)
+        offset = i % blink
+        node = game.SceneNode(lambda offset=offset: (clock[0] + offset) // blink % 2 == 1, build)
+        game.playing_scene.add(node, layer=game.STATION_LAYER)
+        blinks_on[-offset % blink].append(node)
+    return blinks_on
+
+
+def draw_every_station(game, positions, blink, frame):
+    # The immediate-mode way: the whole background and every station, every frame
+    game.screen.blit(game.lab_bg, (0, 0))
+    images = []
+    for i, position in enumerate(positions):
+        image = game.build_station(i % 99 + 1, (frame + i % blink) // blink % 2 == 1)
+        images.append((image, image.get_rect(center=position)))
+    game.screen.blits(images, doreturn=False)
+
+
+def time_frames(run_one, frames):
+    frame_times = []
+    for frame in range(frames):
+        start = time.perf_counter()
+        run_one(frame)
+        frame_times.append((time.perf_counter() - start) * 1000)
+    ordered = sorted(frame_times)
+    return {
+        "p50": ordered[len(ordered) // 2],
+        "p99": ordered[int(len(ordered) * 0.99)],
+        "first": sum(frame_times[:CHUNK_FRAMES]) / CHUNK_FRAMES,
+        "last": sum(frame_times[-CHUNK_FRAMES:]) / CHUNK_FRAMES,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time frames with thousands of animated puzzle stations")
+    parser.add_argument("--stations", type=int, nargs="+", default=[0, 1000, 2000, 5000], help="extra stations to add (default 0 1000 2000 5000)")
+    parser.add_argument("--changing", type=int, default=10, help="stations that change each frame, however many there are (default 10)")
+    parser.add_argument("--frames", type=int, default=600, help="frames timed per run (default 600)")
+    parser.add_argument("--dirty-rects", action="store_true", help="push only the changed rects to the display")
+    args = parser.parse_args()
+
+    os.environ["CHEMESCAPE_HEADLESS"] = "1"
+    os.environ["CHEMESCAPE_LEADERBOARD"] = ""
+    if args.dirty_rects:
+        os.environ["CHEMESCAPE_DIRTY_RECTS"] = "1"
+    os.chdir(REPO_DIR)
+    import pygame
+    import main as game
+
+    print(f"{args.frames} frames per run, {args.changing} stations changing per frame, {'dirty rects' if args.dirty_rects else 'full flip'}; times in ms")
+    print(f"{'stations':>8}  {'scene p50':>9} {'p99':>7} {'first':>7} {'last':>7}   {'redraw all p50':>14} {'p99':>7}")
+    for count in args.stations:
+        start_playing(pygame, game)
+        clock = [0]
+        blink = blink_frames(count, args.changing)
+        blinks_on = add_stations(game, count, blink, clock)
+
+        def scene_frame(frame):
+            clock[0] = frame
+            game.playing_scene.mark(*blinks_on[frame % blink])
+            game.run_frame([], HeldKeys(), TICK_SECONDS)
+
+        game.repaint_scene()
+        scene_frame(0) # First frame draws everything and fills the station images
+        scene = time_frames(scene_frame, args.frames)
+
+        positions = station_positions(game, count)
+
+        def redraw_all_frame(frame):
+            draw_every_station(game, positions, blink, frame)
+            game.present_display()
+
+        redraw_all = time_frames(redraw_all_frame, args.frames)
+        print(f"{count:>8}  {scene['p50']:>9.3f} {scene['p99']:>7.3f} {scene['first']:>7.3f} {scene['last']:>7.3f}   "
+              f"{redraw_all['p50']:>14.3f} {redraw_all['p99']:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from game_logic import CHAR_SPEED
+from puzzle_packs import load_pack
+
+# --- Game Server Load Test ---
+# Starts game_server.py in its own process and connects more and more bot
+# players to it over local TCP. Each bot plays like the session benchmark's bot:
+# it walks to every puzzle, makes a few mistakes, escapes, and then starts again.
+# For each number of sessions, reports the server's tick times and CPU use, and
+# estimates how many sessions one core could host at the tick rate.
+#
+#   python benchmarks/server_load_test.py --sessions 100,200,400 --tick-rate 30
+
+SERVER_START_TIMEOUT = 10 # Seconds to wait for the server to accept connections
+
+
+class Bot:
+    # A player that reacts to the server's state diffs
+    def __init__(self, pack, reader, writer, mistakes):
+        self.pack = pack
+        self.reader = reader
+        self.writer = writer
+        self.mistakes = mistakes
+        self.view = {} # The session as the client sees it, built up from diffs
+        self.room = None
+        self.tolerance = 0
+        self.move = [0, 0]
+        self.answered = None # (puzzle or "escape", wrong count) last answered, so each answer is sent once
+        self.attempts = {} # puzzle id -> answers sent
+        self.stats = None # Future for a pending stats request
+
+    def send(self, message):
+        self.writer.write((json.dumps(message, separators=(",", ":")) + "\n").encode())
+
+    async def run(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                return
+            message = json.loads(line)
+            if "welcome" in message:
+                self.room = message["welcome"]["room"]
+                # Stop walking within one tick's movement of the target, or the bot would jitter around it
+                self.tolerance = CHAR_SPEED / message["welcome"]["tick_rate"]
+            elif "stats" in message:
+                if self.stats is not None:
+                    self.stats.set_result(message["stats"])
+                    self.stats = None
+            else:
+                self.view.update(message)
+                self.react()
+
+    def react(self):
+        view = self.view
+        screen = view.get("screen")
+        if screen == "START_SCREEN":
+            self.send({"start": True})
+            return
+        if screen == "END_SCREEN":
+            self.attempts.clear()
+            self.send({"reset": True})
+            return
+
+        if view.get("puzzle") is not None:
+            self.walk(0, 0)
+            key = (view["puzzle"], view.get("wrong"))
+            if key != self.answered:
+                attempts = self.attempts.get(view["puzzle"], 0)
+                answer = "wrong" if attempts < self.mistakes else self.pack["puzzles"][view["puzzle"] - 1]["answer"]
+                self.attempts[view["puzzle"]] = attempts + 1
+                self.answered = key
+                self.send({"typed": answer + "\r"})
+            return
+        if view.get("escape"):
+            self.walk(0, 0)
+            key = ("escape", view.get("wrong"))
+            if key != self.answered:
+                self.answered = key
+                self.send({"typed": self.pack["escape_code"] + "\r"})
+            return
+
+        x, y = view["pos"]
+        half_width, half_height = self.room["char_size"][0] // 2, self.room["char_size"][1] // 2
+        unsolved = [puzzle["id"] for puzzle in self.room["puzzles"] if puzzle["id"] not in view["solved"]]
+        if unsolved:
+            px, py = self.room["positions"][unsolved[0] - 1]
+            target_x, target_y = px - half_width, py - half_height
+        else:
+            target_x, target_y = self.room["door"][:2]
+        self.walk((x < target_x - self.tolerance) - (x > target_x + self.tolerance),
+                  (y < target_y - self.tolerance) - (y > target_y + self.tolerance))
+
+    def walk(self, move_x, move_y):
+        if [move_x, move_y] != self.move:
+            self.move = [move_x, move_y]
+            self.send({"move": self.move})
+
+    async def request_stats(self):
+        self.stats = asyncio.get_running_loop().create_future()
+        self.send({"stats": True})
+        return await self.stats
+
+
+async def connect_bot(pack, port, mistakes):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    bot = Bot(pack, reader, writer, mistakes)
+    asyncio.create_task(bot.run())
+    return bot
+
+
+async def wait_for_server(port):
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Server did not start on port {port}")
+            await asyncio.sleep(0.1)
+
+
+async def load_test(args, pack):
+    await wait_for_server(args.port)
+    rng = random.Random(1)
+    bots = []
+    results = []
+    for session_count in args.sessions:
+        while len(bots) < session_count:
+            bots.append(await connect_bot(pack, args.port, rng.randint(0, 3)))
+        await asyncio.sleep(1) # Let new sessions settle in
+        await bots[0].request_stats() # Start a fresh measuring window
+        await asyncio.sleep(args.seconds)
+        stats = await bots[0].request_stats()
+        results.append(stats)
+        print(f"{stats['sessions']:>8}  {stats['p50_ms']:>8.2f}  {stats['p99_ms']:>8.2f}  {stats['max_ms']:>8.2f}  "
+              f"{stats['tick_budget_used']:>7.0%}  {stats['cpu_used']:>7.0%}  {stats['late_ticks']:>5}")
+
+    for bot in bots:
+        bot.writer.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the ChemEscape game server with bot players")
+    parser.add_argument("--sessions", default="50,100,200,400", help="comma-separated session counts to step through (default 50,100,200,400)")
+    parser.add_argument("--tick-rate", type=int, default=30, help="server updates per second (default 30)")
+    parser.add_argument("--seconds", type=float, default=5, help="measuring time at each session count (default 5)")
+    parser.add_argument("--port", type=int, default=8799, help="local port for the test server (default 8799)")
+    parser.add_argument("--pack", default="lab", help="puzzle pack to play (default lab)")
+    args = parser.parse_args()
+    args.sessions = [int(count) for count in args.sessions.split(",")]
+
+    os.chdir(REPO_DIR)
+    pack = load_pack(args.pack)
+    server = subprocess.Popen([sys.executable, "game_server.py", "--port", str(args.port),
+                               "--tick-rate", str(args.tick_rate), "--pack", args.pack],
+                              stdout=subprocess.DEVNULL)
+    try:
+        print(f"Tick rate {args.tick_rate}/s, {args.seconds:g} s per step")
+        print("sessions   p50 ms    p99 ms    max ms    ticks      cpu   late")
+        results = asyncio.run(load_test(args, pack))
+    finally:
+        server.terminate()
+        server.wait()
+
+    # The server's whole CPU use, network included, grows about linearly with sessions
+    busiest = results[-1]
+    if busiest["cpu_used"] > 0:
+        print(f"Sessions per core: about {busiest['sessions'] / busiest['cpu_used']:,.0f} at {args.tick_rate} ticks/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game_logic import CHAR_SPEED, ENTER, NO_INPUT, TICK_RATE, TICK_SECONDS, FrameInput, GameState, all_puzzles_solved, room_from_pack, update
+from puzzle_packs import load_pack
+
+# --- Session Simulation Benchmark ---
+# Steps many game sessions side by side in one process with no rendering, each
+# driven by a simple bot that walks to every puzzle, makes a few mistakes and
+# escapes. Reports update steps per second and how many sessions one core could
+# keep up with at the game's 60 updates per second.
+#
+#   python benchmarks/session_benchmark.py --sessions 500
+
+CHAR_STEP = CHAR_SPEED * TICK_SECONDS # Pixels moved per update step
+CHAR_SIZE = (75, 75) # Size of assets/character.png
+MAX_STEPS = 20000 # A session escapes well before this; more means a bot got stuck
+
+
+def bot_input(state, mistakes):
+    # Input a player would give for the session's current situation
+    room = state.room
+    if state.game_state == "START_SCREEN":
+        return FrameInput(start_game=True)
+    if state.game_state != "PLAYING" or state.game_over:
+        return NO_INPUT
+
+    if state.input_active and state.current_puzzle:
+        i = state.current_puzzle["id"] - 1
+        answer = "wrong" if state.incorrect_attempts_count[i] < mistakes else state.current_puzzle["answer"]
+        return FrameInput(typed=answer + ENTER)
+    if state.escape_code_active:
+        return FrameInput(typed=room.escape_code + ENTER)
+
+    if all_puzzles_solved(state):
+        target_x, target_y = room.door_rect.topleft
+    else:
+        px, py = room.positions[state.solved_puzzles.index(False)]
+        target_x, target_y = px - room.char_width // 2, py - room.char_height // 2
+    move_x = (state.char_x < target_x - CHAR_STEP) - (state.char_x > target_x + CHAR_STEP)
+    move_y = (state.char_y < target_y - CHAR_STEP) - (state.char_y > target_y + CHAR_STEP)
+    return FrameInput(move_x, move_y)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Step many ChemEscape sessions without rendering")
+    parser.add_argument("--sessions", type=int, default=500, help="sessions stepped together (default 500)")
+    parser.add_argument("--pack", default="lab", help="puzzle pack to play (default lab)")
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    room = room_from_pack(load_pack(args.pack), CHAR_SIZE)
+    rng = random.Random(1)
+    mistakes = [rng.randint(0, 3) for _ in range(args.sessions)]
+
+    tracemalloc.start()
+    sessions = [GameState(room) for _ in range(args.sessions)]
+    memory_per_session = tracemalloc.get_traced_memory()[0] / args.sessions
+    tracemalloc.stop()
+
+    dt = TICK_SECONDS
+    steps = 0
+    start = time.perf_counter()
+    for _ in range(MAX_STEPS):
+        running = [i for i, state in enumerate(sessions) if state.game_state != "END_SCREEN"]
+        if not running:
+            break
+        for i in running:
+            state = sessions[i]
+            update(state, bot_input(state, mistakes[i]), dt)
+        steps += len(running)
+    elapsed = time.perf_counter() - start
+
+    escaped = sum(state.game_state == "END_SCREEN" for state in sessions)
+    steps_per_second = steps / elapsed
+    print(f"Sessions:          {args.sessions} ({escaped} escaped)")
+    print(f"Update steps:      {steps} in {elapsed:.2f} s ({steps_per_second:,.0f} steps/s, {elapsed / steps * 1e6:.2f} us/step)")
+    print(f"Sessions per core: {steps_per_second / TICK_RATE:,.0f} at {TICK_RATE} updates/s")
+    print(f"Memory:            {memory_per_session / 1024:.1f} KB per session")
+
+
+if __name__ == "__main__":
+    main()
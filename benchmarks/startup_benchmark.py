@@ -0,0 +1,66 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# --- Cold Start Benchmark ---
+# Starts the game in a fresh Python process, the way a kiosk does after a
+# reboot, and measures from launching the process to:
+#   first frame    the first time anything is shown in the window
+#   start screen   the first frame of the real start screen, once everything is loaded
+# Before the loading screen, these two were the same moment and the window
+# stayed black until then. Runs headless, so no window opens.
+#
+#   python benchmarks/startup_benchmark.py --runs 10
+
+# Runs in the child process: records when each frame is presented, imports the
+# game (which loads everything) and draws one frame of the start screen
+CHILD_SCRIPT = """
+import collections, json, os, sys, time
+sys.path.insert(0, os.getcwd())
+import pygame
+presented = []
+flip = pygame.display.flip
+def timed_flip(*args):
+    flip(*args)
+    presented.append(time.monotonic())
+pygame.display.flip = timed_flip
+import main
+main.run_frame([], collections.defaultdict(bool))
+print(json.dumps({"first_frame": presented[0], "start_screen": presented[-1]}))
+"""
+
+
+def cold_start():
+    env = dict(os.environ, CHEMESCAPE_HEADLESS="1", CHEMESCAPE_LEADERBOARD="")
+    launched = time.monotonic() # CLOCK_MONOTONIC is shared by every process on the machine
+    output = subprocess.run([sys.executable, "-c", CHILD_SCRIPT], cwd=REPO_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    stamps = json.loads(output.strip().splitlines()[-1])
+    return stamps["first_frame"] - launched, stamps["start_screen"] - launched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time from launching ChemEscape to its first frame and start screen")
+    parser.add_argument("--runs", type=int, default=10, help="game launches to time (default 10)")
+    args = parser.parse_args()
+
+    first_frames, start_screens = [], []
+    for _ in range(args.runs):
+        first_frame, start_screen = cold_start()
+        first_frames.append(first_frame * 1000)
+        start_screens.append(start_screen * 1000)
+    first_frames.sort()
+    start_screens.sort()
+
+    print(f"Launches:      {args.runs}")
+    print(f"First frame:   median {first_frames[args.runs // 2]:.0f} ms  max {first_frames[-1]:.0f} ms")
+    print(f"Start screen:  median {start_screens[args.runs // 2]:.0f} ms  max {start_screens[-1]:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from text_input import BACKSPACE, CURSOR_LEFT, TextInput, TextLine
+
+# --- Text Input Benchmark ---
+# Time per keystroke to draw an input box while typing a long answer, with a few
+# typos fixed along the way: rendering the whole text again for every key, the
+# way the box used to be drawn, against a TextLine that only draws the glyphs
+# from the changed character on. Also shows how wide the rendered text gets.
+#
+#   python benchmarks/text_input_benchmark.py --length 200
+
+BOX_WIDTH = 560 # Answer box in the game, less its padding
+KEYSTROKES = 5000
+
+
+def make_keystrokes(length, rng):
+    keys = []
+    for _ in range(length):
+        keys.append(rng.choice(string.ascii_lowercase + "  "))
+        if rng.random() < 0.05: # Typo, fixed by going back, deleting and going forward again
+            keys += [CURSOR_LEFT, BACKSPACE, rng.choice(string.ascii_lowercase)]
+    return keys
+
+
+def time_keystrokes(keys, draw_box, max_length):
+    times = []
+    text_input = TextInput(max_length)
+    while len(times) < KEYSTROKES:
+        text_input.clear()
+        for key in keys:
+            start = time.perf_counter()
+            text_input.edit(key)
+            draw_box(text_input)
+            times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2] * 1e6, times[int(len(times) * 0.99)] * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time drawing an input box per keystroke")
+    parser.add_argument("--length", type=int, default=60, help="characters typed (default 60, the longest answer)")
+    args = parser.parse_args()
+
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    font = pygame.font.SysFont("arial", 20)
+    keys = make_keystrokes(args.length, random.Random(1))
+    box = pygame.Surface((BOX_WIDTH + 10, 30))
+    widest = [0]
+
+    def render_whole_text(text_input):
+        text_surface = font.render(text_input.text, True, (0, 0, 0))
+        widest[0] = max(widest[0], text_surface.get_width())
+        box.fill((255, 255, 255))
+        box.blit(text_surface, (5, 5))
+
+    text_line = TextLine(font, (0, 0, 0), (255, 255, 255), (BOX_WIDTH, font.get_height()))
+
+    def draw_changed_glyphs(text_input):
+        box.blit(text_line.update(text_input.text, text_input.cursor), (5, 5))
+
+    print(f"Typing {args.length} characters ({len(keys)} keys with typo fixes), times per key in us")
+    print(f"{'':<22} {'p50':>7} {'p99':>7}  text surface width")
+    p50, p99 = time_keystrokes(keys, render_whole_text, args.length)
+    print(f"{'whole text each key':<22} {p50:>7.1f} {p99:>7.1f}  up to {widest[0]} px")
+    p50, p99 = time_keystrokes(keys, draw_changed_glyphs, args.length)
+    print(f"{'changed glyphs only':<22} {p50:>7.1f} {p99:>7.1f}  {text_line.surface.get_width()} px, scrolled")
+
+
+if __name__ == "__main__":
+    main()
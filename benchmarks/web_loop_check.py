@@ -0,0 +1,168 @@
+import argparse
+import asyncio
+import functools
+import http.server
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import web_build
+
+# --- Web Loop Check ---
+# Runs the web build's code path headlessly (CHEMESCAPE_WEB=1) from a staged
+# bundle without the fetched assets, which are served from this checkout over
+# local HTTP with a delay, like a slow connection. The real main.main()
+# coroutine drives the game on an asyncio loop while this script:
+#   keeps input coming for a few seconds and times the frames (active pacing)
+#   runs a heartbeat every few ms to see how long the loop is ever held up
+#   goes quiet, then posts single events and times how soon a frame handles them
+# and checks the background and music arrive while frames keep their pace.
+# Exits with status 1 if any check fails.
+#
+#   python benchmarks/web_loop_check.py --active-seconds 5
+
+HEARTBEAT_SECONDS = 0.005
+IDLE_SAMPLES = 5
+
+
+class SlowAssetHandler(http.server.SimpleHTTPRequestHandler):
+    delay = 0.0
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_assets(delay):
+    SlowAssetHandler.delay = delay
+    handler = functools.partial(SlowAssetHandler, directory=REPO_DIR)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def heartbeat(lateness):
+    while True:
+        due = time.perf_counter() + HEARTBEAT_SECONDS
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        lateness.append(time.perf_counter() - due)
+
+
+async def drive(pygame, game, frame_times, args, results):
+    try:
+        await drive_phases(pygame, game, frame_times, args, results)
+    finally:
+        game.running = False # Stop the game even if a phase fails, rather than leave it running
+
+
+async def drive_phases(pygame, game, frame_times, args, results):
+    poke = lambda: pygame.event.post(pygame.event.Event(pygame.MOUSEMOTION, pos=(0, 0), rel=(0, 0), buttons=(0, 0, 0)))
+    while not frame_times:
+        await asyncio.sleep(0.01)
+
+    # Active: input every few frames keeps the full frame rate; play partway through
+    start_button = pygame.Rect(game.WIDTH // 2 - 75, game.HEIGHT - 100, 150, 50)
+    active_start = time.perf_counter()
+    first_frame = len(frame_times)
+    while time.perf_counter() - active_start < args.active_seconds:
+        if game.state.game_state == "START_SCREEN" and time.perf_counter() - active_start > args.active_seconds / 2:
+            pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1, pos=game.window_pos(start_button.center)))
+        else:
+            poke()
+        await asyncio.sleep(0.05)
+    results["active"] = frame_times[first_frame:]
+    results["playing"] = game.state.game_state == "PLAYING"
+
+    # Idle: once the scheduler has slowed down, time from an event to the frame that handles it
+    wake_latencies = []
+    for _ in range(IDLE_SAMPLES):
+        await asyncio.sleep(game.IDLE_GRACE_FRAMES / game.FPS + 0.3)
+        frames_before = len(frame_times)
+        posted = time.perf_counter()
+        poke()
+        while len(frame_times) == frames_before:
+            await asyncio.sleep(0.001)
+        wake_latencies.append(frame_times[frames_before] - posted)
+    results["wake"] = wake_latencies
+
+
+async def run_game(pygame, game, frame_times, args, results):
+    lateness = []
+    heartbeat_task = asyncio.ensure_future(heartbeat(lateness))
+    driver = asyncio.ensure_future(drive(pygame, game, frame_times, args, results))
+    try:
+        await game.main()
+    except SystemExit: # main() quits pygame and exits when the loop ends
+        pass
+    heartbeat_task.cancel()
+    await driver
+    results["lateness"] = lateness
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check frame pacing of the web build's async loop, headless")
+    parser.add_argument("--active-seconds", type=float, default=4.0, help="seconds of continuous input to time (default 4)")
+    parser.add_argument("--asset-delay", type=float, default=0.5, help="seconds the asset server waits before answering (default 0.5)")
+    args = parser.parse_args()
+
+    stage_dir = tempfile.mkdtemp(prefix="chemescape-web-")
+    bundle_size = web_build.stage(stage_dir)
+    server = serve_assets(args.asset_delay)
+    os.environ.update(CHEMESCAPE_HEADLESS="1", CHEMESCAPE_WEB="1", CHEMESCAPE_LEADERBOARD="",
+                      CHEMESCAPE_ASSET_URL=f"http://127.0.0.1:{server.server_address[1]}/")
+    os.chdir(stage_dir)
+    sys.path.insert(0, stage_dir)
+    import pygame
+    import main as game
+
+    frame_times = []
+    run_frame = game.run_frame
+
+    def timed_run_frame(*frame_args):
+        frame_times.append(time.perf_counter())
+        return run_frame(*frame_args)
+
+    game.run_frame = timed_run_frame
+    results = {}
+    asyncio.run(run_game(pygame, game, frame_times, args, results))
+    server.shutdown()
+    music_fetched = os.path.exists(os.path.join(stage_dir, game.MUSIC_PATH))
+    shutil.rmtree(stage_dir)
+
+    frame_seconds = 1 / game.FPS
+    active = results["active"]
+    intervals = [later - earlier for earlier, later in zip(active, active[1:])]
+    fps = len(intervals) / (active[-1] - active[0])
+    background_arrived = game.lab_bg.get_at((0, 0))[:3] != game.PLACEHOLDER_BACKGROUND_COLOR
+    checks = [
+        (f"active frame rate {fps:.1f} fps (target {game.FPS})", fps >= game.FPS * 0.9),
+        (f"p99 frame interval {percentile(intervals, 0.99) * 1000:.1f} ms", percentile(intervals, 0.99) < frame_seconds * 2),
+        (f"heartbeat lateness p99 {percentile(results['lateness'], 0.99) * 1000:.1f} ms, max {max(results['lateness']) * 1000:.1f} ms",
+         percentile(results["lateness"], 0.99) < frame_seconds),
+        (f"idle wake-up after an event, max {max(results['wake']) * 1000:.1f} ms", max(results["wake"]) < frame_seconds * 2),
+        ("game started from the start screen", results["playing"]),
+        ("background fetched and swapped in", background_arrived),
+        ("music fetched", music_fetched),
+    ]
+    print(f"Bundle {bundle_size / 1024:.0f} KB, assets served after {args.asset_delay:.1f} s, {len(active)} active frames")
+    for label, passed in checks:
+        print(f"{'ok  ' if passed else 'FAIL'}  {label}")
+    sys.exit(0 if all(passed for _, passed in checks) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# --- Elements ---
+# The periodic table, for puzzles that name elements and for working out and
+# checking escape codes. Symbols and names are kept in tuples indexed by atomic
+# number, with dictionaries from lower case symbols and names back to atomic
+# numbers, so every lookup is a single index or dictionary lookup. Alternative
+# spellings of names are accepted too.
+
+ELEMENT_DATA = (
+    "H Hydrogen", "He Helium", "Li Lithium", "Be Beryllium", "B Boron", "C Carbon", "N Nitrogen", "O Oxygen",
+    "F Fluorine", "Ne Neon", "Na Sodium", "Mg Magnesium", "Al Aluminium", "Si Silicon", "P Phosphorus", "S Sulfur",
+    "Cl Chlorine", "Ar Argon", "K Potassium", "Ca Calcium", "Sc Scandium", "Ti Titanium", "V Vanadium", "Cr Chromium",
+    "Mn Manganese", "Fe Iron", "Co Cobalt", "Ni Nickel", "Cu Copper", "Zn Zinc", "Ga Gallium", "Ge Germanium",
+    "As Arsenic", "Se Selenium", "Br Bromine", "Kr Krypton", "Rb Rubidium", "Sr Strontium", "Y Yttrium", "Zr Zirconium",
+    "Nb Niobium", "Mo Molybdenum", "Tc Technetium", "Ru Ruthenium", "Rh Rhodium", "Pd Palladium", "Ag Silver", "Cd Cadmium",
+    "In Indium", "Sn Tin", "Sb Antimony", "Te Tellurium", "I Iodine", "Xe Xenon", "Cs Caesium", "Ba Barium",
+    "La Lanthanum", "Ce Cerium", "Pr Praseodymium", "Nd Neodymium", "Pm Promethium", "Sm Samarium", "Eu Europium", "Gd Gadolinium",
+    "Tb Terbium", "Dy Dysprosium", "Ho Holmium", "Er Erbium", "Tm Thulium", "Yb Ytterbium", "Lu Lutetium", "Hf Hafnium",
+    "Ta Tantalum", "W Tungsten", "Re Rhenium", "Os Osmium", "Ir Iridium", "Pt Platinum", "Au Gold", "Hg Mercury",
+    "Tl Thallium", "Pb Lead", "Bi Bismuth", "Po Polonium", "At Astatine", "Rn Radon", "Fr Francium", "Ra Radium",
+    "Ac Actinium", "Th Thorium", "Pa Protactinium", "U Uranium", "Np Neptunium", "Pu Plutonium", "Am Americium", "Cm Curium",
+    "Bk Berkelium", "Cf Californium", "Es Einsteinium", "Fm Fermium", "Md Mendelevium", "No Nobelium", "Lr Lawrencium", "Rf Rutherfordium",
+    "Db Dubnium", "Sg Seaborgium", "Bh Bohrium", "Hs Hassium", "Mt Meitnerium", "Ds Darmstadtium", "Rg Roentgenium", "Cn Copernicium",
+    "Nh Nihonium", "Fl Flerovium", "Mc Moscovium", "Lv Livermorium", "Ts Tennessine", "Og Oganesson",
+) # In order of atomic number
+
+OTHER_SPELLINGS = {"aluminum": "Al", "sulphur": "S", "cesium": "Cs"}
+
+SYMBOLS = ("",) + tuple(entry.split()[0] for entry in ELEMENT_DATA) # SYMBOLS[6] == "C"
+NAMES = ("",) + tuple(entry.split()[1] for entry in ELEMENT_DATA) # NAMES[6] == "Carbon"
+ELEMENT_COUNT = len(ELEMENT_DATA)
+
+NUMBERS_BY_SYMBOL = {symbol.lower(): number for number, symbol in enumerate(SYMBOLS) if symbol}
+NUMBERS_BY_NAME = {name.lower(): number for number, name in enumerate(NAMES) if name}
+for spelling, symbol in OTHER_SPELLINGS.items():
+    NUMBERS_BY_NAME[spelling] = NUMBERS_BY_SYMBOL[symbol.lower()]
+
+
+def number_for_symbol(symbol):
+    # Atomic number of the element with this symbol (any case), or None
+    return NUMBERS_BY_SYMBOL.get(symbol.strip().lower())
+
+
+def number_for_name(name):
+    return NUMBERS_BY_NAME.get(name.strip().lower())
+
+
+def find_element(text):
+    # Atomic number of the element with this symbol or name, or None
+    key = text.strip().lower()
+    return NUMBERS_BY_SYMBOL.get(key) or NUMBERS_BY_NAME.get(key)
@@ -0,0 +1,295 @@
+import argparse
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+
+from game_logic import FrameInput, GameState, room_from_pack, time_taken, update
+from puzzle_generator import load_session_pack
+
+# --- Event Log ---
+# An append-only binary record of every game played. Each update step's input
+# (the start click, movement changes and typed keys) is stored along with what
+# it caused: puzzles opened, answers given, escape code attempts and the end of
+# the game. The game is stepped at a fixed tick rate and update() is
+# deterministic, so a session's input replays to exactly the same game. The
+# recorded outcomes are used to check that.
+#
+# File layout: MAGIC, then records. Each record is a RECORD header (type,
+# tick, payload length) followed by the payload. A SESSION record starts each
+# game, so one file can hold any number of games from any number of runs.
+#
+# The frame loop only appends to a bytearray. Full chunks are written to disk
+# by a background thread, so recording never waits on the disk.
+#
+#   python event_log.py games.log                  list sessions
+#   python event_log.py games.log --replay 3       replay and check session 3
+#   python event_log.py games.log --replay 3 --until 5000 --events
+
+MAGIC = b"CHEMLOG1"
+RECORD = struct.Struct("<BIH") # Event type, tick within the session, payload length
+
+SESSION, START, MOVE, TYPED, PUZZLE, ANSWER, ESCAPE, END = range(1, 9)
+EVENT_NAMES = {SESSION: "session", START: "start", MOVE: "move", TYPED: "typed",
+               PUZZLE: "puzzle", ANSWER: "answer", ESCAPE: "escape", END: "end"}
+
+SESSION_INFO = struct.Struct("<dHHH") # Wall clock start time, tick rate, character width and height
+MOVE_INFO = struct.Struct("<bb")
+PUZZLE_INFO = struct.Struct("<H")
+ANSWER_INFO = struct.Struct("<HB") # Puzzle id, correct, then the answer text
+ESCAPE_INFO = struct.Struct("<B") # Correct, then the code text
+END_INFO = struct.Struct("<II") # Seconds taken, total incorrect attempts
+
+FLUSH_BYTES = 4096 # Hand the buffer to the writer thread once it holds this much
+MAX_TEXT_LENGTH = 1024 # Longest text kept in a record, well within the 16-bit payload length
+
+
+def encode_text(text):
+    return text[:MAX_TEXT_LENGTH].encode("utf-8")
+
+
+# --- Recording ---
+class EventRecorder:
+    def __init__(self, path, tick_rate):
+        self.tick_rate = tick_rate
+        self.buffer = bytearray()
+        self.tick = 0 # Update steps recorded in the current session
+        self.flushed_tick = 0
+        self.move = (0, 0) # Held movement as of the last MOVE record
+        self.chunks = queue.SimpleQueue()
+
+        log_file = open(path, "ab")
+        if log_file.tell() == 0:
+            self.buffer += MAGIC
+        self.writer = threading.Thread(target=self._write_chunks, args=(log_file,), daemon=True)
+        self.writer.start()
+
+    def _write_chunks(self, log_file):
+        with log_file:
+            while True:
+                chunk = self.chunks.get()
+                if chunk is None:
+                    return
+                log_file.write(chunk)
+                log_file.flush()
+
+    def _append(self, event_type, payload=b""):
+        self.buffer += RECORD.pack(event_type, self.tick, len(payload))
+        self.buffer += payload
+
+    def flush(self):
+        if self.buffer:
+            self.chunks.put(bytes(self.buffer))
+            self.buffer.clear()
+        self.flushed_tick = self.tick
+
+    def close(self):
+        self.flush()
+        self.chunks.put(None)
+        self.writer.join()
+
+    def begin_session(self, state, pack_name):
+        # Start recording a new game; the state collects its events from here on
+        room = state.room
+        self.flush() # Whatever is left of the last game
+        self.tick = 0
+        self.flushed_tick = 0 # Ticks count from 0 again, so the once-a-second flush does too
+        self.move = (0, 0)
+        state.events = []
+        self._append(SESSION, SESSION_INFO.pack(time.time(), self.tick_rate, room.char_width, room.char_height)
+                     + encode_text(pack_name))
+
+    def record_input(self, inputs):
+        # Call with each update step's input, before the step
+        if inputs.start_game:
+            self._append(START)
+        if (inputs.move_x, inputs.move_y) != self.move:
+            self.move = (inputs.move_x, inputs.move_y)
+            self._append(MOVE, MOVE_INFO.pack(*self.move))
+        if inputs.typed:
+            self._append(TYPED, encode_text(inputs.typed))
+
+    def record_events(self, state):
+        # Call after each update step with what it caused
+        ended = False
+        for event in state.events:
+            self._append(*encode_outcome(event, state))
+            ended = ended or event[0] == "end"
+        state.events.clear()
+        self.tick += 1
+
+        # Written at least once a second of play, and as soon as a game ends
+        if len(self.buffer) >= FLUSH_BYTES or self.tick - self.flushed_tick >= self.tick_rate or ended:
+            self.flush()
+
+
+def encode_outcome(event, state):
+    kind = event[0]
+    if kind == "puzzle":
+        return PUZZLE, PUZZLE_INFO.pack(event[1])
+    if kind == "answer":
+        return ANSWER, ANSWER_INFO.pack(event[1], event[3]) + encode_text(event[2])
+    if kind == "escape":
+        return ESCAPE, ESCAPE_INFO.pack(event[2]) + encode_text(event[1])
+    return END, END_INFO.pack(time_taken(state), state.total_incorrect_attempts)
+
+
+# --- Reading ---
+def iter_records(log, offset=len(MAGIC)):
+    # Yield (offset, type, tick, payload) for each whole record; a record cut
+    # short by a crash ends the log
+    size = len(log)
+    while offset + RECORD.size <= size:
+        event_type, tick, length = RECORD.unpack_from(log, offset)
+        payload_start = offset + RECORD.size
+        if payload_start + length > size:
+            return
+        yield offset, event_type, tick, log[payload_start:payload_start + length]
+        offset = payload_start + length
+
+
+def describe(event_type, payload):
+    if event_type == SESSION:
+        wall_time, tick_rate, _, _ = SESSION_INFO.unpack_from(payload)
+        pack_name = payload[SESSION_INFO.size:].decode("utf-8")
+        return f"pack {pack_name}, {tick_rate} ticks/s, {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(wall_time))}"
+    if event_type == MOVE:
+        return "%d %d" % MOVE_INFO.unpack(payload)
+    if event_type == TYPED:
+        return repr(payload.decode("utf-8", "replace"))
+    if event_type == PUZZLE:
+        return str(PUZZLE_INFO.unpack(payload)[0])
+    if event_type == ANSWER:
+        puzzle_id, correct = ANSWER_INFO.unpack_from(payload)
+        return f"{puzzle_id} {payload[ANSWER_INFO.size:].decode('utf-8', 'replace')!r} {'correct' if correct else 'wrong'}"
+    if event_type == ESCAPE:
+        correct = ESCAPE_INFO.unpack_from(payload)[0]
+        return f"{payload[ESCAPE_INFO.size:].decode('utf-8', 'replace')!r} {'correct' if correct else 'wrong'}"
+    if event_type == END:
+        return "%d s, %d incorrect" % END_INFO.unpack(payload)
+    return ""
+
+
+class LogFile:
+    # A log opened with mmap, so only the pages a replay touches are read
+    def __init__(self, path):
+        with open(path, "rb") as log_file:
+            self.log = mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(path) else b""
+        if self.log[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a ChemEscape event log")
+        self.sessions = [offset for offset, event_type, _, _ in iter_records(self.log) if event_type == SESSION]
+
+    def session_records(self, number):
+        # Records of session number (1-based), its SESSION record first
+        start = self.sessions[number - 1]
+        for record in iter_records(self.log, start):
+            if record[1] == SESSION and record[0] != start:
+                return
+            yield record
+
+    def close(self):
+        if isinstance(self.log, mmap.mmap):
+            self.log.close()
+
+
+# --- Replay ---
+def replay_session(log_file, number, until=None, on_event=None):
+    # Step session number from its recorded input as fast as possible. Returns
+    # (final state, ticks stepped, first mismatch or None). A mismatch is
+    # (tick, recorded outcome, replayed outcome) where the replay went differently.
+    records = log_file.session_records(number)
+    _, _, _, payload = next(records)
+    _, tick_rate, char_width, char_height = SESSION_INFO.unpack_from(payload)
+    pack_name = payload[SESSION_INFO.size:].decode("utf-8")
+    room = room_from_pack(load_session_pack(pack_name), (char_width, char_height)) # Generated rooms are made again from their name
+
+    state = GameState(room)
+    state.events = []
+    tick_seconds = 1 / tick_rate
+    recorded = list(records)
+    move = (0, 0)
+    tick = 0
+    index = 0
+    mismatch = None
+    last_tick = recorded[-1][2] if recorded else 0
+    if until is not None:
+        last_tick = min(last_tick, until)
+
+    while tick <= last_tick:
+        # This tick's input, then the outcomes the recording expects from it
+        typed = ""
+        start_game = False
+        expected = []
+        while index < len(recorded) and recorded[index][2] == tick:
+            _, event_type, _, payload = recorded[index]
+            if event_type == START:
+                start_game = True
+            elif event_type == MOVE:
+                move = MOVE_INFO.unpack(payload)
+            elif event_type == TYPED:
+                typed += payload.decode("utf-8")
+            else:
+                expected.append((event_type, payload))
+            if on_event:
+                on_event(tick, event_type, payload)
+            index += 1
+
+        update(state, FrameInput(move[0], move[1], typed, start_game), tick_seconds)
+        replayed = [encode_outcome(event, state) for event in state.events]
+        state.events.clear()
+        if mismatch is None and replayed != expected:
+            mismatch = (tick, expected, replayed)
+        tick += 1
+
+    return state, tick, mismatch
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List or replay the games in a ChemEscape event log")
+    parser.add_argument("log", help="event log written with CHEMESCAPE_EVENT_LOG")
+    parser.add_argument("--replay", type=int, metavar="N", help="replay session N and check it against the recording")
+    parser.add_argument("--until", type=int, metavar="TICK", help="stop the replay after this tick and show the game state")
+    parser.add_argument("--events", action="store_true", help="print every recorded event while replaying")
+    args = parser.parse_args()
+
+    log_file = LogFile(args.log)
+    if args.replay is None:
+        for number, offset in enumerate(log_file.sessions, 1):
+            records = list(log_file.session_records(number))
+            ticks = records[-1][2] + 1
+            ended = any(event_type == END for _, event_type, _, _ in records)
+            print(f"{number:>4}  {describe(SESSION, records[0][3])}  {len(records)} records, "
+                  f"{ticks} ticks{'' if ended else ', unfinished'}")
+        log_file.close()
+        return
+
+    if not 1 <= args.replay <= len(log_file.sessions):
+        parser.error(f"session must be between 1 and {len(log_file.sessions)}")
+
+    def print_event(tick, event_type, payload):
+        print(f"{tick:>8}  {EVENT_NAMES.get(event_type, event_type):<7} {describe(event_type, payload)}")
+
+    start = time.perf_counter()
+    state, ticks, mismatch = replay_session(log_file, args.replay, args.until,
+                                            print_event if args.events else None)
+    elapsed = time.perf_counter() - start
+    game_seconds = state.clock
+    print(f"Replayed {ticks} ticks ({game_seconds:.1f} s of play) in {elapsed:.3f} s, "
+          f"{game_seconds / elapsed if elapsed else 0:,.0f}x real time")
+    if mismatch:
+        tick, expected, replayed = mismatch
+        print(f"MISMATCH at tick {tick}: recorded {[(EVENT_NAMES[t], describe(t, p)) for t, p in expected]}, "
+              f"replay gave {[(EVENT_NAMES[t], describe(t, p)) for t, p in replayed]}")
+    else:
+        print("Replay matches the recording")
+    if args.until is not None or mismatch:
+        for name in GameState.__slots__:
+            if name not in ("room", "puzzle_grid", "events"):
+                print(f"  {name} = {getattr(state, name)!r}")
+    log_file.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import csv
+import json
+import time
+from collections import deque
+
+import pygame
+
+# --- Frame Profiler ---
+# Opt-in timing of the stages of each frame. Functions are wrapped with timed()
+# so nothing is measured (or slowed down) unless profiling is switched on.
+# Keeps a rolling window for the on-screen graph and percentile table, and every
+# frame's samples for saving as CSV or as a Chrome trace (chrome://tracing, Perfetto).
+
+HISTORY_FRAMES = 300 # Rolling window for the graph and table, 5 seconds at 60 FPS
+MAX_SAMPLES = 100000 # Frames kept for saving, about half an hour at 60 FPS
+PANEL_REFRESH_FRAMES = 15 # The panel is re-rendered this often, not every frame
+GRAPH_HEIGHT = 60
+PANEL_WIDTH = 300
+TABLE_COLUMNS = (180, 235, 290) # Right edges of the p50, p95 and max columns
+TARGET_FRAME_MS = 1000 / 60
+
+PANEL_COLOR = (0, 0, 0, 190)
+TEXT_COLOR = (255, 255, 255)
+BAR_COLOR = (80, 200, 80)
+SLOW_BAR_COLOR = (230, 70, 70)
+TARGET_LINE_COLOR = (255, 215, 0)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class FrameProfiler:
+    def __init__(self, history_frames=HISTORY_FRAMES, max_samples=MAX_SAMPLES):
+        self.stage_names = [] # In the order they were first seen
+        self.history = deque(maxlen=history_frames) # (frame seconds, {stage: seconds})
+        self.samples = deque(maxlen=max_samples) # (frame start, frame seconds, [(stage, start, seconds), ...])
+        self.frame_start = None
+        self.frame_calls = []
+        self.panel = None
+        self.panel_age = 0
+
+    def timed(self, name, func):
+        # Wrap func so each call is recorded as a stage of the current frame
+        def timed_func(*args, **kwargs):
+            if self.frame_start is None:
+                return func(*args, **kwargs)
+            call_start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.frame_calls.append((name, call_start, time.perf_counter() - call_start))
+
+        timed_func.__name__ = getattr(func, "__name__", name)
+        timed_func.__wrapped__ = func
+        return timed_func
+
+    def begin_frame(self):
+        self.frame_start = time.perf_counter()
+        self.frame_calls = []
+
+    def end_frame(self):
+        if self.frame_start is None:
+            return
+        frame_seconds = time.perf_counter() - self.frame_start
+
+        stage_totals = {}
+        for name, _, seconds in self.frame_calls:
+            if name not in stage_totals and name not in self.stage_names:
+                self.stage_names.append(name)
+            stage_totals[name] = stage_totals.get(name, 0.0) + seconds
+
+        self.history.append((frame_seconds, stage_totals))
+        self.samples.append((self.frame_start, frame_seconds, self.frame_calls))
+        self.frame_start = None
+        self.panel_age += 1
+
+    def stage_percentiles(self):
+        # [(stage, p50 ms, p95 ms, max ms), ...] over the rolling window, frame total first
+        rows = [("frame", *self._percentiles([frame_seconds for frame_seconds, _ in self.history]))]
+        for name in self.stage_names:
+            rows.append((name, *self._percentiles([stages.get(name, 0.0) for _, stages in self.history])))
+        return rows
+
+    def _percentiles(self, seconds):
+        sorted_ms = sorted(value * 1000 for value in seconds)
+        return percentile(sorted_ms, 0.50), percentile(sorted_ms, 0.95), sorted_ms[-1] if sorted_ms else 0.0
+
+    # --- On-screen panel ---
+    def panel_rect(self, surface, font_obj):
+        height = GRAPH_HEIGHT + 20 + font_obj.get_linesize() * (len(self.stage_names) + 2)
+        return pygame.Rect(10, surface.get_height() - height - 10, PANEL_WIDTH, height)
+
+    def draw(self, surface, font_obj):
+        rect = self.panel_rect(surface, font_obj)
+        if self.panel is None or self.panel.get_size() != rect.size or self.panel_age >= PANEL_REFRESH_FRAMES:
+            self.panel = self._build_panel(rect.size, font_obj)
+            self.panel_age = 0
+        surface.blit(self.panel, rect)
+        return rect
+
+    def _build_panel(self, size, font_obj):
+        panel = pygame.Surface(size, pygame.SRCALPHA)
+        panel.fill(PANEL_COLOR)
+        width = size[0]
+
+        # Rolling frame time graph, one bar per frame, scaled so the 60 FPS budget sits halfway up
+        graph_top = 10
+        ms_per_pixel = TARGET_FRAME_MS * 2 / GRAPH_HEIGHT
+        frames = list(self.history)[-(width - 20):]
+        for x, (frame_seconds, _) in enumerate(frames):
+            frame_ms = frame_seconds * 1000
+            bar_height = min(GRAPH_HEIGHT, max(1, int(frame_ms / ms_per_pixel)))
+            color = SLOW_BAR_COLOR if frame_ms > TARGET_FRAME_MS else BAR_COLOR
+            pygame.draw.line(panel, color, (10 + x, graph_top + GRAPH_HEIGHT), (10 + x, graph_top + GRAPH_HEIGHT - bar_height))
+        target_y = graph_top + GRAPH_HEIGHT - int(TARGET_FRAME_MS / ms_per_pixel)
+        pygame.draw.line(panel, TARGET_LINE_COLOR, (10, target_y), (width - 10, target_y))
+
+        # Percentile table, numbers right-aligned in fixed columns
+        y = graph_top + GRAPH_HEIGHT + 8
+        line_height = font_obj.get_linesize()
+        rows = [("stage", "p50", "p95", "max")]
+        rows += [(name, f"{p50:.2f}", f"{p95:.2f}", f"{max_ms:.2f}") for name, p50, p95, max_ms in self.stage_percentiles()]
+        for name, *values in rows:
+            panel.blit(font_obj.render(name, True, TEXT_COLOR), (10, y))
+            for column_right, value in zip(TABLE_COLUMNS, values):
+                value_text = font_obj.render(value, True, TEXT_COLOR)
+                panel.blit(value_text, (column_right - value_text.get_width(), y))
+            y += line_height
+        return panel
+
+    # --- Saving ---
+    def save(self, path):
+        if path.endswith(".csv"):
+            self.write_csv(path)
+        else:
+            self.write_chrome_trace(path)
+
+    def write_csv(self, path):
+        # One row per frame: total frame time and the time spent in each stage, in ms
+        with open(path, "w", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["frame", "start_s", "frame_ms"] + self.stage_names)
+            for index, (frame_start, frame_seconds, calls) in enumerate(self.samples):
+                stage_totals = {}
+                for name, _, seconds in calls:
+                    stage_totals[name] = stage_totals.get(name, 0.0) + seconds
+                writer.writerow([index, f"{frame_start:.6f}", f"{frame_seconds * 1000:.4f}"]
+                                + [f"{stage_totals.get(name, 0.0) * 1000:.4f}" for name in self.stage_names])
+
+    def write_chrome_trace(self, path):
+        # Chrome trace event format: complete ("X") events with microsecond timestamps
+        events = []
+        for index, (frame_start, frame_seconds, calls) in enumerate(self.samples):
+            events.append({"name": "frame", "ph": "X", "pid": 1, "tid": 1,
+                           "ts": frame_start * 1e6, "dur": frame_seconds * 1e6, "args": {"frame": index}})
+            for name, call_start, seconds in calls:
+                events.append({"name": name, "ph": "X", "pid": 1, "tid": 1,
+                               "ts": call_start * 1e6, "dur": seconds * 1e6})
+        with open(path, "w") as trace_file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, trace_file)
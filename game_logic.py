@@ -0,0 +1,271 @@
+import pygame
+
+from answer_matching import build_answer_matchers
+from spatial_index import build_station_grid
+from text_input import TextInput
+
+# --- Game Logic ---
+# Everything about playing the game that doesn't involve drawing. A session is a
+# GameState; update(state, inputs, dt) advances it by one step using only its
+# arguments (no globals, no clock, no display), so many sessions can be stepped
+# side by side in one process. main.py renders a single GameState.
+#
+# The game is meant to be stepped at a fixed TICK_RATE whatever the render rate,
+# so movement speed and timing come out the same on slow and fast machines.
+
+# --- Constants ---
+ROOM_WIDTH, ROOM_HEIGHT = 800, 600
+TIMER_DURATION = 30 * 60  # 30 minutes in seconds
+TICK_RATE = 60 # Fixed update steps per second
+TICK_SECONDS = 1 / TICK_RATE
+
+CHAR_START_X, CHAR_START_Y = 50, 500 # Initial character position
+CHAR_SPEED = 240 # Pixels per second, 4 per update step
+PUZZLE_INTERACTION_RADIUS = 20
+
+# --- Escape Door Setup ---
+DOOR_X, DOOR_Y = 650, 500 # Example coordinates, adjust as needed
+DOOR_WIDTH, DOOR_HEIGHT = 100, 100 # Example size, adjust as needed
+
+ENTER = "\r" # Typed character that submits the input; see text_input.py for the editing keys
+MAX_ANSWER_LENGTH = 60 # Longest answer that can be typed; longer text scrolls in the box
+MAX_ESCAPE_CODE_LENGTH = 12
+
+SUCCESS_MESSAGE = "Congratulations! You have escaped the Lab!"
+INCORRECT_CODE_MESSAGE = "Incorrect Code. Try again."
+
+
+class Room:
+    # The fixed parts of a game shared by every session: puzzles, layout and escape code
+    __slots__ = ("puzzles", "positions", "escape_code", "escape_code_prompt", "answer_matchers",
+                 "door_rect", "char_width", "char_height", "width", "height")
+
+    def __init__(self, puzzles, positions, escape_code, escape_code_prompt, char_size,
+                 width=ROOM_WIDTH, height=ROOM_HEIGHT, code_from_initials=False):
+        self.puzzles = puzzles
+        self.positions = positions
+        self.escape_code = escape_code
+        self.escape_code_prompt = escape_code_prompt
+        self.answer_matchers = build_answer_matchers(puzzles, code_from_initials) # Compiled once, see answer_matching.py
+        self.door_rect = pygame.Rect(DOOR_X, DOOR_Y, DOOR_WIDTH, DOOR_HEIGHT)
+        self.char_width, self.char_height = char_size
+        self.width = width
+        self.height = height
+
+
+def room_from_pack(pack, char_size):
+    return Room(pack["puzzles"], pack["positions"], pack["escape_code"], pack["escape_code_prompt"], char_size,
+                code_from_initials=pack["code_from_initials"])
+
+
+class GameState:
+    __slots__ = ("room", "game_state", "clock", "char_x", "char_y", "prev_char_x", "prev_char_y",
+                 "solved_puzzles", "solved_count", "hint_delays", "incorrect_attempts_count", "puzzle_grid",
+                 "input_active", "user_input", "current_puzzle",
+                 "start_time", "end_time", "total_incorrect_attempts",
+                 "game_over", "escape_code_active", "escape_code_input", "escape_code_message", "events")
+
+    def __init__(self, room):
+        puzzle_count = len(room.puzzles)
+        self.room = room
+        self.game_state = "START_SCREEN" # "START_SCREEN", "PLAYING", "END_SCREEN"
+        self.clock = 0.0 # Seconds this session has been stepped for
+
+        self.char_x, self.char_y = float(CHAR_START_X), float(CHAR_START_Y)
+        self.prev_char_x, self.prev_char_y = self.char_x, self.char_y # Position before the last step, for interpolation
+
+        self.solved_puzzles = [False] * puzzle_count
+        self.solved_count = 0 # Kept alongside solved_puzzles so "all solved" doesn't rescan the list
+        self.hint_delays = [None] * puzzle_count # Clock time when hint can appear
+        self.incorrect_attempts_count = [0] * puzzle_count # Incorrect attempts per puzzle
+        # Collision index over the unsolved puzzles; puzzles are removed as they are solved
+        self.puzzle_grid = build_station_grid(room.positions, PUZZLE_INTERACTION_RADIUS)
+
+        self.input_active = False
+        self.user_input = TextInput(MAX_ANSWER_LENGTH)
+        self.current_puzzle = None
+        self.start_time = 0.0 # Clock time when the game started
+        self.end_time = 0.0 # Clock time when the game ended successfully
+        self.total_incorrect_attempts = 0 # Incorrect answers across all puzzles
+
+        self.game_over = False
+        self.escape_code_active = False
+        self.escape_code_input = TextInput(MAX_ESCAPE_CODE_LENGTH)
+        self.escape_code_message = '' # For correct/incorrect messages
+        self.events = None # List to collect what happens in each step into, for recording; None to not collect
+
+
+class FrameInput:
+    # Player input for one update step
+    __slots__ = ("move_x", "move_y", "typed", "start_game")
+
+    def __init__(self, move_x=0, move_y=0, typed="", start_game=False):
+        self.move_x = move_x # -1 left, 1 right, 0 still
+        self.move_y = move_y # -1 up, 1 down, 0 still
+        self.typed = typed # Characters typed this step, with ENTER and the text_input editing keys
+        self.start_game = start_game # Start button pressed
+
+
+NO_INPUT = FrameInput()
+
+
+# --- Queries ---
+def char_rect(state):
+    room = state.room
+    return pygame.Rect(round(state.char_x), round(state.char_y), room.char_width, room.char_height)
+
+
+def interpolated_char_pos(state, alpha):
+    # Where to draw the character when rendering alpha (0..1) of the way into the next step
+    x = state.prev_char_x + (state.char_x - state.prev_char_x) * alpha
+    y = state.prev_char_y + (state.char_y - state.prev_char_y) * alpha
+    return round(x), round(y)
+
+
+def log_event(state, *event):
+    # ("puzzle", id), ("answer", id, text, correct), ("escape", text, correct) or ("end",)
+    if state.events is not None:
+        state.events.append(event)
+
+
+def all_puzzles_solved(state):
+    return state.solved_count == len(state.room.puzzles)
+
+
+def time_left(state):
+    return max(0, TIMER_DURATION - int(state.clock - state.start_time))
+
+
+def time_taken(state):
+    return int(state.end_time - state.start_time)
+
+
+def hint_visible(state):
+    current_puzzle = state.current_puzzle
+    if current_puzzle is None or "hint" not in current_puzzle: # Hints are optional in puzzle packs
+        return False
+    i = current_puzzle["id"] - 1
+    # Check if hint should appear (2 or more incorrect attempts AND delay passed)
+    return (state.incorrect_attempts_count[i] >= 2 and state.hint_delays[i] is not None
+            and state.clock >= state.hint_delays[i])
+
+
+# --- Update Step ---
+def update(state, inputs, dt):
+    state.clock += dt
+    state.prev_char_x, state.prev_char_y = state.char_x, state.char_y
+
+    if state.game_state == "START_SCREEN":
+        if inputs.start_game:
+            state.game_state = "PLAYING"
+            state.start_time = state.clock # Start the timer when the game begins
+
+    elif state.game_state == "PLAYING":
+        # The success message is shown for one step before moving to the end screen
+        if state.game_over:
+            state.game_state = "END_SCREEN"
+            log_event(state, "end")
+            return state
+
+        for char in inputs.typed:
+            type_character(state, char)
+
+        # --- Character Movement (Always active in PLAYING state) ---
+        room = state.room
+        step = CHAR_SPEED * dt
+        state.char_x = max(0, min(room.width - room.char_width, state.char_x + inputs.move_x * step))
+        state.char_y = max(0, min(room.height - room.char_height, state.char_y + inputs.move_y * step))
+
+        check_collision(state)
+
+    return state
+
+
+def type_character(state, char):
+    if state.input_active: # If a puzzle is active
+        if char == ENTER:
+            handle_puzzle_input(state)
+        else:
+            state.user_input.edit(char)
+
+    elif state.escape_code_active: # If the escape code input is active
+        if char == ENTER:
+            handle_escape_code_input(state)
+        else:
+            state.escape_code_input.edit(char)
+
+
+def check_collision(state):
+    room = state.room
+    character_rect = char_rect(state)
+
+    # Check for puzzle collision
+    i = state.puzzle_grid.first_collision(character_rect)
+    colliding_with_unsolved_puzzle = i is not None
+    if colliding_with_unsolved_puzzle:
+        if not state.input_active or (state.current_puzzle is not None and state.current_puzzle["id"] - 1 != i):
+            state.current_puzzle = room.puzzles[i]
+            state.input_active = True
+            log_event(state, "puzzle", i + 1)
+            state.escape_code_active = False # Deactivate escape code input if a puzzle is activated
+            state.user_input.clear()
+
+    if not colliding_with_unsolved_puzzle and state.input_active and state.current_puzzle:
+        state.input_active = False
+        state.current_puzzle = None
+        state.user_input.clear()
+
+    # Check for escape door collision (only if all puzzles are solved)
+    if all_puzzles_solved(state):
+        if character_rect.colliderect(room.door_rect):
+            # Only activate escape code input if not already active and not already focused on a puzzle
+            if not state.input_active and not state.escape_code_active:
+                state.escape_code_active = True
+                state.escape_code_input.clear()
+                state.escape_code_message = room.escape_code_prompt
+        # The escape code box stays open once triggered, until answered or another puzzle is hit.
+    else: # If not all puzzles solved, ensure escape code input is off
+        state.escape_code_active = False
+        state.escape_code_input.clear()
+        state.escape_code_message = ''
+
+
+def handle_puzzle_input(state):
+    if state.current_puzzle is None:
+        state.input_active = False
+        return
+
+    i = state.current_puzzle["id"] - 1
+    correct = state.room.answer_matchers[i].matches(state.user_input.text)
+    log_event(state, "answer", i + 1, state.user_input.text, correct)
+    if correct:
+        state.solved_puzzles[i] = True
+        state.solved_count += 1
+        state.puzzle_grid.remove(i)
+        state.current_puzzle = None
+        state.input_active = False
+        state.user_input.clear()
+        state.incorrect_attempts_count[i] = 0 # Reset incorrect attempts for this puzzle
+        state.hint_delays[i] = None # Reset hint delay once solved
+    else:
+        state.user_input.clear()
+        state.incorrect_attempts_count[i] += 1 # Increment incorrect attempts for this puzzle
+        state.total_incorrect_attempts += 1 # Increment total incorrect attempts
+
+        # The hint appears immediately from the 2nd incorrect attempt on
+        if state.incorrect_attempts_count[i] >= 2 and state.hint_delays[i] is None:
+            state.hint_delays[i] = state.clock
+
+
+def handle_escape_code_input(state):
+    correct = state.escape_code_input.text.strip() == state.room.escape_code # Exact match, numbers so case doesn't matter
+    log_event(state, "escape", state.escape_code_input.text, correct)
+    if correct:
+        state.escape_code_message = SUCCESS_MESSAGE
+        state.game_over = True # Signal to transition to end screen
+        # escape_code_active stays on so the message is visible in the box for a moment.
+        state.end_time = state.clock # Record end time
+    else:
+        state.escape_code_message = INCORRECT_CODE_MESSAGE
+        state.escape_code_input.clear() # Clear input on incorrect attempt
+        state.total_incorrect_attempts += 1 # Count incorrect attempt for final code too
@@ -0,0 +1,245 @@
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+
+import pygame
+
+from game_logic import FrameInput, GameState, hint_visible, room_from_pack, time_left, time_taken, update
+from puzzle_packs import load_pack, pack_asset
+
+# --- Game Server ---
+# Hosts many escape-room sessions in one process for classroom events. Every
+# client connection gets its own GameState, and all of them are stepped together
+# by one asyncio tick loop. No pygame window is opened.
+#
+#   python game_server.py --port 8765 --tick-rate 30
+#
+# Clients connect over TCP and send one JSON object per line:
+#
+#   {"start": true}                 press the Start button
+#   {"move": [1, 0]}                held movement (-1, 0 or 1 per axis) until the next move message
+#   {"typed": "sodium\r"}           typed characters, "\r" for Enter and "\b" for Backspace
+#                                   (text_input.py has the codes for Delete, cursor keys and selection)
+#   {"reset": true}                 start a new session on the start screen
+#   {"stats": true}                 ask for the tick timings since the last stats request
+#
+# On connecting, the server sends {"welcome": ...} with the room layout and
+# questions. Answers, hints and the escape code are not sent; a puzzle's hint
+# comes in the "hint" field once the game would show it (after two wrong
+# answers), and goes back to null when it is hidden. After that, each tick
+# sends one line holding only the fields that changed since the last line, e.g.
+# {"tick":812,"pos":[154,140],"puzzle":1}. Nothing is sent for a session
+# that didn't change.
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_TICK_RATE = 30 # Updates per second; movement speed doesn't depend on it
+MAX_TYPED_PER_TICK = 64 # Characters kept per tick, so one client can't make a tick slow
+MAX_WRITE_BUFFER = 256 * 1024 # Clients that stop reading are dropped once this much is queued for them
+TICK_HISTORY = 3000 # Most tick timings kept between stats requests
+
+MISSING = object()
+
+
+def encode(message):
+    return (json.dumps(message, separators=(",", ":")) + "\n").encode()
+
+
+def snapshot(state):
+    # What a client needs to draw the session, as JSON-friendly values
+    snap = {
+        "screen": state.game_state,
+        "pos": [round(state.char_x), round(state.char_y)],
+        "solved": [i + 1 for i, solved in enumerate(state.solved_puzzles) if solved], # Solved puzzle ids
+        "puzzle": state.current_puzzle["id"] if state.input_active and state.current_puzzle else None,
+        "answer": state.user_input.text,
+        "answer_cursor": [state.user_input.anchor, state.user_input.cursor], # Selected from anchor to cursor
+        "hint": state.current_puzzle["hint"] if hint_visible(state) else None, # Only sent once it is shown
+        "wrong": state.total_incorrect_attempts,
+        "escape": state.escape_code_active,
+        "code": state.escape_code_input.text,
+        "code_cursor": [state.escape_code_input.anchor, state.escape_code_input.cursor],
+        "message": state.escape_code_message,
+    }
+    if state.game_state == "PLAYING":
+        snap["time_left"] = time_left(state)
+    elif state.game_state == "END_SCREEN":
+        snap["time_taken"] = time_taken(state)
+    return snap
+
+
+def diff(previous, current):
+    return {key: value for key, value in current.items() if previous.get(key, MISSING) != value}
+
+
+def room_info(room):
+    return {
+        "puzzles": [{key: puzzle[key] for key in ("id", "question")} for puzzle in room.puzzles],
+        "positions": room.positions,
+        "door": list(room.door_rect),
+        "escape_code_prompt": room.escape_code_prompt,
+        "char_size": [room.char_width, room.char_height],
+    }
+
+
+class Session:
+    # One connected player: their game and the input received since the last tick
+    __slots__ = ("id", "state", "writer", "move_x", "move_y", "typed", "start_game", "sent")
+
+    def __init__(self, session_id, room, writer):
+        self.id = session_id
+        self.state = GameState(room)
+        self.writer = writer
+        self.move_x = 0
+        self.move_y = 0
+        self.typed = ""
+        self.start_game = False
+        self.sent = {} # Last snapshot sent to the client
+
+    def take_input(self):
+        inputs = FrameInput(self.move_x, self.move_y, self.typed, self.start_game)
+        self.typed = ""
+        self.start_game = False
+        return inputs
+
+
+class GameServer:
+    def __init__(self, room, tick_rate=DEFAULT_TICK_RATE):
+        self.room = room
+        self.room_message = room_info(room)
+        self.tick_rate = tick_rate
+        self.tick_seconds = 1 / tick_rate
+        self.sessions = {} # id -> Session
+        self.next_id = 1
+        self.tick_count = 0
+        self.tick_times = deque(maxlen=TICK_HISTORY) # Seconds spent in each tick
+        self.late_ticks = 0 # Ticks that started after the next one was due
+        self.stats_since = (time.perf_counter(), time.process_time()) # Wall and CPU time of the last stats request
+
+    # --- Connections ---
+    async def handle_client(self, reader, writer):
+        session = Session(self.next_id, self.room, writer)
+        self.next_id += 1
+        self.sessions[session.id] = session
+        writer.write(encode({"welcome": {"session": session.id, "tick_rate": self.tick_rate, "room": self.room_message}}))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    writer.write(encode({"error": "invalid JSON"}))
+                    continue
+                if isinstance(message, dict):
+                    self.handle_message(session, message)
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass # Client went away or sent a line longer than the stream limit
+        finally:
+            self.sessions.pop(session.id, None)
+            writer.close()
+
+    def handle_message(self, session, message):
+        if "move" in message:
+            move = message["move"]
+            if isinstance(move, list) and len(move) == 2 and all(isinstance(value, int) for value in move):
+                session.move_x = max(-1, min(1, move[0]))
+                session.move_y = max(-1, min(1, move[1]))
+        if isinstance(message.get("typed"), str):
+            session.typed = (session.typed + message["typed"])[:MAX_TYPED_PER_TICK]
+        if message.get("start"):
+            session.start_game = True
+        if message.get("reset"):
+            session.state = GameState(self.room)
+            session.sent = {}
+        if message.get("stats"):
+            session.writer.write(encode({"stats": self.stats()}))
+
+    # --- Ticks ---
+    def tick(self):
+        self.tick_count += 1
+        for session in list(self.sessions.values()):
+            update(session.state, session.take_input(), self.tick_seconds)
+            current = snapshot(session.state)
+            changes = diff(session.sent, current)
+            if not changes:
+                continue
+            session.sent = current
+            changes["tick"] = self.tick_count
+            writer = session.writer
+            writer.write(encode(changes))
+            if writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+                self.sessions.pop(session.id, None)
+                writer.transport.abort()
+
+    async def run_ticks(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            tick_start = time.perf_counter()
+            self.tick()
+            self.tick_times.append(time.perf_counter() - tick_start)
+
+            next_tick += self.tick_seconds
+            delay = next_tick - loop.time()
+            if delay < 0:
+                self.late_ticks += 1
+                next_tick = loop.time() # Don't try to catch up on missed ticks
+                delay = 0
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        sorted_ms = sorted(seconds * 1000 for seconds in self.tick_times)
+        mean_ms = sum(sorted_ms) / len(sorted_ms) if sorted_ms else 0.0
+        wall, cpu = time.perf_counter(), time.process_time()
+        stats = {
+            "sessions": len(self.sessions),
+            "ticks": self.tick_count,
+            "tick_rate": self.tick_rate,
+            "mean_ms": mean_ms,
+            "p50_ms": sorted_ms[len(sorted_ms) // 2] if sorted_ms else 0.0,
+            "p99_ms": sorted_ms[int(len(sorted_ms) * 0.99)] if sorted_ms else 0.0,
+            "max_ms": sorted_ms[-1] if sorted_ms else 0.0,
+            "tick_budget_used": mean_ms / (self.tick_seconds * 1000), # Fraction of each tick spent stepping sessions
+            "cpu_used": (cpu - self.stats_since[1]) / (wall - self.stats_since[0]), # Fraction of one core, network included
+            "late_ticks": self.late_ticks,
+        }
+        self.tick_times.clear()
+        self.late_ticks = 0
+        self.stats_since = (wall, cpu)
+        return stats
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        server = await asyncio.start_server(self.handle_client, host, port)
+        print(f"Serving {len(self.room.puzzles)} puzzles on {host}:{port} at {self.tick_rate} ticks/s")
+        async with server:
+            await self.run_ticks()
+
+
+def load_room(pack_name):
+    pack = load_pack(pack_name)
+    # Only the image size is needed, so the character is loaded without a display
+    char_size = pygame.image.load(pack_asset(pack, "character", "assets/character.png")).get_size()
+    return room_from_pack(pack, char_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host many ChemEscape sessions in one process")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"address to listen on (default {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port to listen on (default {DEFAULT_PORT})")
+    parser.add_argument("--tick-rate", type=int, default=DEFAULT_TICK_RATE, help=f"updates per second (default {DEFAULT_TICK_RATE})")
+    parser.add_argument("--pack", default="lab", help="puzzle pack to play (default lab)")
+    args = parser.parse_args()
+
+    server = GameServer(load_room(args.pack), args.tick_rate)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import queue
+import sqlite3
+import threading
+import time
+
+# --- Leaderboard ---
+# Finished runs are kept in a local SQLite database in WAL mode. The game never
+# touches the database itself. It hands finished runs to a writer thread,
+# which saves them in batches, answers the end screen's questions for each run
+# and calls on_ready when the answers are in.
+#
+# Top-N lists come from the runs table through an index on (pack, time taken,
+# incorrect attempts). Percentiles come from time_counts, which holds one row
+# per pack and whole second of time taken. The timer only runs for 30 minutes,
+# so that's at most 1800 rows per pack however many runs are stored.
+
+TOP_COUNT = 5 # Runs in the end screen's top list
+MAX_BATCH = 500 # Most runs saved in one transaction
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    pack TEXT NOT NULL,
+    finished_at REAL NOT NULL,
+    time_taken INTEGER NOT NULL,
+    incorrect_attempts INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_by_time ON runs (pack, time_taken, incorrect_attempts);
+CREATE INDEX IF NOT EXISTS runs_by_incorrect ON runs (pack, incorrect_attempts, time_taken);
+CREATE TABLE IF NOT EXISTS time_counts (
+    pack TEXT NOT NULL,
+    time_taken INTEGER NOT NULL,
+    runs INTEGER NOT NULL,
+    PRIMARY KEY (pack, time_taken)
+) WITHOUT ROWID;
+"""
+
+
+def open_database(path):
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL") # WAL stays consistent; a power cut may lose the last runs
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def insert_runs(connection, runs):
+    # runs: [(pack, finished_at, time_taken, incorrect_attempts), ...], saved in one transaction
+    with connection:
+        connection.executemany("INSERT INTO runs (pack, finished_at, time_taken, incorrect_attempts) VALUES (?, ?, ?, ?)", runs)
+        connection.executemany("INSERT INTO time_counts (pack, time_taken, runs) VALUES (?, ?, 1) "
+                               "ON CONFLICT (pack, time_taken) DO UPDATE SET runs = runs + 1",
+                               [(pack, time_taken) for pack, _, time_taken, _ in runs])
+
+
+def top_runs(connection, pack, count=TOP_COUNT, by="time"):
+    # Best runs as (time_taken, incorrect_attempts, finished_at), fastest first or fewest mistakes first
+    order = "time_taken, incorrect_attempts" if by == "time" else "incorrect_attempts, time_taken"
+    return connection.execute(f"SELECT time_taken, incorrect_attempts, finished_at FROM runs "
+                              f"WHERE pack = ? ORDER BY {order} LIMIT ?", (pack, count)).fetchall()
+
+
+def time_rank(connection, pack, time_taken):
+    # (runs slower than time_taken, all runs) for the pack
+    slower, total = connection.execute("SELECT COALESCE(SUM(CASE WHEN time_taken > ? THEN runs END), 0), "
+                                       "COALESCE(SUM(runs), 0) FROM time_counts WHERE pack = ?",
+                                       (time_taken, pack)).fetchone()
+    return slower, total
+
+
+def time_at_percentile(connection, pack, fraction):
+    # Time taken that fraction (0..1) of the pack's runs finished within, or None with no runs
+    counts = connection.execute("SELECT time_taken, runs FROM time_counts WHERE pack = ? ORDER BY time_taken", (pack,)).fetchall()
+    target = fraction * sum(runs for _, runs in counts)
+    seen = 0
+    for time_taken, runs in counts:
+        seen += runs
+        if seen >= target:
+            return time_taken
+    return None
+
+
+class LeaderboardEntry:
+    # A submitted run; the rest is filled in by the writer thread, ready last
+    __slots__ = ("pack", "time_taken", "incorrect_attempts", "top", "slower", "total", "median", "ready")
+
+    def __init__(self, pack, time_taken, incorrect_attempts):
+        self.pack = pack
+        self.time_taken = time_taken
+        self.incorrect_attempts = incorrect_attempts
+        self.top = [] # top_runs() for the pack, this run included
+        self.slower = 0 # Runs slower than this one
+        self.total = 0 # Runs of this pack, this one included
+        self.median = None # Median time taken for the pack
+        self.ready = False
+
+
+class Leaderboard:
+    def __init__(self, path, top_count=TOP_COUNT, on_ready=None):
+        self.top_count = top_count
+        self.on_ready = on_ready # Called from the writer thread after each batch
+        self.connection = open_database(path)
+        self.entries = queue.SimpleQueue()
+        self.writer = threading.Thread(target=self._write_batches, daemon=True)
+        self.writer.start()
+
+    def submit_run(self, pack, time_taken, incorrect_attempts):
+        entry = LeaderboardEntry(pack, time_taken, incorrect_attempts)
+        self.entries.put(entry)
+        return entry
+
+    def close(self):
+        self.entries.put(None)
+        self.writer.join()
+        self.connection.close()
+
+    def _write_batches(self):
+        while True:
+            batch = [self.entries.get()]
+            while batch[-1] is not None and len(batch) < MAX_BATCH:
+                try:
+                    batch.append(self.entries.get_nowait())
+                except queue.Empty:
+                    break
+            closing = batch[-1] is None
+            entries = [entry for entry in batch if entry is not None]
+
+            if entries:
+                now = time.time()
+                insert_runs(self.connection, [(entry.pack, now, entry.time_taken, entry.incorrect_attempts) for entry in entries])
+                for entry in entries:
+                    entry.top = top_runs(self.connection, entry.pack, self.top_count)
+                    entry.slower, entry.total = time_rank(self.connection, entry.pack, entry.time_taken)
+                    entry.median = time_at_percentile(self.connection, entry.pack, 0.5)
+                    entry.ready = True
+                if self.on_ready:
+                    self.on_ready()
+            if closing:
+                return
@@ -1,14 +1,61 @@
 import pygame
+import asyncio
+import os
+import random
 import sys
+import threading
 import time
+from collections import OrderedDict
+from itertools import islice
+
+import game_logic
+from asset_fetch import fetch_asset
+from event_log import EventRecorder
+from frame_profiler import FrameProfiler
+from game_logic import ENTER, NO_INPUT, TICK_RATE, TICK_SECONDS, FrameInput, GameState, all_puzzles_solved, hint_visible, interpolated_char_pos, room_from_pack, time_left, time_taken, update
+from leaderboard import Leaderboard
+from puzzle_generator import (GENERATED_MARK, PuzzleGenerator, generated_pack, generated_pack_name, load_stream_position, read_word_list,
+                              save_stream_position, take_room)
+from puzzle_packs import load_pack, pack_asset
+from scene_graph import Scene, SceneNode
+from text_input import (BACKSPACE, CURSOR_END, CURSOR_HOME, CURSOR_LEFT, CURSOR_RIGHT, CURSOR_WIDTH, DELETE, SELECT_ALL,
+                        SELECT_END, SELECT_HOME, SELECT_LEFT, SELECT_RIGHT, TextLine, printable_text)
+
+# Headless mode runs without a window or sound card, for scripted runs and benchmarks
+HEADLESS = os.environ.get("CHEMESCAPE_HEADLESS") == "1"
+# The browser build (pygbag, see web_build.py) has no threads and must never block,
+# and fetches its biggest assets after the first frame. CHEMESCAPE_WEB=1 runs the
+# same code path anywhere, to check it locally.
+WEB = sys.platform == "emscripten" or os.environ.get("CHEMESCAPE_WEB") == "1"
+if HEADLESS:
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
 
 pygame.init()
 pygame.mixer.init()
 
 # --- Constants ---
 WIDTH, HEIGHT = 800, 600
-FPS = 60
-TIMER_DURATION = 30 * 60  # 30 minutes in seconds
+FPS = int(os.environ.get("CHEMESCAPE_FPS", 60)) # Render rate; the game itself always updates at game_logic.TICK_RATE
+MAX_FRAME_TIME = 2.0 # Longest gap between frames the game catches up on (idle frames can be a second apart), so a stall doesn't fast-forward play
+
+# Rendering options
+DIRTY_RECTS = os.environ.get("CHEMESCAPE_DIRTY_RECTS") == "1" # Only push changed regions to the display while PLAYING
+DEBUG_ALLOCATIONS = os.environ.get("CHEMESCAPE_DEBUG_ALLOCS") == "1" # Print frames that allocate surfaces
+IDLE_THROTTLE = os.environ.get("CHEMESCAPE_IDLE_THROTTLE", "1") == "1" # Sleep between frames while nothing is happening
+STARTUP_REPORT = os.environ.get("CHEMESCAPE_STARTUP_REPORT") == "1" # Print how long each asset took to load
+PUZZLE_PACK = os.environ.get("CHEMESCAPE_PACK", "lab") # Pack name under packs/, or a path to a pack folder
+GENERATE_PUZZLES = os.environ.get("CHEMESCAPE_GENERATE") == "1" # New element-symbol puzzles every game, in the pack's layout; see puzzle_generator.py
+GENERATE_SEED = os.environ.get("CHEMESCAPE_GENERATE_SEED") # Same seed, same rooms in the same order; by default the saved one, or random
+GENERATE_STATE = os.environ.get("CHEMESCAPE_GENERATE_STATE", "generated_rooms.json") # Seed and next room kept between launches, so rooms don't repeat from one game to the next; empty to start afresh every launch
+PROFILE = os.environ.get("CHEMESCAPE_PROFILE") == "1" # Time each stage of the frame; F3 toggles the on-screen panel
+PROFILE_OUT = os.environ.get("CHEMESCAPE_PROFILE_OUT") # Save profiled frames on exit: .csv, or anything else for a Chrome trace
+EVENT_LOG = os.environ.get("CHEMESCAPE_EVENT_LOG") # Append every game's input and answers to this file, see event_log.py
+LEADERBOARD = os.environ.get("CHEMESCAPE_LEADERBOARD", "" if WEB else "leaderboard.db") # SQLite file of finished runs; empty to turn off (always off on the web, which has no threads)
+ASSET_URL = os.environ.get("CHEMESCAPE_ASSET_URL", "") # Where the web build fetches assets left out of its bundle; by default next to the page
+WINDOW_MODE = os.environ.get("CHEMESCAPE_WINDOW", "fixed") # "fixed", "resizable" or "fullscreen"; F11 switches fullscreen on and off
+WINDOW_SIZE = tuple(int(value) for value in os.environ.get("CHEMESCAPE_WINDOW_SIZE", f"{WIDTH}x{HEIGHT}").split("x")) # Window size when not fullscreen
+SMOOTH_SCALING = os.environ.get("CHEMESCAPE_SMOOTH_SCALING", "1") == "1" # Filter the frame when scaling it to the window; off is faster but blocky
 
 # Colors
 WHITE = (255, 255, 255)
@@ -21,95 +68,437 @@ BLUE = (50, 50, 200) # For button background
 DARK_BLUE = (20, 20, 150) # For button hover
 GOLD = (255, 215, 0) # For congratulatory text
 HINT_BOX_COLOR = (255, 255, 220) # Light yellow for hint box
+SELECTION_COLOR = (170, 200, 255) # Light blue behind selected text in input boxes
+PLACEHOLDER_BACKGROUND_COLOR = (90, 90, 100) # Room background while the web build is still fetching the real one
 
 # --- Setup ---
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
+# The game is always drawn at WIDTH x HEIGHT onto `screen`, so positions, the door
+# and the overlay boxes stay in those coordinates whatever the window size. When
+# the window is exactly that size, screen is the window itself. Otherwise
+# (resized, fullscreen or a projector's resolution) screen is an offscreen frame
+# that is scaled to the window once per frame, letterboxed to keep its shape.
+# Images and text are never rescaled; the letterbox layout is only worked out
+# again when the window changes size.
 pygame.display.set_caption("ChemEscape - Lab Escape Game")
 clock = pygame.time.Clock()
 
+window = None # The display surface
+window_mode = WINDOW_MODE
+windowed_size = WINDOW_SIZE # Size to go back to when leaving fullscreen
+frame_surface = None # Offscreen WIDTH x HEIGHT frame, made the first time the window isn't that size
+viewport = pygame.Rect(0, 0, WIDTH, HEIGHT) # Where the frame is shown in the window
+viewport_surface = None # Subsurface of the window at viewport, scaled into directly
+border_rects = [] # Letterbox bars around the viewport
+
+
+def open_window(mode, size=None):
+    global window_mode
+    window_mode = mode
+    if mode == "fullscreen":
+        pygame.display.set_mode((0, 0), pygame.FULLSCREEN) # The display's own resolution
+    else:
+        pygame.display.set_mode(size, pygame.RESIZABLE if mode == "resizable" else 0)
+    window_resized()
+
+
+def toggle_fullscreen():
+    if window_mode == "fullscreen":
+        open_window("fixed" if WINDOW_MODE == "fixed" else "resizable", windowed_size)
+    else:
+        open_window("fullscreen")
+
+
+def window_resized():
+    # Point screen at the window, or at the offscreen frame and work out the letterbox
+    global window, screen, frame_surface, viewport, viewport_surface, border_rects, windowed_size
+    window = pygame.display.get_surface()
+    window_rect = window.get_rect()
+    if window_mode != "fullscreen":
+        windowed_size = window_rect.size
+    if window_rect.size == (WIDTH, HEIGHT):
+        screen = window
+        viewport = window_rect
+        viewport_surface = None
+        border_rects = []
+        return
+
+    if frame_surface is None:
+        frame_surface = pygame.Surface((WIDTH, HEIGHT)).convert()
+    screen = frame_surface
+    scale = min(window_rect.width / WIDTH, window_rect.height / HEIGHT)
+    viewport = pygame.Rect(0, 0, round(WIDTH * scale), round(HEIGHT * scale))
+    viewport.center = window_rect.center
+    viewport_surface = window.subsurface(viewport)
+    border_rects = [rect for rect in (
+        pygame.Rect(0, 0, window_rect.width, viewport.top), # Above
+        pygame.Rect(0, viewport.bottom, window_rect.width, window_rect.height - viewport.bottom), # Below
+        pygame.Rect(0, viewport.top, viewport.left, viewport.height), # Left
+        pygame.Rect(viewport.right, viewport.top, window_rect.width - viewport.right, viewport.height), # Right
+    ) if rect.width > 0 and rect.height > 0]
+
+
+def present_display(dirty_rects=None):
+    # Show the finished frame; dirty_rects are the parts of screen that changed, or None for all of it
+    if screen is window:
+        if dirty_rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(dirty_rects)
+        return
+
+    if SMOOTH_SCALING:
+        pygame.transform.smoothscale(screen, viewport.size, viewport_surface)
+    else:
+        pygame.transform.scale(screen, viewport.size, viewport_surface)
+    if dirty_rects is None:
+        for rect in border_rects:
+            window.fill(BLACK, rect)
+        pygame.display.flip()
+    else:
+        pygame.display.update([window_rect(rect) for rect in dirty_rects])
+
+
+def window_rect(rect):
+    # The window area showing rect of the frame, with a pixel spare for filtering at the edges
+    scale = viewport.width / WIDTH
+    left = viewport.x + int(rect.left * scale) - 1
+    top = viewport.y + int(rect.top * scale) - 1
+    return pygame.Rect(left, top, int(rect.width * scale) + 3, int(rect.height * scale) + 3).clip(viewport)
+
+
+def logical_pos(pos):
+    # Window coordinates (mouse positions) to the WIDTH x HEIGHT frame's coordinates
+    if screen is window:
+        return pos
+    return ((pos[0] - viewport.x) * WIDTH // viewport.width, (pos[1] - viewport.y) * HEIGHT // viewport.height)
+
+
+def window_pos(pos):
+    if screen is window:
+        return pos
+    return (viewport.x + pos[0] * viewport.width // WIDTH, viewport.y + pos[1] * viewport.height // HEIGHT)
+
+
+open_window(WINDOW_MODE, WINDOW_SIZE)
+
 # Fonts
-font = pygame.font.SysFont('arial', 20)
-small_font = pygame.font.SysFont('arial', 14) # Smaller font for puzzle indicators
-large_font = pygame.font.SysFont('arial', 40, bold=True) # For congratulations message
-title_font = pygame.font.SysFont('arial', 60, bold=True) # For game title # FIX: Changed SysSysFont to SysFont
-stats_font = pygame.font.SysFont('arial', 28) # For end screen stats
-
-# Puzzle Question Font
-try:
-    comic_sans_font = pygame.font.SysFont('Comic Sans MS', 24, bold=True) # Larger and bold for questions
-    hint_font = pygame.font.SysFont('Comic Sans MS', 20) # Slightly smaller for hints
-except:
-    comic_sans_font = pygame.font.SysFont('arial', 24, bold=True) # Fallback if Comic Sans isn't available
-    hint_font = pygame.font.SysFont('arial', 20) # Fallback for hints
+# Looked up on the loader thread at startup (see Startup Loading below), since
+# the first SysFont call scans every font installed on the machine.
+def load_fonts():
+    global font, small_font, large_font, title_font, stats_font, comic_sans_font, hint_font
+    font = pygame.font.SysFont('arial', 20)
+    small_font = pygame.font.SysFont('arial', 14) # Smaller font for puzzle indicators
+    large_font = pygame.font.SysFont('arial', 40, bold=True) # For congratulations message
+    title_font = pygame.font.SysFont('arial', 60, bold=True) # For game title # FIX: Changed SysSysFont to SysFont
+    stats_font = pygame.font.SysFont('arial', 28) # For end screen stats
+
+    # Puzzle Question Font
+    try:
+        comic_sans_font = pygame.font.SysFont('Comic Sans MS', 24, bold=True) # Larger and bold for questions
+        hint_font = pygame.font.SysFont('Comic Sans MS', 20) # Slightly smaller for hints
+    except:
+        comic_sans_font = pygame.font.SysFont('arial', 24, bold=True) # Fallback if Comic Sans isn't available
+        hint_font = pygame.font.SysFont('arial', 20) # Fallback for hints
 
 # --- Assets ---
-lab_bg = pygame.image.load("assets/lab.png")
-character_img = pygame.image.load("assets/character.png")
-pygame.mixer.music.load("assets/music.ogg")
-pygame.mixer.music.play(-1)
-
-# --- Character Setup ---
-char_x, char_y = 50, 500  # Initial character position
-char_speed = 4
-
-# --- Puzzle System ---
-puzzles = [
-    {"id": 1, "question": "Rearrange the symbols for Boron, Nitrogen, Carbon, Argon and Oxygen to form the name of which element?\nHint: It is pretty common.", "answer": "Carbon"},
-    {"id": 2, "question": "If a substance sublimated, then precipitated, then melted, then froze; which state of matter was it in the most times?", "answer": "Solid", "hint": "There are only 3 possibilities"},
-    {"id": 3, "question": "If we reacted Sodium Hydoxide (NaOH) with Hydrochloric Acid (HCl), we would get water and what other common substance?", "answer": "Salt", "hint": "It has four letters and you would find it in fish and chips."},
-    {"id": 4, "question": "As you heat a substance its particles gain what type of energy? Take the first letter of the name of this type of energy and write the name of the element that has it as a symbol.", "answer": "Potassium", "hint": "Bananas"},
-    {"id": 5, "question": "Spell the word formed from these chemical element symbols: Carbon, Americium, Phosphorus.", "answer": "Camp", "hint": "It happened in Term 1"},
-    {"id": 6, "question": "What turns red in an acid, blue in a base and green in water? ", "answer": "Universal Indicator", "hint": "Bigger than a solar system indicator."},
-    {"id": 7, "question": "If a substance behaves as both a solid and a liquid depending on what is done to it, what type of substance is it?", "answer": "Non-Newtonian", "hint": "It’s not non-einsteinian"},
-    {"id": 8, "question": "If you put an empty can upside down in ice water it will collapse because the ________ outside the can is greater than it is inside.", "answer": "Pressure", "hint": "You might feel it if you start to run out of time in this game."},
-    {"id": 9, "question": "Combustion is the chemical reaction occurs when a substance reacts with which element?", "answer": "Oxygen", "hint": "Breathe"},
-    {"id": 10, "question": "What four letter word is shared by both softball and soap?", "answer": "Base", "hint": "Not the type of guitar or the fish"},
+# Images are loaded from disk once and converted to the display's pixel format,
+# so blitting them every frame doesn't have to convert pixels on the fly.
+# Converted (and optionally pre-scaled) copies are cached for any screen to reuse.
+raw_image_cache = {} # path -> surface as loaded from disk
+asset_cache = {} # (path, alpha, size) -> converted surface
+asset_timings = [] # (asset, step, seconds) for the startup report
+
+
+def decode_image(path):
+    # Safe to call from the loader thread: only decodes, doesn't touch the display
+    raw_image = raw_image_cache.get(path)
+    if raw_image is None:
+        load_start = time.perf_counter()
+        raw_image = pygame.image.load(path)
+        asset_timings.append((path, "load", time.perf_counter() - load_start))
+        raw_image_cache[path] = raw_image
+    return raw_image
+
+
+def load_image(path, alpha=False, size=None):
+    key = (path, alpha, size)
+    image = asset_cache.get(key)
+    if image is not None:
+        return image
+
+    raw_image = decode_image(path)
+    convert_start = time.perf_counter()
+    # Convert first: smoothscale only takes 24 or 32-bit surfaces, and pack images can be palettized
+    image = raw_image.convert_alpha() if alpha else raw_image.convert()
+    if size is not None and image.get_size() != size:
+        image = pygame.transform.smoothscale(image, size) # Keeps the converted pixel format
+    asset_timings.append((path, f"convert {image.get_size()[0]}x{image.get_size()[1]}", time.perf_counter() - convert_start))
+
+    asset_cache[key] = image
+    return image
+
+
+def load_music(path):
+    load_start = time.perf_counter()
+    pygame.mixer.music.load(path)
+    asset_timings.append((path, "load", time.perf_counter() - load_start))
+
+
+def print_startup_report():
+    print("Asset startup timings:")
+    for asset, step, seconds in asset_timings:
+        print(f"  {asset:<24} {step:<16} {seconds * 1000:8.2f} ms")
+    print(f"  {'total':<41} {sum(seconds for _, _, seconds in asset_timings) * 1000:8.2f} ms")
+
+
+# --- Startup Loading ---
+# The window shows a loading screen from the very first frame, drawn with
+# pygame's built-in font, while a loader thread does the slow part of startup:
+# looking up system fonts, reading the puzzle pack, decoding images and opening
+# the music. Converting images to the display's format stays on this thread.
+# The loading screen's text is rendered before the loader starts, so the two
+# threads never use the font library at the same time.
+LOADING_FPS = 30
+LOADING_BAR_RECT = pygame.Rect(WIDTH // 4, HEIGHT // 2 + 40, WIDTH // 2, 16)
+MUSIC_PATH = "assets/music.ogg"
+
+
+def load_active_pack():
+    # Only the active room's puzzle pack is loaded; see puzzle_packs.py for the format
+    global active_pack
+    active_pack = load_pack(PUZZLE_PACK)
+
+
+def load_puzzle_generator():
+    # Endless stream of generated puzzles; each game takes the next room's worth.
+    # Carries on from the room after the last launch's, unless a different seed is asked for.
+    global puzzle_stream, generate_seed, room_number
+    if not GENERATE_PUZZLES:
+        return
+    saved = load_stream_position(GENERATE_STATE) if GENERATE_STATE else None
+    if GENERATE_SEED is not None and (saved is None or saved[0] != int(GENERATE_SEED)):
+        generate_seed, room_number = int(GENERATE_SEED), 0
+    elif saved is not None:
+        generate_seed, room_number = saved
+    else:
+        generate_seed, room_number = random.randrange(1 << 30), 0
+    puzzles_before = room_number * len(active_pack["positions"])
+    puzzle_stream = islice(PuzzleGenerator(read_word_list()).puzzles(generate_seed), puzzles_before, None)
+
+
+def background_path():
+    return pack_asset(active_pack, "background", "assets/lab.png")
+
+
+def decode_pack_images():
+    decode_image(pack_asset(active_pack, "character", "assets/character.png"))
+    if not WEB: # The web build fetches it later, see load_deferred_assets
+        decode_image(background_path())
+
+
+STARTUP_STEPS = [ # (loading screen label, step), run in order on the loader thread
+    ("Finding fonts...", load_fonts),
+    ("Reading puzzles...", load_active_pack),
+    ("Generating puzzles...", load_puzzle_generator),
+    ("Loading images...", decode_pack_images),
 ]
+if not WEB:
+    STARTUP_STEPS.append(("Loading music...", lambda: load_music(MUSIC_PATH)))
+startup_progress = {"done": 0, "error": None} # Written by the loader thread
+
+
+def run_startup_steps():
+    try:
+        for _, step in STARTUP_STEPS:
+            step()
+            startup_progress["done"] += 1
+    except Exception as error:
+        startup_progress["error"] = error
+
+
+def draw_loading_screen(title_text, label_texts):
+    done = startup_progress["done"]
+    screen.fill(BLACK)
+    screen.blit(title_text, title_text.get_rect(center=(WIDTH // 2, HEIGHT // 4)))
+    pygame.draw.rect(screen, WHITE, LOADING_BAR_RECT, 1)
+    filled_rect = LOADING_BAR_RECT.inflate(-4, -4)
+    filled_rect.width = filled_rect.width * done // len(STARTUP_STEPS)
+    screen.fill(BLUE, filled_rect)
+    label_text = label_texts[min(done, len(label_texts) - 1)]
+    screen.blit(label_text, label_text.get_rect(center=(WIDTH // 2, LOADING_BAR_RECT.bottom + 20)))
+
+
+def run_startup():
+    loading_title = pygame.font.Font(None, 72).render("ChemEscape", True, WHITE)
+    loading_font = pygame.font.Font(None, 24)
+    label_texts = [loading_font.render(label, True, WHITE) for label, _ in STARTUP_STEPS]
+
+    if WEB:
+        # No threads in the browser, and what is left to load there is quick
+        draw_loading_screen(loading_title, label_texts)
+        present_display()
+        run_startup_steps()
+    else:
+        loader = threading.Thread(target=run_startup_steps, daemon=True)
+        loader.start()
+        while True:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    sys.exit()
+            loading = loader.is_alive()
+            draw_loading_screen(loading_title, label_texts)
+            present_display()
+            if not loading:
+                break
+            loader.join(1 / LOADING_FPS) # Next loading frame, or straight on once loading finishes
 
-puzzle_positions = [(150, 150), (300, 120), (450, 140), (600, 150),
-                    (160, 300), (300, 350), (450, 330), (600, 300),
-                    (250, 500), (500, 500)]
+    if startup_progress["error"] is not None:
+        raise startup_progress["error"]
 
-solved_puzzles = [False] * len(puzzles)
-hint_delays = [0] * len(puzzles) # Time when hint can appear
-incorrect_attempts_count = [0] * len(puzzles) # New: track incorrect attempts per puzzle
 
-input_active = False
-user_input = ''
-current_puzzle = None
-start_time = 0 # Will be set when game starts
-end_time = 0 # Will be set when game ends successfully
-total_incorrect_attempts = 0 # New: total incorrect answers across all puzzles
+run_startup()
 
-game_over = False # New state for game completion
-escape_code_active = False # New state for escape code input
-escape_code_input = ''
-escape_code_message = '' # For correct/incorrect messages
+if WEB:
+    lab_bg = pygame.Surface((WIDTH, HEIGHT)).convert() # Plain until the real background arrives
+    lab_bg.fill(PLACEHOLDER_BACKGROUND_COLOR)
+else:
+    lab_bg = load_image(background_path(), size=(WIDTH, HEIGHT)) # Opaque, pre-scaled to the window
+    pygame.mixer.music.play(-1)
+character_img = load_image(pack_asset(active_pack, "character", "assets/character.png"), alpha=True)
 
-# CHANGED THE FINAL PUZZLE MESSAGE
-ESCAPE_CODE_PROMPT = "Take the first letter of each of your answers. Find out the atomic numbers of each of the elements with the symbol corresponding to these letters and add them together. What is the answer?"
-ESCAPE_CODE = "190" # The actual escape code
 
-# --- Escape Door Setup ---
-DOOR_X, DOOR_Y = 650, 500 # Example coordinates, adjust as needed
-DOOR_WIDTH, DOOR_HEIGHT = 100, 100 # Example size, adjust as needed
-door_rect = pygame.Rect(DOOR_X, DOOR_Y, DOOR_WIDTH, DOOR_HEIGHT)
+async def load_deferred_assets():
+    # Web build: fetch the background and music once the game is on screen, and swap them in
+    try:
+        await fetch_asset(background_path(), ASSET_URL)
+        lab_bg.blit(load_image(background_path(), size=(WIDTH, HEIGHT)), (0, 0))
+        repaint_scene()
+        mark_frame_active() # Show it now rather than at the next idle wake-up
+        await fetch_asset(MUSIC_PATH, ASSET_URL)
+        load_music(MUSIC_PATH)
+        pygame.mixer.music.play(-1)
+    except Exception as error:
+        print(f"Playing without some assets, fetching failed: {error}")
+
+if STARTUP_REPORT:
+    print_startup_report()
 
 # --- Game State ---
-game_state = "START_SCREEN" # "START_SCREEN", "PLAYING", "GAME_OVER", "END_SCREEN"
+# The session being played. The rules live in game_logic.py; this file only draws
+# the state and turns pygame events into game_logic.FrameInput.
+def next_room():
+    # The pack's room, or a freshly generated one for every game
+    global session_pack_name, room_number
+    if not GENERATE_PUZZLES:
+        session_pack_name = PUZZLE_PACK
+        return room_from_pack(active_pack, character_img.get_size())
+    session_pack_name = generated_pack_name(PUZZLE_PACK, generate_seed, room_number) # Enough to make the room again for replays
+    room_number += 1
+    if GENERATE_STATE:
+        save_stream_position(GENERATE_STATE, generate_seed, room_number) # Saved straight away, so a crash can't hand this room out again
+    pack = generated_pack(active_pack, take_room(puzzle_stream, len(active_pack["positions"])), session_pack_name)
+    return room_from_pack(pack, character_img.get_size())
+
+
+room = next_room()
+state = GameState(room)
+puzzles = room.puzzles
+ESCAPE_CODE_PROMPT = room.escape_code_prompt
+
+recorder = EventRecorder(EVENT_LOG, TICK_RATE) if EVENT_LOG else None
+if recorder:
+    recorder.begin_session(state, session_pack_name)
+
+# Finished runs are saved and ranked on the leaderboard's own thread, which
+# wakes the frame loop with this event when the end screen's numbers are ready
+LEADERBOARD_READY = pygame.event.custom_type()
+LEADERBOARD_TOP_COUNT = 3 # Best times shown on the end screen
+# Runs are ranked per pack; generated rooms get their own board, as their times don't compare with the hand-written room's
+LEADERBOARD_PACK = f"{PUZZLE_PACK}{GENERATED_MARK}" if GENERATE_PUZZLES else PUZZLE_PACK
+leaderboard = None
+if LEADERBOARD:
+    leaderboard = Leaderboard(LEADERBOARD, LEADERBOARD_TOP_COUNT, lambda: pygame.event.post(pygame.event.Event(LEADERBOARD_READY)))
+leaderboard_entry = None # This game's run once it has been submitted
+
+# --- Overlay Box Setup ---
+# Puzzle box dimensions, reused by the escape code box for consistent positioning
+PUZZLE_BOX_WIDTH = WIDTH * 0.7
+PUZZLE_BOX_HEIGHT = HEIGHT * 0.4
+PUZZLE_BOX_X = (WIDTH - PUZZLE_BOX_WIDTH) // 2
+PUZZLE_BOX_Y = (HEIGHT - PUZZLE_BOX_HEIGHT) // 2 - 50
+INPUT_BOX_HEIGHT = 30
+CURSOR_BLINK_SECONDS = 0.5 # The input cursor is shown and hidden for this long in turn
+HINT_BOX_HEIGHT = 80 # Fixed height for the hint box
+
+# --- Text Layout Cache ---
+# Most text on screen never changes between frames, so rendered surfaces and
+# wrapped layouts are cached and reused instead of being rebuilt 60 times a second.
+TEXT_CACHE_SIZE = 256 # Max entries kept in each cache before evicting the least recently used
+LAYOUT_CACHE_SIZE = 64
+
+render_cache = OrderedDict() # (text, font, color) -> rendered surface
+layout_cache = OrderedDict() # (text, font, max_width, color) -> [(line, surface), ...]
+wrap_cache = OrderedDict() # (text, font, max_width) -> [line, ...]
+
+
+# Per-frame allocation counter, so idle screens can be checked to allocate close to nothing
+frame_allocations = 0
+
+
+def count_allocation(count=1):
+    global frame_allocations
+    frame_allocations += count
+
+
+def end_frame_allocations():
+    global frame_allocations
+    if DEBUG_ALLOCATIONS and frame_allocations:
+        print(f"[allocs] {state.game_state}: {frame_allocations} surfaces allocated this frame")
+    allocated = frame_allocations
+    frame_allocations = 0
+    return allocated
+
+
+def cache_get(cache, key):
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key) # Mark as most recently used
+    return value
+
+
+def cache_put(cache, key, value, max_size):
+    cache[key] = value
+    cache.move_to_end(key)
+    if len(cache) > max_size:
+        cache.popitem(last=False) # Evict least recently used
+
+
+def render_text(text, font_obj, color):
+    key = (text, font_obj, color)
+    text_surface = cache_get(render_cache, key)
+    if text_surface is None:
+        text_surface = font_obj.render(text, True, color)
+        count_allocation()
+        cache_put(render_cache, key, text_surface, TEXT_CACHE_SIZE)
+    return text_surface
+
 
 # --- Text Wrapping Function ---
 def wrap_text(surface, text, font_obj, max_width):
+    key = (text, font_obj, max_width)
+    cached_lines = cache_get(wrap_cache, key)
+    if cached_lines is not None:
+        return cached_lines
+
     words = text.split(' ')
     wrapped_lines = []
     current_line = []
-    current_line_width = 0
 
     for word in words:
         test_line = " ".join(current_line + [word])
-        # Use a dummy surface to measure text width without actually rendering
-        # Using a dummy color (BLACK) here doesn't affect width calculation
-        test_width = font_obj.render(test_line, True, BLACK).get_width() 
+        # font.size() measures the text without rendering a surface
+        test_width = font_obj.size(test_line)[0]
 
         if test_width < max_width:
             current_line.append(word)
@@ -118,88 +507,166 @@ def wrap_text(surface, text, font_obj, max_width):
                 wrapped_lines.append(" ".join(current_line))
             current_line = [word]
             
-            if font_obj.render(word, True, BLACK).get_width() >= max_width and len(current_line) == 1:
+            if font_obj.size(word)[0] >= max_width and len(current_line) == 1:
                 wrapped_lines.append(word)
                 current_line = [] 
     
     if current_line:
         wrapped_lines.append(" ".join(current_line))
     
+    cache_put(wrap_cache, key, wrapped_lines, LAYOUT_CACHE_SIZE)
     return wrapped_lines
 
 
-# --- Game Functions ---
-def draw_timer():
-    elapsed = time.time() - start_time
-    remaining = max(0, TIMER_DURATION - int(elapsed))
-    minutes = remaining // 60
-    seconds = remaining % 60
-    timer_text = font.render(f"Time Left: {minutes:02}:{seconds:02}", True, BLACK)
-    screen.blit(timer_text, (10, 10))
+def layout_text(text, font_obj, max_width, color):
+    # Wrapped lines together with their pre-rendered surfaces
+    key = (text, font_obj, max_width, color)
+    layout = cache_get(layout_cache, key)
+    if layout is None:
+        layout = [(line, font_obj.render(line, True, color)) for line in wrap_text(None, text, font_obj, max_width)]
+        count_allocation(len(layout))
+        cache_put(layout_cache, key, layout, LAYOUT_CACHE_SIZE)
+    return layout
 
-def draw_input_box(input_text, x_pos, y_pos, width=500, height=30):
-    pygame.draw.rect(screen, WHITE, (x_pos, y_pos, width, height))
-    txt_surface = font.render(input_text, True, BLACK)
-    screen.blit(txt_surface, (x_pos + 5, y_pos + 5))
 
-def draw_hint_box(puzzle_box_x, puzzle_box_y, puzzle_box_height):
-    global current_puzzle
-    if current_puzzle is None:
-        return
+# --- Retained Layers ---
+# Screens and HUD pieces that only change on specific events are drawn once into
+# their own surface and blitted every frame. Each layer remembers the state it was
+# built for and is only rebuilt when that state changes.
+layer_cache = {} # name -> (state_key, surface)
+input_boxes = {} # input box name -> (box surface, TextLine), kept so typing only redraws what changed
 
-    i = current_puzzle["id"] - 1
-    # Check if hint should appear (2 or more incorrect attempts AND delay passed)
-    if incorrect_attempts_count[i] >= 2 and hint_delays[i] and time.time() >= hint_delays[i]:
-        hint_text_content = "Hint: " + current_puzzle["hint"]
 
-        # Hint box dimensions and position
-        hint_box_width = puzzle_box_width # Same width as puzzle box
-        hint_box_height = 80 # Fixed height for the hint box
-        hint_box_x = puzzle_box_x
-        # Position below input box, with more spacing (input box is at puzzle_box_y + puzzle_box_height + 10)
-        hint_box_y = puzzle_box_y + puzzle_box_height + 10 + 30 + 10 # puzzle_box_y + puzzle_box_height + input_box_height + spacing
+def new_surface(size, flags=0):
+    count_allocation()
+    return pygame.Surface(size, flags)
 
-        # Draw the hint box background
-        pygame.draw.rect(screen, HINT_BOX_COLOR, (hint_box_x, hint_box_y, hint_box_width, hint_box_height))
-        pygame.draw.rect(screen, BLACK, (hint_box_x, hint_box_y, hint_box_width, hint_box_height), 2) # Border
 
-        # Wrap and draw the hint text
-        wrapped_hint_lines = wrap_text(screen, hint_text_content, hint_font, hint_box_width - 20) # 20px padding
-        
-        hint_text_y_offset = hint_box_y + 10 # Padding from top of hint box
-        for line in wrapped_hint_lines:
-            line_surface = hint_font.render(line, True, BLACK)
-            line_rect = line_surface.get_rect(centerx=hint_box_x + hint_box_width // 2)
-            screen.blit(line_surface, (line_rect.x, hint_text_y_offset))
-            hint_text_y_offset += hint_font.get_linesize()
+def get_layer(name, state_key, build_layer):
+    cached = layer_cache.get(name)
+    if cached is not None and cached[0] == state_key:
+        return cached[1]
+    layer_surface = build_layer()
+    layer_cache[name] = (state_key, layer_surface)
+    return layer_surface
+
+
+def draw_button(name, label, button_rect):
+    hovered = button_rect.collidepoint(logical_pos(pygame.mouse.get_pos()))
+
+    def build_button():
+        button_surface = new_surface(button_rect.size, pygame.SRCALPHA)
+        button_color = DARK_BLUE if hovered else BLUE
+        pygame.draw.rect(button_surface, button_color, button_surface.get_rect(), border_radius=10)
+        button_text = render_text(label, font, WHITE)
+        button_surface.blit(button_text, button_text.get_rect(center=button_surface.get_rect().center))
+        return button_surface
 
+    screen.blit(get_layer(name, (hovered, button_rect.size), build_button), button_rect)
+    return button_rect
 
-def draw_puzzle_completion_box():
+
+# --- Game Functions ---
+def get_timer_text():
+    remaining = time_left(state)
+    minutes = remaining // 60
+    seconds = remaining % 60
+    return f"Time Left: {minutes:02}:{seconds:02}"
+
+def cursor_visible():
+    return int(state.clock / CURSOR_BLINK_SECONDS) % 2 == 0
+
+def input_box_key(text_input):
+    # Everything an input box shows, so its scene node is rebuilt when any of it changes
+    return text_input.text, text_input.cursor, text_input.anchor, cursor_visible()
+
+def build_input_box(name, key, x_pos, y_pos, width=500, height=30):
+    # Each box keeps its surface and text line between builds, so typing a
+    # character only draws the glyphs from that character on
+    text, cursor, anchor, show_cursor = key
+    size = (int(width), int(height))
+    box = input_boxes.get(name)
+    if box is None or box[0].get_size() != size or box[1].font is not font:
+        box = input_boxes[name] = (new_surface(size), TextLine(font, BLACK, WHITE, (size[0] - 10, font.get_height())))
+        box[0].fill(WHITE) # The text line covers everything inside the padding, so this is only done once
+    image, text_line = box
+    line_surface = text_line.update(text, cursor)
+    image.blit(line_surface, (5, 5))
+    start, end = min(cursor, anchor), max(cursor, anchor)
+    if start != end:
+        # Tinting keeps the text dark on the selection colour
+        selection_rect = pygame.Rect(5 + text_line.x_at(start), 5, text_line.x_at(end) - text_line.x_at(start), font.get_height())
+        image.fill(SELECTION_COLOR, selection_rect.clip((5, 5, line_surface.get_width(), font.get_height())), pygame.BLEND_RGB_MULT)
+    if show_cursor:
+        image.fill(BLACK, (5 + text_line.x_at(cursor), 5, CURSOR_WIDTH, font.get_height()))
+    return image, image.get_rect(topleft=(x_pos, y_pos))
+
+def text_block_rect(box_rect, line_positions):
+    # Box rect grown to cover any text lines that overflow it
+    return box_rect.unionall([line_surface.get_rect(topleft=pos) for line_surface, pos in line_positions])
+
+def build_text_box(box_rect, box_color, line_positions):
+    # A filled box with a border and its text lines, on a surface big enough for lines that overflow it
+    rect = text_block_rect(box_rect, line_positions)
+    image = new_surface(rect.size, pygame.SRCALPHA)
+    local_box_rect = box_rect.move(-rect.x, -rect.y)
+    pygame.draw.rect(image, box_color, local_box_rect)
+    pygame.draw.rect(image, BLACK, local_box_rect, 2) # Border
+    for line_surface, (x, y) in line_positions:
+        image.blit(line_surface, (x - rect.x, y - rect.y))
+    return image, rect
+
+def hint_box_rect(puzzle_box_x, puzzle_box_y, puzzle_box_height):
+    # Hint box dimensions and position, same width as puzzle box
+    hint_box_x = puzzle_box_x
+    # Position below input box, with more spacing (input box is at puzzle_box_y + puzzle_box_height + 10)
+    hint_box_y = puzzle_box_y + puzzle_box_height + 10 + INPUT_BOX_HEIGHT + 10 # puzzle_box_y + puzzle_box_height + input_box_height + spacing
+    return pygame.Rect(hint_box_x, hint_box_y, PUZZLE_BOX_WIDTH, HINT_BOX_HEIGHT)
+
+def hint_line_positions(hint_rect):
+    hint_text_content = "Hint: " + state.current_puzzle["hint"]
+    hint_layout = layout_text(hint_text_content, hint_font, hint_rect.width - 20, BLACK) # 20px padding
+
+    line_positions = []
+    hint_text_y_offset = hint_rect.y + 10 # Padding from top of hint box
+    for line, line_surface in hint_layout:
+        line_rect = line_surface.get_rect(centerx=hint_rect.x + hint_rect.width // 2)
+        line_positions.append((line_surface, (line_rect.x, hint_text_y_offset)))
+        hint_text_y_offset += hint_font.get_linesize()
+    return line_positions
+
+
+def completion_box_rect():
     # Increased size for better fit
     box_width = 150 # Increased width
     box_height = 200 # Increased height
     box_x = WIDTH - box_width - 10 # 10 pixels from right edge
     box_y = 10 # 10 pixels from top edge
+    return pygame.Rect(box_x, box_y, box_width, box_height)
+
 
-    pygame.draw.rect(screen, WHITE, (box_x, box_y, box_width, box_height), 0, 5) # Filled rectangle with rounded corners
-    pygame.draw.rect(screen, BLACK, (box_x, box_y, box_width, box_height), 2, 5) # Border
+def build_puzzle_completion_box(box_width, box_height):
+    box_surface = new_surface((box_width, box_height), pygame.SRCALPHA)
 
-    title_text = small_font.render("Puzzles Solved:", True, BLACK) # More descriptive title
-    screen.blit(title_text, (box_x + 10, box_y + 5))
+    pygame.draw.rect(box_surface, WHITE, (0, 0, box_width, box_height), 0, 5) # Filled rectangle with rounded corners
+    pygame.draw.rect(box_surface, BLACK, (0, 0, box_width, box_height), 2, 5) # Border
+
+    title_text = render_text("Puzzles Solved:", small_font, BLACK) # More descriptive title
+    box_surface.blit(title_text, (10, 5))
 
     indicator_size = 18 # Slightly larger indicators
     padding = 8 # Increased padding
     
     # ADJUSTMENT HERE: More vertical spacing after the title and adjust for numbers
-    start_y = box_y + title_text.get_height() + 20 # Increased spacing from 15 to 20
-    start_x = box_x + padding  # Define start_x here
+    start_y = title_text.get_height() + 20 # Increased spacing from 15 to 20
+    start_x = padding  # Define start_x here
 
     puzzles_per_row = 3
     row_gap = 10 # Increased vertical gap between rows
 
     for i in range(len(puzzles)):
-        color = COMPLETED_PUZZLE_COLOR if solved_puzzles[i] else UNCOMPLETED_PUZZLE_COLOR
-        puzzle_num_text = small_font.render(str(puzzles[i]["id"]), True, BLACK)
+        color = COMPLETED_PUZZLE_COLOR if state.solved_puzzles[i] else UNCOMPLETED_PUZZLE_COLOR
+        puzzle_num_text = render_text(str(puzzles[i]["id"]), small_font, BLACK)
 
         col = i % puzzles_per_row
         row = i // puzzles_per_row
@@ -210,112 +677,233 @@ def draw_puzzle_completion_box():
         indicator_y = start_y + (row * (indicator_size + row_gap + puzzle_num_text.get_height() + 5)) # Added 5 for extra space
 
         # Draw the square indicator
-        pygame.draw.rect(screen, color, (indicator_x, indicator_y, indicator_size, indicator_size))
-        pygame.draw.rect(screen, BLACK, (indicator_x, indicator_y, indicator_size, indicator_size), 1) # Border
+        pygame.draw.rect(box_surface, color, (indicator_x, indicator_y, indicator_size, indicator_size))
+        pygame.draw.rect(box_surface, BLACK, (indicator_x, indicator_y, indicator_size, indicator_size), 1) # Border
 
         # Draw the puzzle number above the square
         num_text_width, num_text_height = puzzle_num_text.get_size()
-        screen.blit(puzzle_num_text, (indicator_x + indicator_size // 2 - num_text_width // 2, indicator_y - num_text_height - 2))
-
-
-def check_collision():
-    global current_puzzle, input_active, user_input, escape_code_active, escape_code_input, escape_code_message
-
-    char_rect = character_img.get_rect(topleft=(char_x, char_y))
-    puzzle_interaction_radius = 20
-
-    # Check for puzzle collision
-    colliding_with_unsolved_puzzle = False
-    for i, (px, py) in enumerate(puzzle_positions):
-        if not solved_puzzles[i]:
-            puzzle_rect = pygame.Rect(px - puzzle_interaction_radius,
-                                      py - puzzle_interaction_radius,
-                                      puzzle_interaction_radius * 2,
-                                      puzzle_interaction_radius * 2)
-
-            if char_rect.colliderect(puzzle_rect):
-                colliding_with_unsolved_puzzle = True
-                if not input_active or (current_puzzle is not None and current_puzzle["id"] - 1 != i):
-                    current_puzzle = puzzles[i]
-                    input_active = True
-                    escape_code_active = False # Deactivate escape code input if a puzzle is activated
-                    user_input = ''
-                break
+        box_surface.blit(puzzle_num_text, (indicator_x + indicator_size // 2 - num_text_width // 2, indicator_y - num_text_height - 2))
+
+    return box_surface
+
+
+# --- Overlay Functions ---
+def question_line_positions():
+    raw_question_lines = state.current_puzzle["question"].split("\n")
+    
+    text_wrap_width = PUZZLE_BOX_WIDTH - 40
+    y_offset = PUZZLE_BOX_Y + 20
+    
+    line_positions = []
+    for segment in raw_question_lines:
+        question_layout = layout_text(segment, comic_sans_font, text_wrap_width, BLACK)
+        
+        for line, q_text in question_layout:
+            line_positions.append((q_text, (PUZZLE_BOX_X + 20, y_offset)))
+            y_offset += comic_sans_font.get_linesize()
+        
+        if "\n" in state.current_puzzle["question"] and raw_question_lines.index(segment) < len(raw_question_lines) - 1:
+             y_offset += 10
+    return line_positions
 
-    if not colliding_with_unsolved_puzzle and input_active and current_puzzle:
-        input_active = False
-        current_puzzle = None
-        user_input = ''
-
-    # Check for escape door collision (only if all puzzles are solved)
-    if all(solved_puzzles):
-        if char_rect.colliderect(door_rect):
-            # Only activate escape code input if not already active and not already focused on a puzzle
-            if not input_active and not escape_code_active:
-                escape_code_active = True
-                escape_code_input = ''
-                escape_code_message = ESCAPE_CODE_PROMPT
-        # We REMOVED the block that turned off escape_code_active when not colliding
-        # This allows the escape code box to stay open once triggered, until answered or another puzzle is hit.
-    else: # If not all puzzles solved, ensure escape code input is off
-        escape_code_active = False
-        escape_code_input = ''
-        escape_code_message = ''
-
-
-def handle_puzzle_input():
-    global input_active, user_input, solved_puzzles, current_puzzle, total_incorrect_attempts
+
+def escape_prompt_color():
+    # Determine message color
+    if state.escape_code_message == ESCAPE_CODE_PROMPT:
+        return BLACK
+    elif "Congratulations" in state.escape_code_message:
+        return (0, 150, 0) # Green for success
+    return RED # Red for incorrect
+
+
+def escape_prompt_line_positions():
+    escape_prompt_layout = layout_text(state.escape_code_message, comic_sans_font, PUZZLE_BOX_WIDTH - 40, escape_prompt_color())
     
-    if current_puzzle is None:
-        input_active = False
+    line_positions = []
+    prompt_y_offset = PUZZLE_BOX_Y + 20
+    for line, prompt_text in escape_prompt_layout:
+        prompt_text_x = PUZZLE_BOX_X + (PUZZLE_BOX_WIDTH - prompt_text.get_width()) // 2
+        line_positions.append((prompt_text, (prompt_text_x, prompt_y_offset)))
+        prompt_y_offset += comic_sans_font.get_linesize() + 5
+    return line_positions, prompt_y_offset
+
+
+# --- Scene Graph ---
+# While PLAYING the screen is a retained scene (see scene_graph.py) over the lab
+# background: a node for each puzzle station, the door, the character, the HUD
+# and each overlay box. Only the nodes whose state changed are redrawn, along with
+# the background behind where they were and where they are now. The character,
+# timer and overlay boxes are checked every frame; the stations, door and puzzle
+# tracker only change when a puzzle is solved, so they are marked for a check
+# then (see mark_solved_changes). Stations mark each puzzle's spot in the room
+# and turn green once it is solved; the door is outlined once it can be opened.
+STATION_LAYER, CHARACTER_LAYER, HUD_LAYER, OVERLAY_LAYER = range(4)
+STATION_RADIUS = 12
+STATION_ALPHA = 200 # Stations are drawn slightly see-through over the lab
+DOOR_OUTLINE_WIDTH = 4
+
+station_images = {} # (number, solved) -> surface
+scene_needs_repaint = True # Something else was drawn over the screen; redraw the whole scene next frame
+station_nodes = [] # Scene node of each puzzle's station, by puzzle index
+solved_nodes = [] # Nodes that only change when a puzzle is solved
+scene_solved_count = 0 # state.solved_count the scene was last marked for
+
+
+def build_station(number, solved):
+    image = station_images.get((number, solved))
+    if image is None:
+        image = new_surface((STATION_RADIUS * 2, STATION_RADIUS * 2), pygame.SRCALPHA)
+        center = (STATION_RADIUS, STATION_RADIUS)
+        pygame.draw.circle(image, COMPLETED_PUZZLE_COLOR if solved else UNCOMPLETED_PUZZLE_COLOR, center, STATION_RADIUS)
+        pygame.draw.circle(image, BLACK, center, STATION_RADIUS, 1)
+        number_text = render_text(str(number), small_font, BLACK)
+        image.blit(number_text, number_text.get_rect(center=center))
+        image.set_alpha(STATION_ALPHA)
+        station_images[(number, solved)] = image
+    return image
+
+
+def build_door_outline():
+    image = new_surface(room.door_rect.size, pygame.SRCALPHA)
+    pygame.draw.rect(image, GOLD, image.get_rect(), DOOR_OUTLINE_WIDTH, 5)
+    return image, room.door_rect
+
+
+def build_timer(timer_string):
+    timer_text = render_text(timer_string, font, BLACK)
+    return timer_text, timer_text.get_rect(topleft=(10, 10))
+
+
+def build_completion_box(solved_count):
+    # The box only changes when a puzzle is solved
+    box_rect = completion_box_rect()
+    return build_puzzle_completion_box(box_rect.width, box_rect.height), box_rect
+
+
+def puzzle_overlay_key(key):
+    # key while a puzzle's box is open, or None to hide
+    return key if state.input_active and state.current_puzzle else None
+
+
+def escape_overlay_key(key):
+    return key if state.escape_code_active and all_puzzles_solved(state) else None
+
+
+def build_question_box(puzzle_id):
+    puzzle_bg_rect = pygame.Rect(PUZZLE_BOX_X, PUZZLE_BOX_Y, PUZZLE_BOX_WIDTH, PUZZLE_BOX_HEIGHT)
+    return build_text_box(puzzle_bg_rect, LIGHT_GREEN, question_line_positions())
+
+
+def build_hint_box(puzzle_id):
+    hint_rect = hint_box_rect(PUZZLE_BOX_X, PUZZLE_BOX_Y, PUZZLE_BOX_HEIGHT)
+    return build_text_box(hint_rect, HINT_BOX_COLOR, hint_line_positions(hint_rect))
+
+
+def build_answer_input(key):
+    input_box_y = PUZZLE_BOX_Y + PUZZLE_BOX_HEIGHT + 10
+    return build_input_box("answer_input", key, PUZZLE_BOX_X, input_box_y, PUZZLE_BOX_WIDTH, INPUT_BOX_HEIGHT)
+
+
+def build_escape_box(message):
+    # Reusing puzzle box dimensions for consistency
+    code_box_rect = pygame.Rect(PUZZLE_BOX_X, PUZZLE_BOX_Y, PUZZLE_BOX_WIDTH, PUZZLE_BOX_HEIGHT)
+    return build_text_box(code_box_rect, LIGHT_GREEN, escape_prompt_line_positions()[0])
+
+
+def build_escape_input(key):
+    # Sits under the prompt, so it moves when the message changes length
+    _, input_key = key
+    prompt_y_offset = escape_prompt_line_positions()[1]
+    return build_input_box("escape_input", input_key, PUZZLE_BOX_X + 20, prompt_y_offset + 10, PUZZLE_BOX_WIDTH - 40)
+
+
+def build_playing_scene():
+    # One node per thing drawn while PLAYING, in drawing order within each layer
+    global playing_scene, scene_needs_repaint, station_nodes, solved_nodes, scene_solved_count
+    playing_scene = Scene(lab_bg)
+
+    station_nodes = []
+    for index, position in enumerate(room.positions):
+        def build(solved, number=index + 1, position=position):
+            image = build_station(number, solved)
+            return image, image.get_rect(center=position)
+        station_nodes.append(SceneNode(lambda index=index: state.solved_puzzles[index], build))
+    door_node = SceneNode(lambda: True if all_puzzles_solved(state) else None, lambda _: build_door_outline())
+    playing_scene.add(*station_nodes, door_node, layer=STATION_LAYER)
+
+    playing_scene.add(SceneNode(lambda: char_draw_pos, lambda pos: (character_img, character_img.get_rect(topleft=pos))),
+                      layer=CHARACTER_LAYER, live=True)
+
+    completion_node = SceneNode(lambda: state.solved_count, build_completion_box)
+    playing_scene.add(SceneNode(get_timer_text, build_timer), layer=HUD_LAYER, live=True)
+    playing_scene.add(completion_node, layer=HUD_LAYER)
+    solved_nodes = [door_node, completion_node]
+    scene_solved_count = state.solved_count
+
+    playing_scene.add(
+        SceneNode(lambda: puzzle_overlay_key(state.current_puzzle and state.current_puzzle["id"]), build_question_box),
+        SceneNode(lambda: puzzle_overlay_key(input_box_key(state.user_input)), build_answer_input),
+        SceneNode(lambda: puzzle_overlay_key(state.current_puzzle["id"]) if hint_visible(state) else None, build_hint_box),
+        SceneNode(lambda: escape_overlay_key(state.escape_code_message), build_escape_box),
+        SceneNode(lambda: None if state.game_over else escape_overlay_key((state.escape_code_message, input_box_key(state.escape_code_input))), build_escape_input),
+        layer=OVERLAY_LAYER, live=True)
+    scene_needs_repaint = True
+
+
+def mark_solved_changes():
+    # Have the scene check the stations, door and tracker, when a puzzle has been solved
+    global scene_solved_count
+    if state.solved_count == scene_solved_count:
         return
+    scene_solved_count = state.solved_count
+    playing_scene.mark(*solved_nodes)
+    playing_scene.mark(*(node for index, node in enumerate(station_nodes) if node.drawn_key != state.solved_puzzles[index]))
 
-    i = current_puzzle["id"] - 1
-    if user_input.strip().lower() == current_puzzle["answer"].strip().lower():
-        solved_puzzles[i] = True
-        current_puzzle = None
-        input_active = False
-        user_input = ''
-        incorrect_attempts_count[i] = 0 # Reset incorrect attempts for this puzzle
-        hint_delays[i] = 0 # Reset hint delay once solved
-    else:
-        user_input = ''
-        incorrect_attempts_count[i] += 1 # Increment incorrect attempts for this puzzle
-        total_incorrect_attempts += 1 # Increment total incorrect attempts
-        
-        # Set hint delay to current time immediately after 2nd incorrect attempt
-        if incorrect_attempts_count[i] == 2:
-            hint_delays[i] = time.time() # Hint appears immediately
-        elif incorrect_attempts_count[i] > 2:
-             # If more than 2 incorrect attempts, ensure hint_delays[i] is set
-             # This means if it was already set (from the 2nd attempt), it stays set.
-             # If for some reason it got unset, this would set it again immediately.
-             if hint_delays[i] == 0: 
-                hint_delays[i] = time.time()
-
-
-def handle_escape_code_input():
-    global escape_code_active, escape_code_input, escape_code_message, game_over, end_time, total_incorrect_attempts
-    if escape_code_input.strip() == ESCAPE_CODE: # Exact match, case-sensitive if needed, but numbers so okay
-        escape_code_message = "Congratulations! You have escaped the Lab!"
-        game_over = True # Signal to transition to end screen
-        # We DO NOT set escape_code_active = False here immediately.
-        # This allows the "Congratulations!" message to be visible in the box for a moment.
-        end_time = time.time() # Record end time
-    else:
-        escape_code_message = "Incorrect Code. Try again."
-        escape_code_input = '' # Clear input on incorrect attempt
-        total_incorrect_attempts += 1 # Count incorrect attempt for final code too
+
+def update_playing_scene():
+    mark_solved_changes()
+    playing_scene.update()
+
+
+def draw_playing_scene(forced_rects=()):
+    # Redraw the parts of the scene that changed and return their rects.
+    # forced_rects are redrawn every frame, for things drawn over the scene afterwards.
+    global scene_needs_repaint
+    if scene_needs_repaint:
+        playing_scene.repaint_rect(screen.get_rect())
+        scene_needs_repaint = False
+    for rect in forced_rects:
+        playing_scene.repaint_rect(rect)
+    return playing_scene.draw(screen)
+
+
+def repaint_scene():
+    global scene_needs_repaint
+    scene_needs_repaint = True
+
+
+build_playing_scene()
 
 
 # --- Start Screen Function ---
 def draw_start_screen():
-    screen.fill(BLACK) # Black background for start screen
+    # Title and instructions never change, so they are built once per screen size
+    start_layer = get_layer("start_screen", screen.get_size(), build_start_screen)
+    screen.blit(start_layer, (0, 0))
+
+    # Start Button
+    start_button_rect = pygame.Rect(WIDTH // 2 - 75, HEIGHT - 100, 150, 50)
+    return draw_button("start_button", "Start Game", start_button_rect)
+
+
+def build_start_screen():
+    layer_surface = new_surface(screen.get_size())
+    layer_surface.fill(BLACK) # Black background for start screen
 
     # Game Title
-    title_text = title_font.render("ChemEscape", True, WHITE)
+    title_text = render_text("ChemEscape", title_font, WHITE)
     title_rect = title_text.get_rect(center=(WIDTH // 2, HEIGHT // 4))
-    screen.blit(title_text, title_rect)
+    layer_surface.blit(title_text, title_rect)
 
     # Instructions Box
     instructions_box_width = WIDTH - 100 # 50 pixels padding on each side
@@ -336,7 +924,7 @@ def draw_start_screen():
     ]
     
     for line_text in instructions_list:
-        wrapped_lines = wrap_text(screen, line_text, font, instructions_box_width - 30)
+        wrapped_lines = wrap_text(layer_surface, line_text, font, instructions_box_width - 30)
         if wrapped_lines:
             text_y_offset_calc += len(wrapped_lines) * font.get_linesize()
             text_y_offset_calc += 5
@@ -345,236 +933,421 @@ def draw_start_screen():
 
     instructions_box_height = text_y_offset_calc + 10
 
-    instructions_surface = pygame.Surface((instructions_box_width, instructions_box_height), pygame.SRCALPHA)
+    instructions_surface = new_surface((instructions_box_width, instructions_box_height), pygame.SRCALPHA)
     instructions_surface.fill((0, 0, 0, 150))
 
     text_y_offset = 10
     for line_text in instructions_list:
         bullet_point = "• "
-        wrapped_lines = wrap_text(instructions_surface, line_text, font, instructions_box_width - 30)
+        wrapped_layout = layout_text(line_text, font, instructions_box_width - 30, WHITE)
         
-        if wrapped_lines:
-            bullet_surface = font.render(bullet_point, True, WHITE)
+        if wrapped_layout:
+            bullet_surface = render_text(bullet_point, font, WHITE)
             instructions_surface.blit(bullet_surface, (5, text_y_offset))
             
-            for i, wrapped_line in enumerate(wrapped_lines):
-                line_surface = font.render(wrapped_line, True, WHITE)
+            for wrapped_line, line_surface in wrapped_layout:
                 instructions_surface.blit(line_surface, (5 + bullet_surface.get_width(), text_y_offset))
                 text_y_offset += font.get_linesize()
             text_y_offset += 5
         else:
             text_y_offset += font.get_linesize() + 5
 
-    screen.blit(instructions_surface, (instructions_box_x, instructions_box_y))
+    layer_surface.blit(instructions_surface, (instructions_box_x, instructions_box_y))
+    return layer_surface
 
-    # Start Button
-    start_button_text = font.render("Start Game", True, WHITE)
-    start_button_rect = pygame.Rect(WIDTH // 2 - 75, HEIGHT - 100, 150, 50)
+# --- End Screen Function ---
+def format_time(total_seconds):
+    return f"{total_seconds // 60:02}:{total_seconds % 60:02}"
 
-    mouse_pos = pygame.mouse.get_pos()
-    button_color = BLUE
-    if start_button_rect.collidepoint(mouse_pos):
-        button_color = DARK_BLUE
 
-    pygame.draw.rect(screen, button_color, start_button_rect, border_radius=10)
-    text_rect = start_button_text.get_rect(center=start_button_rect.center)
-    screen.blit(start_button_text, text_rect)
+def draw_end_screen():
+    # The stats are fixed once the game has ended, so the screen is only rebuilt if they change
+    leaderboard_ready = leaderboard_entry is not None and leaderboard_entry.ready
+    end_state = (screen.get_size(), time_taken(state), state.total_incorrect_attempts, leaderboard_ready)
+    end_layer = get_layer("end_screen", end_state, build_end_screen)
+    screen.blit(end_layer, (0, 0))
 
-    return start_button_rect
+    # End Game Button
+    end_button_rect = pygame.Rect(WIDTH // 2 - 75, HEIGHT - 100, 150, 50)
+    return draw_button("end_button", "End Game", end_button_rect)
 
-# --- End Screen Function ---
-def draw_end_screen():
-    screen.fill(BLACK) # Black background for end screen
+
+def build_end_screen():
+    layer_surface = new_surface(screen.get_size())
+    layer_surface.fill(BLACK) # Black background for end screen
 
     # Overlay for a nice effect
-    overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+    overlay = new_surface((WIDTH, HEIGHT), pygame.SRCALPHA)
     overlay.fill((0, 0, 0, 180))
-    screen.blit(overlay, (0, 0))
+    layer_surface.blit(overlay, (0, 0))
 
     # Congratulations message
-    congrats_text = large_font.render("Congratulations!", True, GOLD)
-    escaped_text = large_font.render("You have escaped the lab!", True, WHITE)
+    congrats_text = render_text("Congratulations!", large_font, GOLD)
+    escaped_text = render_text("You have escaped the lab!", large_font, WHITE)
     
     congrats_rect = congrats_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 100))
     escaped_rect = escaped_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 50))
     
-    screen.blit(congrats_text, congrats_rect)
-    screen.blit(escaped_text, escaped_rect)
+    layer_surface.blit(congrats_text, congrats_rect)
+    layer_surface.blit(escaped_text, escaped_rect)
 
     # Time Taken
-    time_taken_seconds = int(end_time - start_time)
+    time_taken_seconds = time_taken(state)
     minutes = time_taken_seconds // 60
     seconds = time_taken_seconds % 60
-    time_text = stats_font.render(f"Time Taken: {minutes:02}:{seconds:02}", True, WHITE)
+    time_text = render_text(f"Time Taken: {minutes:02}:{seconds:02}", stats_font, WHITE)
     time_rect = time_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 30))
-    screen.blit(time_text, time_rect)
+    layer_surface.blit(time_text, time_rect)
 
     # Incorrect Answers
-    incorrect_text = stats_font.render(f"Incorrect Attempts: {total_incorrect_attempts}", True, WHITE)
+    incorrect_text = render_text(f"Incorrect Attempts: {state.total_incorrect_attempts}", stats_font, WHITE)
     incorrect_rect = incorrect_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 70))
-    screen.blit(incorrect_text, incorrect_rect)
-
-    # End Game Button
-    end_button_text = font.render("End Game", True, WHITE)
-    end_button_rect = pygame.Rect(WIDTH // 2 - 75, HEIGHT - 100, 150, 50)
-
-    mouse_pos = pygame.mouse.get_pos()
-    button_color = BLUE
-    if end_button_rect.collidepoint(mouse_pos):
-        button_color = DARK_BLUE
-
-    pygame.draw.rect(screen, button_color, end_button_rect, border_radius=10)
-    text_rect = end_button_text.get_rect(center=end_button_rect.center)
-    screen.blit(end_button_text, text_rect)
+    layer_surface.blit(incorrect_text, incorrect_rect)
+
+    # Leaderboard, once the run has been saved and ranked
+    if leaderboard_entry is not None and leaderboard_entry.ready:
+        entry = leaderboard_entry
+        other_runs = entry.total - 1
+        if other_runs:
+            rank_line = f"Faster than {entry.slower / other_runs:.0%} of {other_runs:,} other runs (median {format_time(entry.median)})"
+        else:
+            rank_line = "The first escape recorded on this computer!"
+        best_line = "Best times:  " + "   ".join(f"{place}. {format_time(best_time)} ({incorrect} wrong)"
+                                               for place, (best_time, incorrect, _) in enumerate(entry.top, 1))
+        for line, y in ((rank_line, HEIGHT // 2 + 110), (best_line, HEIGHT // 2 + 140)):
+            line_text = render_text(line, font, GOLD)
+            layer_surface.blit(line_text, line_text.get_rect(center=(WIDTH // 2, y)))
+
+    return layer_surface
+
+
+# --- Frame Scheduler ---
+# Runs at full FPS while there is input or movement, and otherwise blocks on the
+# event queue until the next event or the next time the screen would change.
+# main() awaits it between frames; in the browser, where nothing may block, it
+# sleeps on the event loop and checks for input once a frame instead.
+IDLE_GRACE_FRAMES = FPS // 2 # Keep full rate for half a second after the last activity
+IDLE_MAX_WAIT_MS = 1000 # Never sleep longer than this between frames
+
+idle_frames = 0 # Frames since the last input or movement
+next_frame_time = 0.0 # perf_counter() when the web build's next frame is due
+waiting_events = [] # Event that woke the scheduler, handled on the next frame
+
+
+def mark_frame_active():
+    global idle_frames
+    idle_frames = 0
+
+
+def get_frame_events():
+    global waiting_events
+    events = waiting_events + pygame.event.get()
+    waiting_events = []
+    if events:
+        mark_frame_active()
+    return events
+
+
+def next_change_delay_ms():
+    # How long the screen stays the same without any input
+    if state.game_state == "PLAYING":
+        elapsed = state.clock - state.start_time
+        delay = int((1 - elapsed % 1) * 1000) + 1 # Wake when the timer's seconds digit changes
+        if active_input() is not None: # and when the input cursor blinks
+            delay = min(delay, int((CURSOR_BLINK_SECONDS - state.clock % CURSOR_BLINK_SECONDS) * 1000) + 1)
+        return delay
+    return IDLE_MAX_WAIT_MS
+
+
+async def wait_for_next_frame():
+    # Returns when the next frame is due. Every wait gives the event loop a turn,
+    # so asset fetches keep going and, on the web, the browser stays responsive.
+    global idle_frames, next_frame_time
+    if not IDLE_THROTTLE or idle_frames < IDLE_GRACE_FRAMES:
+        idle_frames += 1
+        if WEB:
+            # clock.tick would block the browser, so sleep out the frame on the event loop
+            now = time.perf_counter()
+            next_frame_time = max(next_frame_time + 1 / FPS, now) # Don't rush to catch up after a slow frame
+            await asyncio.sleep(next_frame_time - now)
+        else:
+            clock.tick(FPS)
+            await asyncio.sleep(0)
+        return
 
-    return end_button_rect
+    wait_ms = min(IDLE_MAX_WAIT_MS, next_change_delay_ms())
+    if WEB:
+        # pygame.event.wait can't block in the browser, so look for input once a frame instead
+        deadline = time.perf_counter() + wait_ms / 1000
+        while idle_frames and not pygame.event.peek() and time.perf_counter() < deadline:
+            await asyncio.sleep(min(1 / FPS, deadline - time.perf_counter()))
+        next_frame_time = time.perf_counter()
+    else:
+        event = pygame.event.wait(wait_ms)
+        if event.type != pygame.NOEVENT:
+            waiting_events.append(event)
+        await asyncio.sleep(0)
+    clock.tick() # Restart frame timing from the wake-up
+
+
+# --- Game Reset ---
+def reset_game():
+    # Start a new session on the start screen
+    global room, puzzles, state, pending_input, tick_accumulator, char_draw_pos, leaderboard_entry
+    if GENERATE_PUZZLES:
+        room = next_room()
+        puzzles = room.puzzles
+    state = GameState(room)
+    if recorder:
+        recorder.begin_session(state, session_pack_name)
+    build_playing_scene() # Fresh nodes for the new session (and room)
+    leaderboard_entry = None
+    pending_input = NO_INPUT
+    tick_accumulator = 0.0
+    char_draw_pos = (round(state.char_x), round(state.char_y))
+
+
+# --- Text Editing Keys ---
+# The arrow keys walk, so in an input box the text cursor moves with Ctrl+Left
+# and Ctrl+Right (Cmd on macOS) as well as Home and End, and Shift selects.
+# Ctrl+A, Ctrl+C, Ctrl+X and Ctrl+V select all, copy, cut and paste.
+CURSOR_KEYS = {
+    pygame.K_LEFT: (CURSOR_LEFT, SELECT_LEFT),
+    pygame.K_RIGHT: (CURSOR_RIGHT, SELECT_RIGHT),
+    pygame.K_HOME: (CURSOR_HOME, SELECT_HOME),
+    pygame.K_END: (CURSOR_END, SELECT_END),
+}
+EDIT_MODIFIERS = pygame.KMOD_CTRL | pygame.KMOD_META
+EDIT_MODIFIER_KEYS = (pygame.K_LCTRL, pygame.K_RCTRL, pygame.K_LMETA, pygame.K_RMETA)
+
+
+def active_input():
+    # The TextInput that typing goes to, or None when no box is open
+    if state.input_active and state.current_puzzle:
+        return state.user_input
+    if state.escape_code_active and not state.game_over:
+        return state.escape_code_input
+    return None
+
+
+def clipboard_text():
+    try:
+        return pygame.scrap.get_text() or ""
+    except pygame.error:
+        return "" # No clipboard, e.g. without a window
+
+
+def copy_to_clipboard(text):
+    try:
+        pygame.scrap.put_text(text)
+    except pygame.error:
+        pass
+
+
+def typed_for_key(event):
+    # The character a key press adds to FrameInput.typed
+    text_input = active_input()
+    editing = event.mod & EDIT_MODIFIERS
+    if event.key == pygame.K_RETURN:
+        return ENTER
+    if event.key == pygame.K_BACKSPACE:
+        return BACKSPACE
+    if event.key == pygame.K_DELETE:
+        return DELETE
+    if event.key in CURSOR_KEYS and (editing or event.key in (pygame.K_HOME, pygame.K_END)):
+        return CURSOR_KEYS[event.key][1 if event.mod & pygame.KMOD_SHIFT else 0]
+    if editing:
+        if event.key == pygame.K_a:
+            return SELECT_ALL
+        if event.key == pygame.K_v and text_input is not None:
+            return printable_text(clipboard_text())[:text_input.max_length]
+        if event.key in (pygame.K_c, pygame.K_x) and text_input is not None and text_input.selected_text():
+            copy_to_clipboard(text_input.selected_text())
+            return DELETE if event.key == pygame.K_x else ""
+        return "" # Other shortcuts don't type anything
+    return event.unicode
 
 
 # --- Main Game Loop ---
-running = True
-while running:
-    for event in pygame.event.get():
+def collect_input(events, keys):
+    # Turn this frame's events and held keys into the game's input for one update
+    global running, show_profiler
+    typed = []
+    start_game = False
+
+    for event in events:
         if event.type == pygame.QUIT:
             running = False
-        
-        if game_state == "START_SCREEN":
+
+        if PROFILE and event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+            show_profiler = not show_profiler
+            repaint_scene() # Redraw everything the panel was covering
+            continue
+
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F11:
+            toggle_fullscreen()
+            repaint_scene() # The new window starts blank
+            continue
+
+        if event.type == pygame.VIDEORESIZE:
+            window_resized()
+            repaint_scene()
+
+        if state.game_state == "START_SCREEN":
             if event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1: # Left click
                     start_button_rect = draw_start_screen() # Ensure button is drawn before checking collision
-                    if start_button_rect.collidepoint(event.pos):
-                        game_state = "PLAYING"
-                        start_time = time.time() # Start the timer when the game begins
-        
-        elif game_state == "PLAYING":
-            if input_active: # If a puzzle is active
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_RETURN:
-                        handle_puzzle_input()
-                    elif event.key == pygame.K_BACKSPACE:
-                        user_input = user_input[:-1]
-                    else:
-                        user_input += event.unicode
-            
-            elif escape_code_active: # If the escape code input is active
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_RETURN:
-                        handle_escape_code_input()
-                    elif event.key == pygame.K_BACKSPACE:
-                        escape_code_input = escape_code_input[:-1]
-                    else:
-                        escape_code_input += event.unicode
-        
-        elif game_state == "END_SCREEN":
+                    if start_button_rect.collidepoint(logical_pos(event.pos)):
+                        start_game = True
+
+        elif state.game_state == "PLAYING":
+            if event.type == pygame.KEYDOWN:
+                typed.append(typed_for_key(event))
+
+        elif state.game_state == "END_SCREEN":
             if event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1: # Left click
                     end_button_rect = draw_end_screen() # Ensure button is drawn before checking collision
-                    if end_button_rect.collidepoint(event.pos):
+                    if end_button_rect.collidepoint(logical_pos(event.pos)):
                         running = False # Quit the game
 
-    if game_state == "START_SCREEN":
-        start_button_rect = draw_start_screen() # Draw start screen and get button rect
+    move_x = keys[pygame.K_RIGHT] - keys[pygame.K_LEFT]
+    move_y = keys[pygame.K_DOWN] - keys[pygame.K_UP]
+    if active_input() is not None and any(keys[key] for key in EDIT_MODIFIER_KEYS):
+        move_x = 0 # Ctrl+Left/Right move the text cursor instead of walking
+    if move_x or move_y:
+        mark_frame_active() # Held movement keys keep the full frame rate
+
+    return FrameInput(move_x, move_y, "".join(typed), start_game)
+
+
+def step_game(inputs, dt):
+    # Advance the game by as many fixed update steps as fit in the time since the
+    # last frame. Typed keys and clicks wait for the next step if none runs this
+    # frame, and are only applied once; held movement applies to every step.
+    global pending_input, tick_accumulator, char_draw_pos
+    pending_input = FrameInput(inputs.move_x, inputs.move_y,
+                               pending_input.typed + inputs.typed,
+                               pending_input.start_game or inputs.start_game)
+
+    tick_accumulator += min(dt, MAX_FRAME_TIME)
+    while tick_accumulator >= TICK_SECONDS:
+        if recorder:
+            recorder.record_input(pending_input)
+        update(state, pending_input, TICK_SECONDS)
+        if recorder:
+            recorder.record_events(state)
+        pending_input = FrameInput(pending_input.move_x, pending_input.move_y)
+        tick_accumulator -= TICK_SECONDS
+
+    # Draw the character part way between its last two positions, so movement
+    # stays smooth when the render rate doesn't line up with the update rate
+    char_draw_pos = interpolated_char_pos(state, tick_accumulator / TICK_SECONDS)
+
+
+def update_frame(inputs, dt):
+    # Step the game and draw the current screen. Returns the rects to push when only
+    # part of the screen was redrawn, or None when the whole screen should be flipped.
+    global leaderboard_entry
+    dirty_rects = None
+
+    step_game(inputs, dt)
+
+    if state.game_state == "START_SCREEN":
+        draw_start_screen()
     
-    elif game_state == "PLAYING":
-        screen.blit(lab_bg, (0, 0))
-        screen.blit(character_img, (char_x, char_y))
-        draw_timer()
-        draw_puzzle_completion_box()
-
-        # --- Character Movement (Always active in PLAYING state) ---
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_LEFT]: char_x -= char_speed
-        if keys[pygame.K_RIGHT]: char_x += char_speed
-        if keys[pygame.K_UP]: char_y -= char_speed
-        if keys[pygame.K_DOWN]: char_y += char_speed
-
-        char_x = max(0, min(WIDTH - character_img.get_width(), char_x))
-        char_y = max(0, min(HEIGHT - character_img.get_height(), char_y))
-
-        check_collision()  
-
-        # Define puzzle box dimensions for consistent positioning
-        puzzle_box_width = WIDTH * 0.7
-        puzzle_box_height = HEIGHT * 0.4
-        puzzle_box_x = (WIDTH - puzzle_box_width) // 2
-        puzzle_box_y = (HEIGHT - puzzle_box_height) // 2 - 50
+    elif state.game_state == "PLAYING":
+        update_playing_scene()
+        changed_rects = draw_playing_scene([profiler.panel_rect(screen, small_font)] if show_profiler else ())
+        if DIRTY_RECTS:
+            dirty_rects = changed_rects
+
+    elif state.game_state == "END_SCREEN":
+        repaint_scene()
+        if leaderboard and leaderboard_entry is None:
+            leaderboard_entry = leaderboard.submit_run(LEADERBOARD_PACK, time_taken(state), state.total_incorrect_attempts)
+        draw_end_screen()
+
+    return dirty_rects
+
+
+def run_frame(events, keys, dt=None):
+    # One full frame: handle input, update, draw and present. dt is measured from
+    # the previous frame unless given, e.g. to step a scripted playthrough exactly.
+    global last_frame_time
+    now = time.perf_counter()
+    if dt is None:
+        dt = 0.0 if last_frame_time is None else now - last_frame_time
+    last_frame_time = now
+
+    if profiler:
+        profiler.begin_frame()
+    inputs = collect_input(events, keys)
+    dirty_rects = update_frame(inputs, dt)
+    if show_profiler:
+        panel_rect = profiler.draw(screen, small_font)
+        if dirty_rects is not None and panel_rect not in dirty_rects:
+            dirty_rects.append(panel_rect)
+    present_display(dirty_rects)
+    if profiler:
+        profiler.end_frame()
+    end_frame_allocations()
+
+
+# --- Profiling ---
+# With CHEMESCAPE_PROFILE=1 the hot-path functions are swapped for timed wrappers,
+# so the normal game pays nothing for the instrumentation.
+profiler = FrameProfiler() if PROFILE else None
+show_profiler = PROFILE
+
+if PROFILE:
+    collect_input = profiler.timed("events", collect_input)
+    # Scene update covers checking the nodes and rebuilding the changed ones, timed
+    # again on their own below; scene draw covers the background blit and the node blits
+    update_playing_scene = profiler.timed("scene update", update_playing_scene)
+    draw_playing_scene = profiler.timed("scene draw", draw_playing_scene)
+    Scene.restore_background = profiler.timed("background blit", Scene.restore_background)
+    build_timer = profiler.timed("draw_timer", build_timer)
+    build_completion_box = profiler.timed("draw_puzzle_completion_box", build_completion_box)
+    build_question_box = profiler.timed("puzzle overlay", build_question_box)
+    build_answer_input = profiler.timed("puzzle overlay", build_answer_input)
+    build_hint_box = profiler.timed("puzzle overlay", build_hint_box)
+    build_escape_box = profiler.timed("escape overlay", build_escape_box)
+    build_escape_input = profiler.timed("escape overlay", build_escape_input)
+    update = profiler.timed("update", update)
+    game_logic.check_collision = profiler.timed("check_collision", game_logic.check_collision)
+    wrap_text = profiler.timed("wrap_text", wrap_text)
+    draw_start_screen = profiler.timed("start screen", draw_start_screen)
+    draw_end_screen = profiler.timed("end screen", draw_end_screen)
+    present_display = profiler.timed("display flip", present_display)
+    build_playing_scene() # Again, so its nodes call the timed build functions
 
 
-        if input_active and current_puzzle:
-            puzzle_bg_rect = pygame.Rect(puzzle_box_x, puzzle_box_y, puzzle_box_width, puzzle_box_height)
-            pygame.draw.rect(screen, LIGHT_GREEN, puzzle_bg_rect)
-            pygame.draw.rect(screen, BLACK, puzzle_bg_rect, 2) # Add border
-
-            raw_question_lines = current_puzzle["question"].split("\n")
-            
-            text_wrap_width = puzzle_box_width - 40
-            y_offset = puzzle_box_y + 20
-            
-            for segment in raw_question_lines:
-                wrapped_lines = wrap_text(screen, segment, comic_sans_font, text_wrap_width)
-                
-                for line in wrapped_lines:
-                    q_text = comic_sans_font.render(line, True, BLACK)
-                    screen.blit(q_text, (puzzle_box_x + 20, y_offset))
-                    y_offset += comic_sans_font.get_linesize()
-                
-                if "\n" in current_puzzle["question"] and raw_question_lines.index(segment) < len(raw_question_lines) - 1:
-                     y_offset += 10
-
-            input_box_y = puzzle_box_y + puzzle_box_height + 10
-            input_box_width = puzzle_box_width
-            input_box_x = puzzle_box_x
-            draw_input_box(user_input, input_box_x, input_box_y, input_box_width, 30)
-
-            # Draw hint box only if conditions are met
-            draw_hint_box(puzzle_box_x, puzzle_box_y, puzzle_box_height)
-
-
-        # Draw escape code input if active (only if all puzzles are solved)
-        if escape_code_active and all(solved_puzzles):
-            # Reusing puzzle box dimensions for consistency
-            code_box_width = WIDTH * 0.7 
-            code_box_height = HEIGHT * 0.4
-            code_box_x = (WIDTH - code_box_width) // 2
-            code_box_y = (HEIGHT - code_box_height) // 2 - 50
-
-            pygame.draw.rect(screen, LIGHT_GREEN, (code_box_x, code_box_y, code_box_width, code_box_height))
-            pygame.draw.rect(screen, BLACK, (code_box_x, code_box_y, code_box_width, code_box_height), 2)
-
-            # Determine message color
-            msg_color = BLACK
-            if escape_code_message == ESCAPE_CODE_PROMPT:
-                msg_color = BLACK
-            elif "Congratulations" in escape_code_message:
-                msg_color = (0, 150, 0) # Green for success
-            else:
-                msg_color = RED # Red for incorrect
-
-            wrapped_escape_prompt_lines = wrap_text(screen, escape_code_message, comic_sans_font, code_box_width - 40)
-            
-            prompt_y_offset = code_box_y + 20
-            for line in wrapped_escape_prompt_lines:
-                prompt_text = comic_sans_font.render(line, True, msg_color)
-                prompt_text_x = code_box_x + (code_box_width - prompt_text.get_width()) // 2
-                screen.blit(prompt_text, (prompt_text_x, prompt_y_offset))
-                prompt_y_offset += comic_sans_font.get_linesize() + 5
-
-            # Only draw input box if not game over yet
-            if not game_over: # Added this check
-                input_box_y = prompt_y_offset + 10
-                input_box_width_inner = code_box_width - 40
-                input_box_x_inner = code_box_x + 20
-                draw_input_box(escape_code_input, input_box_x_inner, input_box_y, input_box_width_inner)
-            # If game_over, the input box is no longer needed, and the main loop will handle the state change.
-        
-        # New: State transition check after all drawing and logic for PLAYING state
-        if game_over:
-            game_state = "END_SCREEN"
-
-    elif game_state == "END_SCREEN":
-        end_button_rect = draw_end_screen()
-
-    pygame.display.flip()
-    clock.tick(FPS)
-
-pygame.quit()
-sys.exit()
+running = True
+last_frame_time = None # perf_counter() at the start of the previous frame
+pending_input = NO_INPUT # Input not yet applied by an update step
+tick_accumulator = 0.0 # Frame time not yet used up by update steps
+char_draw_pos = (round(state.char_x), round(state.char_y)) # Interpolated character position for this frame
+
+
+async def main():
+    # A coroutine, so a browser runtime like pygbag can run the game between its own work
+    deferred_assets = asyncio.ensure_future(load_deferred_assets()) if WEB else None
+    while running:
+        run_frame(get_frame_events(), pygame.key.get_pressed())
+        await wait_for_next_frame()
+    if deferred_assets:
+        deferred_assets.cancel()
+
+    if profiler and PROFILE_OUT:
+        profiler.save(PROFILE_OUT)
+    if recorder:
+        recorder.close()
+    if leaderboard:
+        leaderboard.close()
+    pygame.quit()
+    sys.exit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,223 @@
+import argparse
+import json
+import os
+import random
+import time
+from itertools import islice
+
+from elements import NAMES, SYMBOLS, number_for_symbol
+from puzzle_packs import load_pack, validate_pack
+
+# --- Puzzle Generator ---
+# Makes element-symbol puzzles like the lab's puzzles 1 and 5, so every game
+# can get a fresh room instead of the same ten hand-written puzzles:
+#   spell     "Spell the word formed from these chemical element symbols: Carbon, Americium, Phosphorus."
+#   anagram   "Rearrange the symbols for Boron, Nitrogen, Carbon, Argon and Oxygen to form the name of which element?"
+#
+# A PuzzleGenerator searches a word list (and the element names) once for
+# answers that can be spelled with element symbols, walking a trie of the
+# symbols with a memoized table of the fewest symbols that spell each ending of
+# the word. Only answers starting with a one-letter symbol are kept, so a room's
+# escape code can still be worked out from its answers (see
+# puzzle_packs.escape_code_from_answers).
+#
+# puzzles(seed) then streams puzzle dicts in the same shape as a pack's puzzles,
+# in a shuffled order that is only worked out as far as it is read. No answer
+# comes round again until every answer has been used. A room is a fixed slice
+# of that stream, so (seed, room number) is enough to make the same room again,
+# which is how recorded games of generated rooms are replayed. It is also how the
+# game carries on where it left off after a restart: save_stream_position keeps
+# the seed and the next room number in a small file between launches.
+#
+#   python puzzle_generator.py --rooms 3
+
+WORD_LIST_PATH = "assets/words.txt" # One lower case word per line
+MIN_WORD_LENGTH = 4
+END = "" # Trie key holding the atomic number of the symbol that ends there
+GENERATED_MARK = "#" # Generated pack names look like "lab#<seed>.<room number>"
+
+
+def build_symbol_trie():
+    trie = {}
+    for number, symbol in enumerate(SYMBOLS):
+        if symbol:
+            node = trie
+            for char in symbol.lower():
+                node = node.setdefault(char, {})
+            node[END] = number
+    return trie
+
+
+SYMBOL_TRIE = build_symbol_trie()
+
+
+def spell_with_symbols(word):
+    # Atomic numbers of the fewest element symbols that spell word, or None
+    best = {len(word): ()} # Start of an ending -> fewest symbols that spell it, or None
+
+    def spell_from(start):
+        if start in best:
+            return best[start]
+        found = None
+        node = SYMBOL_TRIE
+        for end in range(start, len(word)):
+            node = node.get(word[end])
+            if node is None:
+                break
+            number = node.get(END)
+            if number is not None:
+                rest = spell_from(end + 1)
+                if rest is not None and (found is None or len(rest) + 1 < len(found)):
+                    found = (number,) + rest
+        best[start] = found
+        return found
+
+    return spell_from(0)
+
+
+def read_word_list(path=WORD_LIST_PATH):
+    with open(path, encoding="utf-8") as word_file:
+        return [line.strip().lower() for line in word_file if line.strip()]
+
+
+def list_names(names):
+    return ", ".join(names[:-1]) + " and " + names[-1]
+
+
+def spell_puzzle(word, numbers, rng):
+    names = [NAMES[number] for number in numbers]
+    return {
+        "question": f"Spell the word formed from these chemical element symbols: {', '.join(names)}.",
+        "answer": word.title(),
+        "hint": f"It has {len(word)} letters.",
+        "elements": names,
+    }
+
+
+def anagram_puzzle(number, numbers, rng):
+    in_order = [NAMES[symbol_number] for symbol_number in numbers]
+    names = list(in_order)
+    while len(set(names)) > 1 and names == in_order:
+        rng.shuffle(names) # Never give the symbols away in spelling order
+    return {
+        "question": f"Rearrange the symbols for {list_names(names)} to form the name of which element?",
+        "answer": NAMES[number],
+        "hint": f"Its atomic number is {number}.",
+        "elements": names,
+    }
+
+
+def lazy_shuffle(items, rng):
+    # Yield items in a random order, only shuffling as far as has been read
+    items = list(items)
+    for end in range(len(items) - 1, -1, -1):
+        pick = rng.randint(0, end)
+        items[pick], items[end] = items[end], items[pick]
+        yield items[end]
+
+
+class PuzzleGenerator:
+    def __init__(self, words):
+        self.answers = [] # (make puzzle, answer, atomic numbers spelling it)
+        for number, name in enumerate(NAMES):
+            numbers = spell_with_symbols(name.lower()) if name else None
+            if numbers is not None and len(numbers) > 1 and number_for_symbol(name[0]) is not None:
+                self.answers.append((anagram_puzzle, number, numbers))
+        names = {name.lower() for name in NAMES}
+        for word in sorted(set(words) - names):
+            if len(word) < MIN_WORD_LENGTH or not word.isalpha() or number_for_symbol(word[0]) is None:
+                continue
+            numbers = spell_with_symbols(word)
+            if numbers is not None:
+                self.answers.append((spell_puzzle, word, numbers))
+
+    def puzzles(self, seed):
+        # Endless stream of puzzle dicts without ids; answers repeat only after all have been used
+        rng = random.Random(seed)
+        while True:
+            for make_puzzle, answer, numbers in lazy_shuffle(self.answers, rng):
+                yield make_puzzle(answer, numbers, rng)
+
+    def room_puzzles(self, seed, room_number, count):
+        # The puzzles of one room of the stream, without reading the rooms before it from a live stream
+        stream = islice(self.puzzles(seed), room_number * count, None)
+        return take_room(stream, count)
+
+
+def take_room(stream, count):
+    # The next count puzzles from a puzzles() stream, numbered for a room
+    puzzles = list(islice(stream, count))
+    for puzzle_id, puzzle in enumerate(puzzles, 1):
+        puzzle["id"] = puzzle_id
+    return puzzles
+
+
+def load_stream_position(path):
+    # (seed, next room number) saved by save_stream_position, or None if there isn't one
+    try:
+        with open(path, encoding="utf-8") as position_file:
+            position = json.load(position_file)
+        return int(position["seed"]), int(position["next_room"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_stream_position(path, seed, next_room):
+    partial_path = path + ".part" # Never leave a half-written file under the real name
+    with open(partial_path, "w", encoding="utf-8") as position_file:
+        json.dump({"seed": seed, "next_room": next_room}, position_file)
+    os.replace(partial_path, path)
+
+
+def generated_pack(base_pack, puzzles, name):
+    # base_pack with its puzzles swapped for a generated room; positions, prompt and assets are kept
+    data = dict(base_pack, puzzles=puzzles)
+    data["positions"] = [list(position) for position in base_pack["positions"]]
+    for puzzle, position in zip(data["puzzles"], data["positions"]):
+        puzzle["position"] = position
+    del data["escape_code"] # Worked out from the new answers
+    data["code_from_initials"] = True
+    pack = validate_pack(data, name)
+    pack["folder"] = base_pack["folder"]
+    return pack
+
+
+def generated_pack_name(base_name, seed, room_number):
+    return f"{base_name}{GENERATED_MARK}{seed}.{room_number}"
+
+
+def load_session_pack(pack_name, generator=None):
+    # The pack a session was played with: a pack under packs/, or a generated room's name
+    base_name, mark, room = pack_name.rpartition(GENERATED_MARK)
+    if not mark:
+        return load_pack(pack_name)
+    seed, room_number = room.split(".")
+    base_pack = load_pack(base_name)
+    generator = generator or PuzzleGenerator(read_word_list())
+    return generated_pack(base_pack, generator.room_puzzles(int(seed), int(room_number), len(base_pack["positions"])), pack_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate element-symbol puzzle rooms")
+    parser.add_argument("--rooms", type=int, default=1, help="rooms to print (default 1)")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the shuffle (default random)")
+    parser.add_argument("--pack", default="lab", help="pack whose layout and prompt the rooms use (default lab)")
+    parser.add_argument("--words", default=WORD_LIST_PATH, help=f"word list, one word per line (default {WORD_LIST_PATH})")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    generator = PuzzleGenerator(read_word_list(args.words))
+    print(f"{len(generator.answers)} answers found in {(time.perf_counter() - start) * 1000:.1f} ms")
+    seed = args.seed if args.seed is not None else random.randrange(1 << 30)
+    base_pack = load_pack(args.pack)
+    stream = generator.puzzles(seed)
+    for room_number in range(args.rooms):
+        name = generated_pack_name(args.pack, seed, room_number)
+        pack = generated_pack(base_pack, take_room(stream, len(base_pack["positions"])), name)
+        print(f"\nRoom {name}, escape code {pack['escape_code']}")
+        for puzzle in pack["puzzles"]:
+            print(f"  {puzzle['id']:>2}. {puzzle['question']}  ({puzzle['answer']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+import argparse
+import json
+import os
+import sys
+from collections import OrderedDict
+
+from answer_matching import canonical_answer
+from elements import SYMBOLS, find_element, number_for_symbol
+
+# --- Puzzle Packs ---
+# A puzzle pack is a folder under packs/ holding a pack.json and an optional
+# assets/ folder:
+#
+#   packs/<name>/pack.json
+#   packs/<name>/assets/...
+#
+# pack.json looks like:
+#
+#   {
+#       "name": "ChemEscape Lab",
+#       "format": 1,
+#       "escape_code": "190",                       (optional, see escape_code_from_answers)
+#       "escape_code_prompt": "...",
+#       "code_from_initials": true,                 (optional, see below)
+#       "assets": {"background": "lab.png"},      (optional, relative to the assets/ folder)
+#       "puzzles": [
+#           {"id": 1, "question": "...", "answer": "...", "hint": "...", "position": [150, 150],
+#            "aliases": ["...", ...],                   (optional, other answers to accept)
+#            "elements": ["Carbon", ...],               (optional, elements whose symbols make up the answer)
+#            "code_element": "K"},                      (optional, element the escape code uses instead of the answer's first letter)
+#           ...
+#       ]
+#   }
+#
+# "code_from_initials" says players work the escape code out from the first
+# letters of their answers. Aliases must then start with the same letter as
+# the answer, and answers starting with another letter aren't accepted (see
+# answer_matching.py), except in puzzles with a "code_element". It is on by default for packs without an "escape_code",
+# whose code is worked out that way.
+#
+# Packs are only found by scanning folder names, and a pack's file is only read
+# and validated when that pack is loaded. Only a few parsed packs are cached, so a
+# large library of packs costs nothing until one is used.
+#
+# To check every pack in a folder, e.g. after generating a batch of them:
+#
+#   python puzzle_packs.py --check [packs_dir]
+
+PACKS_DIR = "packs"
+PACK_FILE = "pack.json"
+PACK_FORMAT = 1
+PACK_CACHE_SIZE = 4 # Parsed packs kept in memory; the active room's pack is always the most recent
+
+pack_cache = OrderedDict() # (pack path, modified time) -> pack
+
+
+class PuzzlePackError(ValueError):
+    pass
+
+
+def iter_packs(packs_dir=PACKS_DIR):
+    # Yield (name, folder) for every pack without reading any of them
+    if not os.path.isdir(packs_dir):
+        return
+    with os.scandir(packs_dir) as entries:
+        for entry in entries:
+            if entry.is_dir() and os.path.isfile(os.path.join(entry.path, PACK_FILE)):
+                yield entry.name, entry.path
+
+
+def list_packs(packs_dir=PACKS_DIR):
+    return sorted(name for name, _ in iter_packs(packs_dir))
+
+
+def pack_folder(name_or_path, packs_dir=PACKS_DIR):
+    if os.path.isdir(name_or_path):
+        return name_or_path
+    return os.path.join(packs_dir, name_or_path)
+
+
+def load_pack(name_or_path, packs_dir=PACKS_DIR):
+    folder = pack_folder(name_or_path, packs_dir)
+    pack_path = os.path.join(folder, PACK_FILE)
+    try:
+        key = (os.path.abspath(pack_path), os.path.getmtime(pack_path))
+    except OSError:
+        raise PuzzlePackError(f"No puzzle pack found at {pack_path}")
+
+    pack = pack_cache.get(key)
+    if pack is not None:
+        pack_cache.move_to_end(key)
+        return pack
+
+    pack = read_pack_file(pack_path)
+    pack["folder"] = folder
+
+    pack_cache[key] = pack
+    if len(pack_cache) > PACK_CACHE_SIZE:
+        pack_cache.popitem(last=False)
+    return pack
+
+
+def read_pack_file(pack_path):
+    try:
+        with open(pack_path, encoding="utf-8") as pack_file:
+            data = json.load(pack_file)
+    except json.JSONDecodeError as error:
+        raise PuzzlePackError(f"{pack_path}: invalid JSON ({error})")
+    return validate_pack(data, pack_path)
+
+
+def answer_letters(answer):
+    return "".join(sorted(char for char in answer.lower() if char.isalpha()))
+
+
+def escape_code_from_answers(puzzles):
+    # The lab's rule: take the first letter of each answer, read it as an element
+    # symbol and add up the atomic numbers. A puzzle's "code_element" is used
+    # instead of its first letter where the puzzle says so (the lab's Potassium
+    # stands for K, from Kinetic energy). None if a first letter isn't a symbol.
+    # Only used for packs without an "escape_code": a declared code always wins.
+    total = 0
+    for puzzle in puzzles:
+        if "code_element" in puzzle:
+            number = find_element(puzzle["code_element"])
+        else:
+            number = number_for_symbol(puzzle["answer"].strip()[0])
+        if number is None:
+            return None
+        total += number
+    return str(total)
+
+
+def validate_pack(data, source="pack"):
+    # Check the pack.json structure and return it in the shape the game uses:
+    # puzzles as {"id", "question", "answer", "hint"?, "aliases"?, "elements"?, "code_element"?} dicts and positions as (x, y) tuples
+    def fail(message):
+        raise PuzzlePackError(f"{source}: {message}")
+
+    if not isinstance(data, dict):
+        fail("expected a JSON object")
+    if data.get("format", PACK_FORMAT) != PACK_FORMAT:
+        fail(f"unsupported format {data.get('format')!r}")
+
+    for key in ("name", "escape_code", "escape_code_prompt"):
+        if key == "escape_code" and key not in data:
+            continue # Worked out from the answers below
+        if not isinstance(data.get(key), str) or not data[key].strip():
+            fail(f"'{key}' must be a non-empty string")
+
+    code_from_initials = data.get("code_from_initials", "escape_code" not in data)
+    if not isinstance(code_from_initials, bool):
+        fail("'code_from_initials' must be true or false")
+
+    raw_puzzles = data.get("puzzles")
+    if not isinstance(raw_puzzles, list) or not raw_puzzles:
+        fail("'puzzles' must be a non-empty list")
+
+    puzzles = []
+    positions = []
+    for index, raw_puzzle in enumerate(raw_puzzles):
+        where = f"puzzle {index + 1}"
+        if not isinstance(raw_puzzle, dict):
+            fail(f"{where} must be an object")
+        # The game indexes its per-puzzle lists with id - 1, so ids must run 1..N in order
+        if raw_puzzle.get("id") != index + 1:
+            fail(f"{where} has id {raw_puzzle.get('id')!r}, expected {index + 1}")
+        for key in ("question", "answer"):
+            if not isinstance(raw_puzzle.get(key), str) or not raw_puzzle[key].strip():
+                fail(f"{where} '{key}' must be a non-empty string")
+        if "hint" in raw_puzzle and not isinstance(raw_puzzle["hint"], str):
+            fail(f"{where} 'hint' must be a string")
+        aliases = raw_puzzle.get("aliases", [])
+        if not isinstance(aliases, list) or not all(isinstance(alias, str) and alias.strip() for alias in aliases):
+            fail(f"{where} 'aliases' must be a list of non-empty strings")
+        if code_from_initials and "code_element" not in raw_puzzle:
+            for alias in aliases:
+                if canonical_answer(alias)[:1] != canonical_answer(raw_puzzle["answer"])[:1]:
+                    fail(f"{where} alias {alias!r} starts with a different letter than the answer, which the escape code uses")
+        elements = raw_puzzle.get("elements", [])
+        if not isinstance(elements, list) or not all(isinstance(element, str) for element in elements):
+            fail(f"{where} 'elements' must be a list of element names or symbols")
+        numbers = [find_element(element) for element in elements]
+        if None in numbers:
+            fail(f"{where} 'elements' has {elements[numbers.index(None)]!r}, which is not an element")
+        if elements and answer_letters(raw_puzzle["answer"]) != answer_letters("".join(SYMBOLS[number] for number in numbers)):
+            fail(f"{where} answer {raw_puzzle['answer']!r} is not made of the symbols of its 'elements'")
+        if "code_element" in raw_puzzle and (not isinstance(raw_puzzle["code_element"], str)
+                                             or find_element(raw_puzzle["code_element"]) is None):
+            fail(f"{where} 'code_element' must be an element name or symbol")
+
+        position = raw_puzzle.get("position")
+        if (not isinstance(position, list) or len(position) != 2
+                or not all(isinstance(value, int) for value in position)):
+            fail(f"{where} 'position' must be [x, y] integers")
+
+        puzzle = {key: raw_puzzle[key] for key in ("id", "question", "answer", "hint", "aliases", "elements", "code_element")
+                  if key in raw_puzzle}
+        puzzles.append(puzzle)
+        positions.append(tuple(position))
+
+    assets = data.get("assets", {})
+    if not isinstance(assets, dict) or not all(isinstance(value, str) for value in assets.values()):
+        fail("'assets' must map asset names to file names")
+
+    escape_code = data.get("escape_code")
+    if escape_code is None:
+        escape_code = escape_code_from_answers(puzzles)
+        if escape_code is None:
+            fail("'escape_code' can only be left out when every answer starts with an element symbol")
+
+    return {
+        "name": data["name"],
+        "escape_code": escape_code,
+        "escape_code_prompt": data["escape_code_prompt"],
+        "code_from_initials": code_from_initials,
+        "assets": assets,
+        "puzzles": puzzles,
+        "positions": positions,
+    }
+
+
+def pack_asset(pack, asset_name, default_path):
+    # Path of an asset overridden by the pack, or the game's default asset
+    file_name = pack["assets"].get(asset_name)
+    if file_name is None:
+        return default_path
+    return os.path.join(pack["folder"], "assets", file_name)
+
+
+def check_packs(packs_dir=PACKS_DIR):
+    # Validate every pack in packs_dir, yielding (name, error message or None, warning or None).
+    # Bypasses the cache, so checking thousands of packs doesn't evict the active one.
+    for name, folder in sorted(iter_packs(packs_dir)):
+        pack_path = os.path.join(folder, PACK_FILE)
+        try:
+            pack = read_pack_file(pack_path)
+        except PuzzlePackError as error:
+            yield name, str(error), None
+            continue
+        warning = None
+        computed_code = escape_code_from_answers(pack["puzzles"])
+        if computed_code is not None and computed_code != pack["escape_code"]:
+            warning = (f"{pack_path}: escape code {pack['escape_code']!r} differs from {computed_code!r} "
+                       f"worked out from the answers' first letters; check the puzzles explain it")
+        yield name, None, warning
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check ChemEscape puzzle packs")
+    parser.add_argument("--check", nargs="?", const=PACKS_DIR, metavar="PACKS_DIR", required=True,
+                        help=f"validate every pack in a folder (default {PACKS_DIR})")
+    args = parser.parse_args()
+
+    checked = failed = warned = 0
+    for name, error, warning in check_packs(args.check):
+        checked += 1
+        if error is not None:
+            failed += 1
+            print(error)
+        if warning is not None:
+            warned += 1
+            print(f"warning: {warning}")
+    print(f"{checked} packs checked, {failed} with problems, {warned} with warnings")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import pygame
+
+from spatial_index import StationGrid
+
+# --- Scene Graph ---
+# Retained drawing for screens that mostly stay the same from frame to frame.
+# A SceneNode works out what it should show with key(), and only calls
+# build(key) for a new image and rect when that changes. Nodes go in a Scene
+# drawn over a background: drawing restores the background behind the nodes
+# that changed, redraws just those areas (every node overlapping them, in layer
+# order, so overlaps stay correct) and returns the changed rects, so only they
+# need to be pushed to the display.
+#
+# Nodes are only checked when something says they may have changed, so a frame
+# costs the same however many nodes there are. Nodes added with live=True follow
+# state that changes all the time (a moving character, a clock) and are checked
+# every frame; any other node is checked on the next update after scene.mark(node).
+# Which nodes overlap a changed area is looked up in a grid rather than by
+# walking every node.
+#
+#   scene = Scene(background)
+#   scene.add(SceneNode(lambda: score, build_score_text), layer=1)
+#   ...the score changes...
+#   scene.mark(score_node)
+#   scene.update()
+#   changed_rects = scene.draw(screen)
+
+GRID_CELL_SIZE = 64 # Pixels per cell of the grid of drawn nodes
+
+
+class SceneNode:
+    __slots__ = ("key", "build", "depth", "drawn_key", "image", "rect")
+
+    def __init__(self, key, build):
+        self.key = key # () -> what the node shows, or None to hide it
+        self.build = build # (key) -> (image, rect)
+        self.depth = (0, 0) # (layer, order added), drawing order in the scene
+        self.drawn_key = None
+        self.image = None
+        self.rect = None # Where it is drawn, or None while hidden
+
+
+class Scene:
+    def __init__(self, background):
+        self.background = background
+        self.node_count = 0
+        self.live = [] # Nodes checked every update
+        self.marked = set() # Nodes to check on the next update
+        self.drawn = StationGrid(GRID_CELL_SIZE) # Visible node -> rect
+        self.changed_rects = [] # Areas to redraw on the next draw
+
+    def add(self, *nodes, layer=0, live=False):
+        for node in nodes:
+            node.depth = (layer, self.node_count)
+            self.node_count += 1
+            if live:
+                self.live.append(node)
+            self.marked.add(node) # Every node is checked once to be drawn the first time
+
+    def mark(self, *nodes):
+        self.marked.update(nodes)
+
+    def repaint_rect(self, rect):
+        self.changed_rects.append(pygame.Rect(rect))
+
+    def update(self):
+        # Rebuild the live and marked nodes whose key changed
+        marked, self.marked = self.marked, set()
+        for node in self.live:
+            self.update_node(node)
+        for node in marked:
+            self.update_node(node)
+
+    def update_node(self, node):
+        key = node.key()
+        if key == node.drawn_key:
+            return
+        node.drawn_key = key
+        if node.rect is not None:
+            self.changed_rects.append(node.rect)
+            self.drawn.remove(node)
+        if key is None:
+            node.image, node.rect = None, None
+        else:
+            node.image, node.rect = node.build(key)
+            self.drawn.add(node, node.rect)
+            self.changed_rects.append(node.rect)
+
+    def draw(self, surface):
+        # Redraw the changed areas and return them
+        rects = merged_rects(self.changed_rects, surface.get_rect())
+        self.changed_rects = []
+        self.restore_background(surface, rects)
+        for rect in rects:
+            nodes = sorted(self.drawn.collisions(rect), key=node_depth)
+            surface.set_clip(rect)
+            surface.blits([(node.image, node.rect) for node in nodes], doreturn=False)
+        surface.set_clip(None)
+        return rects
+
+    def restore_background(self, surface, rects):
+        surface.blits([(self.background, rect, rect) for rect in rects], doreturn=False)
+
+
+def node_depth(node):
+    return node.depth
+
+
+def merged_rects(rects, clip):
+    # rects clipped to clip, with overlapping ones joined so no area is drawn twice
+    merged = []
+    for rect in rects:
+        rect = rect.clip(clip)
+        if not rect.width or not rect.height:
+            continue
+        i = rect.collidelist(merged)
+        while i != -1:
+            rect.union_ip(merged.pop(i))
+            i = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
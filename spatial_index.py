@@ -0,0 +1,72 @@
+import pygame
+
+# --- Spatial Index for Puzzle Stations ---
+# Uniform grid of buckets so collision checks only look at the stations near the
+# character instead of every station in the room. Built once at startup; solved
+# stations are removed as they are solved.
+
+DEFAULT_CELL_SIZE = 100 # Pixels per grid cell, a bit larger than the character
+
+
+def station_rect(position, radius):
+    # Square interaction area centred on a station
+    px, py = position
+    return pygame.Rect(px - radius, py - radius, radius * 2, radius * 2)
+
+
+class StationGrid:
+    def __init__(self, cell_size=DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {} # (col, row) -> set of station ids
+        self.rects = {} # station id -> interaction rect
+
+    def __len__(self):
+        return len(self.rects)
+
+    def __contains__(self, station_id):
+        return station_id in self.rects
+
+    def _cells_for(self, rect):
+        first_col, first_row = rect.left // self.cell_size, rect.top // self.cell_size
+        last_col, last_row = (rect.right - 1) // self.cell_size, (rect.bottom - 1) // self.cell_size
+        for col in range(first_col, last_col + 1):
+            for row in range(first_row, last_row + 1):
+                yield col, row
+
+    def add(self, station_id, rect):
+        rect = pygame.Rect(rect)
+        self.rects[station_id] = rect
+        for cell in self._cells_for(rect):
+            self.cells.setdefault(cell, set()).add(station_id)
+
+    def remove(self, station_id):
+        rect = self.rects.pop(station_id, None)
+        if rect is None:
+            return
+        for cell in self._cells_for(rect):
+            bucket = self.cells.get(cell)
+            if bucket is not None:
+                bucket.discard(station_id)
+                if not bucket:
+                    del self.cells[cell]
+
+    def collisions(self, rect):
+        # Ids of every station overlapping rect, in no particular order
+        found = set()
+        for cell in self._cells_for(rect):
+            for station_id in self.cells.get(cell, ()):
+                if station_id not in found and rect.colliderect(self.rects[station_id]):
+                    found.add(station_id)
+        return found
+
+    def first_collision(self, rect):
+        # Lowest station id overlapping rect, matching a front-to-back scan of the stations
+        found = self.collisions(rect)
+        return min(found) if found else None
+
+
+def build_station_grid(positions, radius, cell_size=DEFAULT_CELL_SIZE):
+    grid = StationGrid(cell_size)
+    for station_id, position in enumerate(positions):
+        grid.add(station_id, station_rect(position, radius))
+    return grid
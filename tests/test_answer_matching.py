@@ -0,0 +1,42 @@
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from answer_matching import build_answer_matchers
+from puzzle_packs import load_pack
+
+# Answers the shipped lab pack must accept, and the ones it must not, with the
+# same matchers the game builds for it
+
+
+def lab_matchers():
+    pack = load_pack(os.path.join(REPO_DIR, "packs", "lab"))
+    matchers = build_answer_matchers(pack["puzzles"], pack["code_from_initials"])
+    return {puzzle["answer"]: matcher for puzzle, matcher in zip(pack["puzzles"], matchers)}
+
+
+def test_element_symbol_matches_its_name():
+    matchers = lab_matchers()
+    assert matchers["Potassium"].matches("K")
+    assert matchers["Potassium"].matches("potassium")
+    assert matchers["Oxygen"].matches("O")
+
+
+def test_punctuation_and_aliases():
+    matchers = lab_matchers()
+    assert matchers["Non-Newtonian"].matches("non newtonian")
+    assert matchers["Universal Indicator"].matches("universal indicator paper")
+    assert matchers["Salt"].matches("Sodium Chloride")
+
+
+def test_answers_changing_the_code_letter_are_refused():
+    matchers = lab_matchers()
+    assert not matchers["Salt"].matches("NaCl")
+    assert not matchers["Salt"].matches("Table Salt")
+    assert not matchers["Salt"].matches("Palt") # Not even as a typo
+
+
+def test_lab_escape_code():
+    assert load_pack(os.path.join(REPO_DIR, "packs", "lab"))["escape_code"] == "190"
@@ -0,0 +1,190 @@
+import bisect
+
+import pygame
+
+# --- Text Input ---
+# The answer and escape code boxes. A TextInput is the text typed so far with a
+# cursor and a selection, capped at max_length characters. Keys reach it as
+# characters in FrameInput.typed like everything else typed, so recorded games
+# and server sessions replay edits exactly: printable characters are inserted
+# (replacing the selection) and the codes below move the cursor, select or
+# delete. Pasting just types the clipboard text.
+#
+# A TextLine draws the text one glyph at a time onto a surface the width of the
+# box. Each glyph is rendered once per font and colour, and when the text
+# changes only the glyphs from the first changed character on are redrawn. The
+# line scrolls to keep the cursor in view instead of growing past the box; when
+# typing at the end scrolls it, the pixels already drawn are moved rather than
+# drawn again.
+
+BACKSPACE = "\b"
+DELETE = "\x7f"
+# Cursor and selection keys, from Unicode's private use area so they can't be typed or pasted
+CURSOR_LEFT, CURSOR_RIGHT, CURSOR_HOME, CURSOR_END = "\ue000", "\ue001", "\ue002", "\ue003"
+SELECT_LEFT, SELECT_RIGHT, SELECT_HOME, SELECT_END, SELECT_ALL = "\ue004", "\ue005", "\ue006", "\ue007", "\ue008"
+
+CURSOR_WIDTH = 2 # Pixels kept free at the right edge so the cursor shows after the last glyph
+
+
+def printable_text(text):
+    # Text as it can be typed into a box: one line, no control or editing characters
+    return "".join(char for char in text.replace("\n", " ").replace("\t", " ") if char.isprintable())
+
+
+class TextInput:
+    __slots__ = ("text", "cursor", "anchor", "max_length")
+
+    def __init__(self, max_length):
+        self.max_length = max_length
+        self.clear()
+
+    def clear(self):
+        self.text = ""
+        self.cursor = 0 # Where typed characters go
+        self.anchor = 0 # Other end of the selection; the same as cursor when nothing is selected
+
+    def __repr__(self):
+        return f"TextInput({self.text!r}, cursor={self.cursor}, anchor={self.anchor})"
+
+    def selection(self):
+        return min(self.cursor, self.anchor), max(self.cursor, self.anchor)
+
+    def selected_text(self):
+        start, end = self.selection()
+        return self.text[start:end]
+
+    def move_to(self, index, select=False):
+        self.cursor = max(0, min(len(self.text), index))
+        if not select:
+            self.anchor = self.cursor
+
+    def replace_selection(self, new_text):
+        start, end = self.selection()
+        new_text = new_text[:self.max_length - len(self.text) + (end - start)] # Whatever still fits
+        self.text = self.text[:start] + new_text + self.text[end:]
+        self.move_to(start + len(new_text))
+
+    def edit(self, char):
+        start, end = self.selection()
+        if char == BACKSPACE or char == DELETE:
+            if start == end: # Nothing selected, so delete the character before or after the cursor
+                if char == BACKSPACE:
+                    start = max(0, start - 1)
+                else:
+                    end = min(len(self.text), end + 1)
+            self.text = self.text[:start] + self.text[end:]
+            self.move_to(start)
+        elif char == CURSOR_LEFT:
+            self.move_to(start if start != end else self.cursor - 1)
+        elif char == CURSOR_RIGHT:
+            self.move_to(end if start != end else self.cursor + 1)
+        elif char == CURSOR_HOME:
+            self.move_to(0)
+        elif char == CURSOR_END:
+            self.move_to(len(self.text))
+        elif char == SELECT_LEFT:
+            self.move_to(self.cursor - 1, select=True)
+        elif char == SELECT_RIGHT:
+            self.move_to(self.cursor + 1, select=True)
+        elif char == SELECT_HOME:
+            self.move_to(0, select=True)
+        elif char == SELECT_END:
+            self.move_to(len(self.text), select=True)
+        elif char == SELECT_ALL:
+            self.anchor = 0
+            self.move_to(len(self.text), select=True)
+        elif char.isprintable():
+            self.replace_selection(char)
+
+
+# --- Text Rendering ---
+glyph_cache = {} # (font, color, char) -> (surface, advance)
+
+
+def glyph(font, color, char):
+    key = (font, color, char)
+    cached = glyph_cache.get(key)
+    if cached is None:
+        surface = font.render(char, True, color)
+        metrics = font.metrics(char)[0]
+        advance = metrics[4] if metrics else surface.get_width() # Characters the font doesn't have
+        cached = glyph_cache[key] = (surface, advance)
+    return cached
+
+
+class TextLine:
+    def __init__(self, font, color, background, size):
+        self.font = font
+        self.color = color
+        self.background = background
+        self.surface = pygame.Surface(size)
+        self.surface.fill(background)
+        self.text = ""
+        self.offsets = [0] # x of the start of each character, then of the end of the text
+        self.scroll = 0 # Pixels of text scrolled off the left edge
+
+    def x_at(self, index):
+        # Where the character at index starts on the surface
+        return self.offsets[index] - self.scroll
+
+    def update(self, text, cursor):
+        # Draw text, scrolled so the cursor is in view, and return the surface
+        if text.startswith(self.text): # Typing at the end
+            same = len(self.text)
+        else:
+            same = 0
+            for same, (old, new) in enumerate(zip(self.text, text)):
+                if old != new:
+                    break
+            else:
+                same = min(len(self.text), len(text))
+        offsets = self.offsets[:same + 1]
+        for char in text[same:]:
+            offsets.append(offsets[-1] + glyph(self.font, self.color, char)[1])
+        changed = same < max(len(text), len(self.text))
+        self.text, self.offsets = text, offsets
+
+        # Scroll just far enough to show the cursor, and no further than the end of the text
+        view_width = self.surface.get_width() - CURSOR_WIDTH
+        scroll = max(min(self.scroll, offsets[cursor]), offsets[cursor] - view_width)
+        scroll = min(scroll, max(0, offsets[-1] - view_width))
+        if scroll > self.scroll:
+            # Move what is already drawn left and only draw what comes into view on the right
+            shift = scroll - self.scroll
+            self.surface.scroll(-shift)
+            self.scroll = scroll
+            exposed = bisect.bisect_right(offsets, scroll + self.surface.get_width() - shift) - 1
+            same = min(same, max(0, exposed))
+            changed = True
+        elif scroll < self.scroll:
+            self.scroll = scroll
+            same = 0 # Everything moved right; draw it all again
+            changed = True
+        if changed: # Only the cursor moved otherwise
+            self.redraw_from(same)
+        return self.surface
+
+    def redraw_from(self, index):
+        # Clear from where the character at index starts and draw the glyphs over
+        # that part again, starting with any earlier glyphs that reach into it
+        first_visible = max(0, bisect.bisect_right(self.offsets, self.scroll) - 1)
+        index = max(index, first_visible)
+        width, height = self.surface.get_size()
+        clear_rect = pygame.Rect(self.x_at(index), 0, width - self.x_at(index), height)
+        while index > 0:
+            glyph_surface = glyph(self.font, self.color, self.text[index - 1])[0]
+            if self.x_at(index - 1) + glyph_surface.get_width() <= clear_rect.x:
+                break
+            index -= 1
+        self.surface.fill(self.background, clear_rect)
+        x = self.x_at(index)
+        glyphs = []
+        for char in self.text[index:]:
+            if x >= width:
+                break
+            glyph_surface, advance = glyph(self.font, self.color, char)
+            glyphs.append((glyph_surface, (x, 0)))
+            x += advance
+        self.surface.set_clip(clear_rect)
+        self.surface.blits(glyphs, doreturn=False)
+        self.surface.set_clip(None)
@@ -0,0 +1,77 @@
+import argparse
+import importlib.util
+import modulefinder
+import os
+import shutil
+import subprocess
+import sys
+
+# --- Web Build ---
+# Stages what the game needs in the browser and packs it with pygbag. The
+# bundle is what the browser downloads before the first frame, so it only holds
+# the modules main.py actually imports, the puzzle packs and the small assets.
+# FETCHED_ASSETS stay out of it: the game fetches them after it is on screen
+# (see asset_fetch.py), so they are copied next to the built page instead.
+#
+#   python web_build.py                 # stage into build/web-src and run pygbag
+#   python web_build.py --stage-only    # just stage, e.g. to check the size
+#
+# pygbag itself is a separate install: pip install pygbag
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+BUNDLED_ASSETS = ["favicon.png", "assets/character.png", "assets/words.txt"]
+FETCHED_ASSETS = ["assets/lab.png", "assets/music.ogg"]
+
+
+def local_modules():
+    # Modules main.py imports from this folder, not from the standard library or site-packages
+    finder = modulefinder.ModuleFinder(path=[REPO_DIR])
+    finder.run_script(os.path.join(REPO_DIR, "main.py"))
+    return sorted(os.path.relpath(module.__file__, REPO_DIR) for module in finder.modules.values()
+                  if module.__file__ and os.path.dirname(os.path.abspath(module.__file__)) == REPO_DIR)
+
+
+def copy_files(paths, target_dir):
+    for path in paths:
+        target = os.path.join(target_dir, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copy2(os.path.join(REPO_DIR, path), target)
+
+
+def folder_size(folder):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(folder) for name in names)
+
+
+def stage(stage_dir):
+    if os.path.exists(stage_dir):
+        shutil.rmtree(stage_dir)
+    copy_files(local_modules() + BUNDLED_ASSETS, stage_dir)
+    shutil.copytree(os.path.join(REPO_DIR, "packs"), os.path.join(stage_dir, "packs"))
+    return folder_size(stage_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the game for the browser with pygbag")
+    parser.add_argument("--stage-dir", default=os.path.join(REPO_DIR, "build", "web-src"), help="where to stage the bundle (default build/web-src)")
+    parser.add_argument("--stage-only", action="store_true", help="stage the files without running pygbag")
+    args = parser.parse_args()
+
+    size = stage(args.stage_dir)
+    print(f"Staged {size / 1024:.0f} KB in {args.stage_dir}")
+    print(f"Left out, fetched when needed: {', '.join(FETCHED_ASSETS)}")
+    if args.stage_only:
+        return
+
+    if importlib.util.find_spec("pygbag") is None:
+        print(f"pygbag is not installed; after pip install pygbag run: {sys.executable} -m pygbag --build {args.stage_dir}")
+        sys.exit(1)
+    subprocess.run([sys.executable, "-m", "pygbag", "--build", args.stage_dir], check=True)
+
+    # The page loads the bundle from build/web and the fetched assets from next to it
+    web_dir = os.path.join(args.stage_dir, "build", "web")
+    copy_files(FETCHED_ASSETS, web_dir)
+    print(f"Built {web_dir}: {folder_size(web_dir) / 1024:.0f} KB with the fetched assets")
+
+
+if __name__ == "__main__":
+    main()